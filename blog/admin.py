@@ -12,17 +12,23 @@ class UserAdmin(admin.ModelAdmin):
 
 
 class CategoryAdmin(admin.ModelAdmin):
-	list_display = ('name', 'description', 'created_at')
+	list_display = ('name', 'description', 'post_count', 'created_at')
 	list_filter = ('created_at',)
 	search_fields = ('name',)
 
 
 class PostAdmin(admin.ModelAdmin):
 	list_display = ('title', 'author', 'category', 'status', 'views', 'published_at', 'get_comment_count', 'get_reading_time')
+	list_select_related = ('author', 'category')
 	list_filter = ('status', 'category', 'author', 'published_at')
 	search_fields = ('title', 'content', 'excerpt')
 	date_hierarchy = 'published_at'
 	ordering = ('-published_at',)
+	# Перегляди рахує буфер переглядів; значення з форми затерло б ще не показані в ній інкременти
+	readonly_fields = ('views',)
+
+	def get_queryset(self, request):
+		return super().get_queryset(request).defer('content')
 
 	def get_comment_count(self, obj):
 		return obj.get_comment_count()
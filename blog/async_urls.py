@@ -0,0 +1,17 @@
+from django.urls import path
+from . import async_views
+
+app_name = 'blog_async'
+
+# Лише публічні GET-ендпоінти; решта маршрутів /blog/ обслуговується синхронними views
+urlpatterns = [
+	path('posts/', async_views.AsyncPostListView.as_view(), name='post_list'),
+	path('posts/<int:id>/', async_views.AsyncPostDetailView.as_view(), name='post_detail'),
+	path('categories/', async_views.AsyncCategoryListView.as_view(), name='category_list'),
+	path('categories/<int:category_id>/posts/', async_views.AsyncCategoryPostsView.as_view(), name='category_posts'),
+	path('categories/<int:category_id>/statistics/', async_views.AsyncCategoryStatisticsView.as_view(), name='category_statistics'),
+	path('authors/', async_views.AsyncAuthorListView.as_view(), name='author_list'),
+	path('authors/<int:author_id>/posts/', async_views.AsyncAuthorPostsView.as_view(), name='author_posts'),
+	path('statistics/', async_views.AsyncBlogStatisticsView.as_view(), name='blog_statistics'),
+	path('popular/', async_views.AsyncPopularPostsView.as_view(), name='popular_posts'),
+]
@@ -0,0 +1,215 @@
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.views import View
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .caching import aget_generations, apply_validators, build_validators, get_setting, response_cache_key
+from .comments import aload_comment_pages
+from .models import User, Post, Category
+from .pagination import PostCursorPagination, PopularPostCursorPagination, PopularPostFallbackPagination
+from .sparse import ordering_fields, sparse_from_request, trim_queryset
+from .serializers import (
+	UserSerializer, PostListSerializer, PostDetailSerializer, CategorySerializer,
+	BlogStatisticsSerializer, CategoryStatisticsSerializer, top_authors_queryset, top_posts_queryset,
+)
+from .statistics import aget_rollup
+from .trending import fallback_queryset, parse_trending_params, ranked_posts, trending_queryset
+from .view_counter import view_counter
+
+
+def not_found(model):
+	# Те саме повідомлення, що й у get_object_or_404 синхронних views
+	return Http404(f'No {model._meta.object_name} matches the given query.')
+
+
+def json_response(data, status=200):
+	return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+class AsyncReadView(View):
+	# Асинхронні аналоги публічних ендпоінтів: дані вантажаться async ORM, а серіалізація
+	# працює лише з уже завантаженими об'єктами, тож лінивих запитів під час рендерингу немає.
+	# Переходів між потоками це не прибирає: кожен виклик async ORM (aget, afirst, async for)
+	# Django виконує через sync_to_async у потоці запиту, тож запит передається в потік і назад
+	# щонайменше раз на запит до бази. Виграш — у неблокованому циклі подій, а не в кількості переходів
+	http_method_names = ['get', 'head', 'options']
+	cache_resources = ()
+	conditional_get = False
+	pagination_class = None
+	sparse_fields = False
+
+	async def get(self, request, *args, **kwargs):
+		api_request = Request(request)
+		generations = await aget_generations(self.cache_resources)
+		validators = None
+		if self.conditional_get:
+			validators = build_validators(request, generations, JSONRenderer.format)
+			not_modified = get_conditional_response(request, **validators)
+			if not_modified is not None:
+				return apply_validators(not_modified, validators)
+
+		key = response_cache_key(request, generations)
+		data = await cache.aget(key)
+		if data is None:
+			try:
+				data = await self.get_data(api_request, *args, **kwargs)
+			except Http404 as exc:
+				return json_response({'detail': str(exc) or NotFound.default_detail}, status=NotFound.status_code)
+			except APIException as exc:
+				# Як у обробнику винятків DRF: помилки валідації полів віддаються без обгортки
+				detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+				return json_response(detail, status=exc.status_code)
+			await cache.aset(key, data, get_setting('TIMEOUT'))
+		else:
+			await self.cache_hit(data, *args, **kwargs)
+
+		response = json_response(data)
+		if validators is not None:
+			apply_validators(response, validators)
+		return response
+
+	async def get_data(self, request, *args, **kwargs):
+		raise NotImplementedError
+
+	async def cache_hit(self, data, *args, **kwargs):
+		pass
+
+	def get_serializer_context(self, request):
+		context = {'request': request}
+		if self.sparse_fields:
+			context['sparse'] = sparse_from_request(request)
+		return context
+
+	def get_serializer(self, request, serializer_class, **kwargs):
+		return serializer_class(context=self.get_serializer_context(request), **kwargs)
+
+	async def paginate(self, request, queryset, serializer_class):
+		paginator = self.pagination_class()
+		serializer = self.get_serializer(request, serializer_class, many=True)
+		queryset = trim_queryset(queryset, serializer.child, extra=ordering_fields(paginator))
+		page = await paginator.apaginate_queryset(queryset, request)
+		return paginator.get_paginated_data(serializer.to_representation(page))
+
+
+class AsyncPostListView(AsyncReadView):
+	pagination_class = PostCursorPagination
+	cache_resources = ('post', 'comment', 'category', 'user')
+	conditional_get = True
+	sparse_fields = True
+
+	async def get_data(self, request):
+		return await self.paginate(request, Post.objects.for_list(), PostListSerializer)
+
+
+class AsyncPostDetailView(AsyncReadView):
+	cache_resources = ('post', 'comment', 'category', 'user', 'views')
+	conditional_get = True
+	sparse_fields = True
+
+	async def get_data(self, request, id):
+		serializer = self.get_serializer(request, PostDetailSerializer)
+		try:
+			post = await trim_queryset(Post.objects.select_related('author', 'category'), serializer).aget(pk=id)
+		except Post.DoesNotExist:
+			raise not_found(Post)
+		if 'comments' in serializer.fields:
+			comments = serializer.get_comment_serializer().child
+			await aload_comment_pages([post], comments.get_thread_queryset(), comments.get_reply_depth())
+		await view_counter.arecord(post.pk)
+		return serializer.to_representation(post)
+
+	async def cache_hit(self, data, id):
+		# У тілі з ?fields= може не бути id, тож статтю визначаємо за URL
+		await view_counter.arecord(id)
+
+
+class AsyncCategoryListView(AsyncReadView):
+	cache_resources = ('category', 'post')
+	conditional_get = True
+	sparse_fields = True
+
+	async def get_data(self, request):
+		serializer = self.get_serializer(request, CategorySerializer, many=True)
+		categories = [category async for category in trim_queryset(Category.objects.all(), serializer.child)]
+		return serializer.to_representation(categories)
+
+
+class AsyncCategoryPostsView(AsyncReadView):
+	pagination_class = PostCursorPagination
+	cache_resources = ('post', 'comment', 'category', 'user')
+	conditional_get = True
+	sparse_fields = True
+
+	async def get_data(self, request, category_id):
+		queryset = Post.objects.for_list().filter(category__id=category_id)
+		return await self.paginate(request, queryset, PostListSerializer)
+
+
+class AsyncCategoryStatisticsView(AsyncReadView):
+	cache_resources = ('post', 'comment', 'category', 'views')
+
+	async def get_data(self, request, category_id):
+		rollup = await aget_rollup(category_id, refresh_missing=False)
+		if rollup is None:
+			if not await Category.objects.filter(pk=category_id).aexists():
+				raise not_found(Category)
+			rollup = await aget_rollup(category_id)
+		return CategoryStatisticsSerializer(instance=rollup, context={'request': request}).data
+
+
+class AsyncAuthorListView(AsyncReadView):
+	cache_resources = ('user', 'post')
+	sparse_fields = True
+
+	async def get_data(self, request):
+		serializer = self.get_serializer(request, UserSerializer, many=True)
+		queryset = trim_queryset(User.objects.filter(post_count__gt=0).order_by('username'), serializer.child)
+		return serializer.to_representation([user async for user in queryset])
+
+
+class AsyncAuthorPostsView(AsyncReadView):
+	pagination_class = PostCursorPagination
+	cache_resources = ('post', 'comment', 'category', 'user')
+	conditional_get = True
+	sparse_fields = True
+
+	async def get_data(self, request, author_id):
+		if not await User.objects.filter(pk=author_id).aexists():
+			raise not_found(User)
+		queryset = Post.objects.for_list().filter(author_id=author_id)
+		return await self.paginate(request, queryset, PostListSerializer)
+
+
+class AsyncBlogStatisticsView(AsyncReadView):
+	cache_resources = ('post', 'comment', 'category', 'user', 'views')
+
+	async def get_data(self, request):
+		rollup = await aget_rollup()
+		rollup.top_posts = [post async for post in top_posts_queryset()]
+		rollup.top_authors = [user async for user in top_authors_queryset()]
+		return BlogStatisticsSerializer(instance=rollup, context={'request': request}).data
+
+
+class AsyncPopularPostsView(AsyncReadView):
+	pagination_class = PopularPostCursorPagination
+	cache_resources = ('post', 'comment', 'category', 'user', 'trending')
+	conditional_get = True
+	sparse_fields = True
+
+	async def get_data(self, request):
+		window, category_id = parse_trending_params(request.query_params)
+		serializer = self.get_serializer(request, PostListSerializer, many=True)
+		fallback = PopularPostFallbackPagination()
+		if fallback.cursor_query_param not in request.query_params:
+			paginator = self.pagination_class()
+			page = await paginator.apaginate_queryset(trending_queryset(window, category_id), request)
+			if page or paginator.cursor_query_param in request.query_params:
+				queryset = trim_queryset(Post.objects.for_list(), serializer.child)
+				posts = await queryset.ain_bulk([entry.post_id for entry in page])
+				return paginator.get_paginated_data(serializer.to_representation(ranked_posts(page, posts)))
+		queryset = trim_queryset(Post.objects.for_list(), serializer.child, extra=ordering_fields(fallback))
+		page = await fallback.apaginate_queryset(fallback_queryset(queryset, category_id), request)
+		return fallback.get_paginated_data(serializer.to_representation(page))
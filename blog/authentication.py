@@ -0,0 +1,87 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+DEFAULTS = {
+    'TIMEOUT': 60,
+    'MAX_SIZE': 1024,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'BLOG_AUTH_CACHE', {}).get(name, DEFAULTS[name])
+
+
+class UserCache:
+    # Кеш у пам'яті процесу: інвалідація через сигнали локальна, тож інші воркери
+    # бачать зміни користувача не пізніше ніж через TIMEOUT секунд
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, user_id):
+        # simplejwt кладе ідентифікатор у токен рядком, а сигнали передають pk як число
+        user_id = str(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+        # Копія, щоб зміни request.user в одному запиті не протікали в інші
+        return copy.copy(user)
+
+    def set(self, user_id, user):
+        timeout = get_setting('TIMEOUT')
+        if not timeout:
+            return
+        user_id = str(user_id)
+        with self._lock:
+            self._entries[user_id] = (copy.copy(user), time.monotonic() + timeout)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > get_setting('MAX_SIZE'):
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user = user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+            return user
+
+        # Ті самі перевірки, що й у simplejwt, але над користувачем із кешу
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return user
@@ -0,0 +1,392 @@
+import asyncio
+import copy
+import io
+import random
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, close_old_connections, connection, connections, transaction
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import User, Category, Post, Comment
+from .view_counter import view_counter
+from . import async_urls as blog_async_urls
+from . import urls as blog_urls
+
+# Межі кількості SQL-запитів на один холодний запит (без кешу відповідей)
+QUERY_BUDGETS = {
+    'post_list': 1,
+    # Стаття, перша сторінка коментарів і по запиту на кожен рівень відповідей (COMMENT_DEPTH)
+    'post_detail': 5,
+    'post_batch': 5,
+    'post_comments': 4,
+    'category_list': 1,
+    'category_posts': 1,
+    'category_statistics': 1,
+    'author_list': 1,
+    'author_posts': 2,
+    # JWT без сесії; запит до користувача лише при першому зверненні, далі — з кешу автентифікації
+    'my_posts': 2,
+    'blog_statistics': 3,
+    # Сторінка рейтингу з TrendingScore і статті за первинним ключем
+    'popular_posts': 2,
+    'post_search': 3,
+    'post_export': 3,
+    'changes': 5,
+}
+
+DATASET_SIZES = {
+    'small': {'authors': 20, 'categories': 8, 'posts': 500, 'comments': 3000},
+    'medium': {'authors': 200, 'categories': 20, 'posts': 20000, 'comments': 120000},
+    'large': {'authors': 2000, 'categories': 50, 'posts': 500000, 'comments': 3000000},
+}
+
+AUTHENTICATED_ROUTES = {'my_posts'}
+ADMIN_ROUTES = {'post_export'}
+
+ASYNC_URLCONF = 'config.async_urls'
+
+BENCHMARK_MIDDLEWARE_EXCLUDE = ('silk.', 'blog.profiling.', 'blog.metrics.')
+
+
+@contextmanager
+def benchmark_database(size='small', seed=42, workers=1, keepdb=False, test_name=None):
+    test_settings = connection.settings_dict['TEST']
+    previous_test_name = test_settings.get('NAME')
+    if test_name is not None:
+        # SQLite за замовчуванням створює тестову базу в пам'яті, а WAL потребує файлу
+        test_settings['NAME'] = test_name
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        if not (keepdb and Post.objects.exists()):
+            call_command(
+                'populate_blog',
+                seed=seed,
+                workers=workers,
+                min_words=100,
+                max_words=1200,
+                stdout=io.StringIO(),
+                **DATASET_SIZES[size],
+            )
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        test_settings['NAME'] = previous_test_name
+
+
+def benchmark_settings():
+    middleware = [
+        name for name in settings.MIDDLEWARE
+        if not name.startswith(BENCHMARK_MIDDLEWARE_EXCLUDE)
+    ]
+    return override_settings(MIDDLEWARE=middleware, ALLOWED_HOSTS=['testserver'], DEBUG=False)
+
+
+def sample_route_kwargs():
+    post = (
+        Post.objects.filter(published_at__isnull=False)
+        .order_by('-comment_count', 'pk').values_list('pk', flat=True).first()
+    )
+    category = Category.objects.order_by('-post_count', 'pk').values_list('pk', flat=True).first()
+    author = User.objects.order_by('-post_count', 'pk').values_list('pk', flat=True).first()
+    return {'id': post, 'post_id': post, 'category_id': category, 'author_id': author}
+
+
+def sample_route_queries():
+    title = Post.objects.filter(published_at__isnull=False).order_by('pk').values_list('title', flat=True).first()
+    words = (title or 'post').split()
+    batch = list(
+        Post.objects.filter(published_at__isnull=False).order_by('-published_at', '-id').values_list('pk', flat=True)[:30]
+    )
+    return {
+        # Останній ідентифікатор допустимий, але відсутній — перевіряє поле missing
+        'post_batch': {'ids': ','.join(str(pk) for pk in [*batch[::-1], 2 ** 63 - 1]), 'view': 'detail'},
+        'post_search': {'q': f"{words[0].strip('.').lower()} {words[-1][:3].lower()}*"},
+        'changes': {'since': 0},
+    }
+
+
+def blog_routes():
+    samples = sample_route_kwargs()
+    queries = sample_route_queries()
+    routes = []
+    for pattern in blog_urls.urlpatterns:
+        kwargs = {name: samples[name] for name in pattern.pattern.converters}
+        url = reverse(f'{blog_urls.app_name}:{pattern.name}', kwargs=kwargs)
+        if pattern.name in queries:
+            url = f'{url}?{urlencode(queries[pattern.name])}'
+        routes.append((pattern.name, url))
+    return routes
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def measure_endpoint(client, url, iterations=20, warmup=2, cold=True):
+    for _ in range(warmup):
+        client.get(url)
+    latencies = []
+    queries = []
+    sizes = []
+    status = None
+    for _ in range(iterations):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url)
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+            latencies.append((time.perf_counter() - started) * 1000)
+        status = response.status_code
+        queries.append(len(captured.captured_queries))
+        sizes.append(len(body))
+    return {
+        'status': status,
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'queries': max(queries),
+        'bytes': max(sizes),
+    }
+
+
+def run_endpoint_benchmarks(iterations=20, warmup=2, cold=True, routes=None):
+    anonymous = Client()
+    authenticated = Client()
+    author = User.objects.order_by('-post_count', 'pk').first()
+    if author is not None:
+        authenticated = Client(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(author)}')
+    admin = Client()
+    admin_user, _ = User.objects.get_or_create(username='benchmark-admin', defaults={'is_staff': True})
+    admin.force_login(admin_user)
+    results = {}
+    with benchmark_settings():
+        for name, url in routes or blog_routes():
+            client = authenticated if name in AUTHENTICATED_ROUTES else anonymous
+            if name in ADMIN_ROUTES:
+                client = admin
+            results[name] = dict(measure_endpoint(client, url, iterations, warmup, cold), url=url)
+    return results
+
+
+def compare_results(results, baseline=None, max_regression=0.25, min_delta_ms=1.0, budgets=None):
+    budgets = QUERY_BUDGETS if budgets is None else budgets
+    failures = []
+    for name, result in results.items():
+        if result['status'] != 200:
+            failures.append(f"{name}: статус {result['status']}")
+        budget = budgets.get(name)
+        if budget is not None and result['queries'] > budget:
+            failures.append(f"{name}: {result['queries']} запитів при бюджеті {budget}")
+        previous = (baseline or {}).get(name)
+        if not previous:
+            continue
+        if result['queries'] > previous['queries']:
+            failures.append(f"{name}: запитів {result['queries']} проти {previous['queries']} у базовій лінії")
+        limit = max(previous['p95_ms'] * (1 + max_regression), previous['p95_ms'] + min_delta_ms)
+        if result['p95_ms'] > limit:
+            failures.append(f"{name}: p95 {result['p95_ms']} мс перевищує {limit:.3f} мс")
+    return failures
+
+
+def async_routes():
+    names = {pattern.name for pattern in blog_async_urls.urlpatterns}
+    return [(name, url) for name, url in blog_routes() if name in names]
+
+
+def summarize_load(latencies, statuses, elapsed):
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(statistics.median(latencies), 3) if latencies else 0.0,
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'errors': sum(1 for status in statuses if status != 200),
+    }
+
+
+def run_sync_load(url, concurrency, total):
+    latencies = []
+    statuses = []
+
+    def worker(count):
+        client = Client()
+        try:
+            for _ in range(count):
+                started = time.perf_counter()
+                response = client.get(url)
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses.append(response.status_code)
+        finally:
+            connections.close_all()
+
+    shares = [total // concurrency + (1 if index < total % concurrency else 0) for index in range(concurrency)]
+    threads = [threading.Thread(target=worker, args=(share,)) for share in shares if share]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize_load(latencies, statuses, time.perf_counter() - started)
+
+
+async def run_async_load(url, concurrency, total):
+    client = AsyncClient()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(url)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses.append(response.status_code)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return summarize_load(latencies, statuses, time.perf_counter() - started)
+
+
+def run_concurrency_benchmarks(concurrency=16, total=200, cold=True, routes=None):
+    # Порівнюємо ті самі URL: синхронні DRF views через WSGI-обробник у пулі потоків
+    # проти асинхронних views через ASGI-обробник з тією ж кількістю одночасних запитів
+    overrides = {'BLOG_VIEW_COUNTER': {'FLUSH_INTERVAL': 3600, 'MAX_PENDING': 10 ** 9}}
+    if cold:
+        overrides['BLOG_RESPONSE_CACHE'] = {'TIMEOUT': 0}
+    results = {}
+    with benchmark_settings(), override_settings(**overrides):
+        for name, url in routes or async_routes():
+            cache.clear()
+            sync_result = run_sync_load(url, concurrency, total)
+            cache.clear()
+            with override_settings(ROOT_URLCONF=ASYNC_URLCONF):
+                async_result = asyncio.run(run_async_load(url, concurrency, total))
+            results[name] = {'url': url, 'sync': sync_result, 'async': async_result}
+    view_counter.flush()
+    return results
+
+
+SQLITE_BASELINE_SETTINGS = {
+    # Типова конфігурація Django: журнал відкату і нове з'єднання на кожен запит
+    'OPTIONS': {'init_command': 'PRAGMA journal_mode=DELETE'},
+    'CONN_MAX_AGE': 0,
+    'CONN_HEALTH_CHECKS': False,
+}
+
+
+@contextmanager
+def sqlite_mode(overrides):
+    connections.close_all()
+    settings_dict = connection.settings_dict
+    previous = {key: settings_dict[key] for key in overrides}
+    settings_dict.update(copy.deepcopy(overrides))
+    try:
+        # Перше з'єднання перемикає режим журналу до старту навантаження
+        connection.ensure_connection()
+        yield
+    finally:
+        connections.close_all()
+        settings_dict.update(previous)
+
+
+def run_sqlite_load(urls, readers=8, writers=2, duration=5.0):
+    post_ids = list(Post.objects.filter(published_at__isnull=False).values_list('pk', flat=True)[:500])
+    author_ids = list(User.objects.values_list('pk', flat=True)[:100])
+    lock = threading.Lock()
+    latencies = {'read': [], 'write': []}
+    errors = {'read': 0, 'write': 0}
+
+    def record(kind, started, ok):
+        with lock:
+            if ok:
+                latencies[kind].append((time.perf_counter() - started) * 1000)
+            else:
+                errors[kind] += 1
+
+    def reader(index, deadline):
+        client = Client()
+        rng = random.Random(index)
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    ok = client.get(rng.choice(urls)).status_code == 200
+                except OperationalError:
+                    ok = False
+                finally:
+                    # Тестовий клієнт не закриває з'єднання, як це робить справжній обробник запитів
+                    close_old_connections()
+                record('read', started, ok)
+        finally:
+            connections.close_all()
+
+    def writer(index, deadline):
+        rng = random.Random(10000 + index)
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    with transaction.atomic():
+                        Comment.objects.create(
+                            post_id=rng.choice(post_ids),
+                            author_id=rng.choice(author_ids),
+                            content='Коментар з бенчмарку SQLite.',
+                            is_approved=True,
+                        )
+                    ok = True
+                except OperationalError:
+                    ok = False
+                finally:
+                    close_old_connections()
+                record('write', started, ok)
+        finally:
+            connections.close_all()
+
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=reader, args=(index, deadline)) for index in range(readers)]
+    threads += [threading.Thread(target=writer, args=(index, deadline)) for index in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        kind: {
+            'ops': len(latencies[kind]),
+            'ops_per_s': round(len(latencies[kind]) / elapsed, 1) if elapsed else 0.0,
+            'p95_ms': round(percentile(latencies[kind], 0.95), 3),
+            'errors': errors[kind],
+        }
+        for kind in ('read', 'write')
+    }
+
+
+def run_sqlite_benchmarks(readers=8, writers=2, duration=5.0):
+    kwargs = sample_route_kwargs()
+    urls = [reverse('blog:post_list'), reverse('blog:post_detail', kwargs={'id': kwargs['id']})]
+    overrides = {
+        'BLOG_RESPONSE_CACHE': {'TIMEOUT': 0},
+        'BLOG_VIEW_COUNTER': {'FLUSH_INTERVAL': 3600, 'MAX_PENDING': 10 ** 9},
+    }
+    modes = {'baseline': SQLITE_BASELINE_SETTINGS, 'production': settings.SQLITE_PRODUCTION_SETTINGS}
+    results = {}
+    with benchmark_settings(), override_settings(**overrides):
+        for mode, mode_settings in modes.items():
+            with sqlite_mode(mode_settings):
+                results[mode] = run_sqlite_load(urls, readers, writers, duration)
+                view_counter.flush()
+    return results
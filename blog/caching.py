@@ -0,0 +1,137 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+GENERATION_KEY = 'blog:generation:{}'
+RESPONSE_KEY = 'blog:response:{}'
+
+DEFAULTS = {
+    'TIMEOUT': 60 * 60,
+    'GENERATIONS_CACHE': 'default',
+    'WORKERS': 1,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'BLOG_RESPONSE_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def generation_cache():
+    # Покоління мають бачити всі процеси: воркери і команди керування, тож вони живуть в окремому
+    # спільному кеші, а тіла відповідей можуть лишатися локальними, бо ключ містить покоління
+    return caches[get_setting('GENERATIONS_CACHE')]
+
+
+def get_generations(resources):
+    store = generation_cache()
+    keys = {resource: GENERATION_KEY.format(resource) for resource in resources}
+    stored = store.get_many(keys.values())
+    generations = {}
+    for resource, key in keys.items():
+        generation = stored.get(key)
+        if generation is None:
+            # Втрачене покоління вважаємо щойно зміненим, щоб не віддати застарілу відповідь
+            store.add(key, _now_ms(), None)
+            generation = store.get(key)
+        generations[resource] = generation
+    return generations
+
+
+async def aget_generations(resources):
+    store = generation_cache()
+    keys = {resource: GENERATION_KEY.format(resource) for resource in resources}
+    stored = await store.aget_many(keys.values())
+    generations = {}
+    for resource, key in keys.items():
+        generation = stored.get(key)
+        if generation is None:
+            await store.aadd(key, _now_ms(), None)
+            generation = await store.aget(key)
+        generations[resource] = generation
+    return generations
+
+
+def request_fingerprint(request, generations, *extra):
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    versions = ','.join(f'{resource}={generations[resource]}' for resource in sorted(generations))
+    raw = '|'.join([f'{request.get_host()}{request.path}?{query}', versions, *extra])
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def response_cache_key(request, generations):
+    return RESPONSE_KEY.format(request_fingerprint(request, generations))
+
+
+def build_validators(request, generations, renderer_format=''):
+    return {
+        'etag': f'W/"{request_fingerprint(request, generations, renderer_format)}"',
+        'last_modified': int(max(generations.values()) / 1000),
+    }
+
+
+def apply_validators(response, validators):
+    response.headers['ETag'] = validators['etag']
+    response.headers['Last-Modified'] = http_date(validators['last_modified'])
+    return response
+
+
+def bump_generation(*resources):
+    store = generation_cache()
+    for resource in resources:
+        key = GENERATION_KEY.format(resource)
+        current = store.get(key) or 0
+        store.set(key, max(_now_ms(), current + 1), None)
+
+
+class CachedResponseMixin:
+    cache_resources = ()
+    conditional_get = False
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.response_cache_key = None
+        self.response_cache_hit = False
+        self.response_validators = None
+        if request.method != 'GET' or not self.cache_resources:
+            return
+        generations = get_generations(self.cache_resources)
+        if self.conditional_get:
+            self.response_validators = self.get_validators(request, generations)
+            not_modified = get_conditional_response(request._request, **self.response_validators)
+            if not_modified is not None:
+                self.get = lambda request, *args, **kwargs: not_modified
+                return
+        self.response_cache_key = self.get_response_cache_key(request, generations)
+        data = cache.get(self.response_cache_key)
+        if data is not None:
+            self.response_cache_hit = True
+            self.get = lambda request, *args, **kwargs: self.get_cached_response(request, data, *args, **kwargs)
+
+    def get_response_cache_key(self, request, generations):
+        return response_cache_key(request, generations)
+
+    def get_validators(self, request, generations):
+        renderer = getattr(request, 'accepted_renderer', None)
+        return build_validators(request, generations, getattr(renderer, 'format', ''))
+
+    def get_cached_response(self, request, data, *args, **kwargs):
+        return Response(data)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        key = getattr(self, 'response_cache_key', None)
+        if key and not self.response_cache_hit and response.status_code == 200:
+            cache.set(key, response.data, get_setting('TIMEOUT'))
+        validators = getattr(self, 'response_validators', None)
+        if validators and response.status_code in (200, 304):
+            apply_validators(response, validators)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,119 @@
+import datetime
+
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import Category, Post, Comment, ChangeLogEntry
+from .serializers import CategorySerializer, CommentSerializer, PostListSerializer
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+BATCH_SIZE = 500
+
+RESOURCES = {
+    Post: 'post',
+    Comment: 'comment',
+    Category: 'category',
+}
+
+
+class ChangesExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'Токен застарів: журнал змін уже очищено, потрібна повна синхронізація.'
+    default_code = 'changes_expired'
+
+
+def record_change(instance, action):
+    ChangeLogEntry.objects.create(resource=RESOURCES[type(instance)], object_id=instance.pk, action=action)
+
+
+def record_changes(resource, object_ids, action):
+    ChangeLogEntry.objects.bulk_create(
+        [ChangeLogEntry(resource=resource, object_id=object_id, action=action) for object_id in object_ids],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def latest_token():
+    return ChangeLogEntry.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def parse_token(value):
+    try:
+        token = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({'since': 'Токен має бути цілим числом.'})
+    if token < 0:
+        raise ValidationError({'since': 'Токен має бути цілим числом.'})
+    return token
+
+
+def check_token(since):
+    # Якщо найстаріший запис новіший за токен, частину змін уже видалено
+    oldest = ChangeLogEntry.objects.order_by('id').values_list('id', flat=True).first()
+    if oldest is not None and since < oldest - 1:
+        raise ChangesExpired()
+
+
+def _visible_objects(resource, ids):
+    if resource == 'post':
+        return Post.objects.for_list().filter(published_at__isnull=False).in_bulk(ids)
+    if resource == 'comment':
+        return Comment.objects.for_thread().filter(
+            is_approved=True, post__published_at__isnull=False
+        ).in_bulk(ids)
+    return Category.objects.in_bulk(ids)
+
+
+def _serialize(resource, obj, context):
+    if resource == 'post':
+        return PostListSerializer(obj, context=context).data
+    if resource == 'comment':
+        return CommentSerializer(obj, context=dict(context, comment_depth=0)).data
+    return CategorySerializer(obj, context=context).data
+
+
+def build_changes(since, limit, context):
+    entries = list(ChangeLogEntry.objects.filter(id__gt=since).order_by('id')[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # У межах сторінки лишаємо тільки останній запис для кожного обʼєкта
+    latest = {}
+    for entry in entries:
+        latest.pop((entry.resource, entry.object_id), None)
+        latest[(entry.resource, entry.object_id)] = entry
+
+    ids_by_resource = {}
+    for resource, object_id in latest:
+        ids_by_resource.setdefault(resource, []).append(object_id)
+    objects = {
+        resource: _visible_objects(resource, ids)
+        for resource, ids in ids_by_resource.items()
+    }
+
+    changes = []
+    for (resource, object_id), entry in latest.items():
+        obj = objects[resource].get(object_id)
+        # Приховані об'єкти (чернетки, несхвалені коментарі) для клієнта еквівалентні видаленим
+        action = entry.action if obj is not None else 'deleted'
+        changes.append({
+            'token': entry.id,
+            'resource': resource,
+            'id': object_id,
+            'action': action,
+            'data': _serialize(resource, obj, context) if obj is not None else None,
+        })
+    return {
+        'since': since,
+        'next_since': entries[-1].id if entries else since,
+        'has_more': has_more,
+        'changes': changes,
+    }
+
+
+def prune_changes(days):
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    deleted, _ = ChangeLogEntry.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+from .caching import get_setting
+
+# Бекенди, вміст яких бачить лише поточний процес
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_generation_cache(app_configs, **kwargs):
+    alias = get_setting('GENERATIONS_CACHE')
+    if alias not in settings.CACHES:
+        return [Error(
+            f"Кеш поколінь '{alias}' не описаний у CACHES.",
+            hint="Додайте його до CACHES або змініть BLOG_RESPONSE_CACHE['GENERATIONS_CACHE'].",
+            id='blog.E001',
+        )]
+    if settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_BACKENDS:
+        return []
+    if get_setting('WORKERS') > 1:
+        return [Error(
+            f"Кеш поколінь '{alias}' локальний для процесу, а воркерів {get_setting('WORKERS')}: "
+            'зміни з одного воркера не інвалідують відповіді інших.',
+            hint='Використайте файловий кеш, Redis або Memcached для лічильників поколінь.',
+            id='blog.E002',
+        )]
+    return [Warning(
+        f"Кеш поколінь '{alias}' локальний для процесу: команди керування не інвалідують відповіді сервера.",
+        hint='Використайте файловий кеш, Redis або Memcached для лічильників поколінь.',
+        id='blog.W001',
+    )]
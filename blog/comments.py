@@ -0,0 +1,90 @@
+from collections import namedtuple
+
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.urls import reverse
+from rest_framework.utils.urls import replace_query_param
+
+from .pagination import CommentCursorPagination
+
+# Скільки рівнів відповідей показується під коментарем верхнього рівня
+COMMENT_DEPTH = 3
+
+CommentPage = namedtuple('CommentPage', ['comments', 'next_position'])
+
+
+def first_page_queryset(queryset, post_ids, page_size):
+    roots = queryset.filter(parent__isnull=True).order_by('post_id', 'created_at', 'id')
+    if len(post_ids) == 1:
+        return roots.filter(post_id=post_ids[0])[:page_size + 1]
+    # Перші сторінки кількох статей одним запитом
+    position = Window(RowNumber(), partition_by=F('post_id'), order_by=[F('created_at').asc(), F('id').asc()])
+    return roots.filter(post_id__in=post_ids).annotate(thread_position=position).filter(thread_position__lte=page_size + 1)
+
+
+def split_pages(posts, roots, page_size):
+    paginator = CommentCursorPagination()
+    by_post = {post.pk: [] for post in posts}
+    for comment in roots:
+        by_post[comment.post_id].append(comment)
+    for post in posts:
+        comments = by_post[post.pk]
+        has_next = len(comments) > page_size
+        comments = comments[:page_size]
+        post.comment_page = CommentPage(comments, paginator.get_position(comments[-1]) if has_next else None)
+    return [comment for post in posts for comment in post.comment_page.comments]
+
+
+def _link_level(level, replies):
+    by_id = {comment.pk: comment for comment in level}
+    for reply in replies:
+        reply.thread_replies = []
+        by_id[reply.parent_id].thread_replies.append(reply)
+
+
+def attach_replies(roots, queryset, depth=COMMENT_DEPTH):
+    # Відповіді довантажуються рівнями: один запит на рівень вкладеності для всієї сторінки
+    level = list(roots)
+    for comment in level:
+        comment.thread_replies = []
+    while level and depth > 0:
+        replies = list(queryset.filter(parent_id__in=[comment.pk for comment in level]).order_by('created_at', 'id'))
+        _link_level(level, replies)
+        level = replies
+        depth -= 1
+    return roots
+
+
+async def aattach_replies(roots, queryset, depth=COMMENT_DEPTH):
+    level = list(roots)
+    for comment in level:
+        comment.thread_replies = []
+    while level and depth > 0:
+        filtered = queryset.filter(parent_id__in=[comment.pk for comment in level]).order_by('created_at', 'id')
+        replies = [reply async for reply in filtered]
+        _link_level(level, replies)
+        level = replies
+        depth -= 1
+    return roots
+
+
+def load_comment_pages(posts, queryset, depth=COMMENT_DEPTH):
+    page_size = CommentCursorPagination.page_size
+    roots = list(first_page_queryset(queryset, [post.pk for post in posts], page_size))
+    attach_replies(split_pages(posts, roots, page_size), queryset, depth)
+
+
+async def aload_comment_pages(posts, queryset, depth=COMMENT_DEPTH):
+    page_size = CommentCursorPagination.page_size
+    roots = [comment async for comment in first_page_queryset(queryset, [post.pk for post in posts], page_size)]
+    await aattach_replies(split_pages(posts, roots, page_size), queryset, depth)
+
+
+def comment_page_link(request, post_id, position):
+    if position is None:
+        return None
+    paginator = CommentCursorPagination()
+    url = reverse('blog:post_comments', kwargs={'post_id': post_id})
+    if request is not None:
+        url = request.build_absolute_uri(url)
+    return replace_query_param(url, paginator.cursor_query_param, paginator.encode_cursor(position))
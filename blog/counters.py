@@ -0,0 +1,32 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import User, Category, Post, Comment
+
+
+def shift_counter(model, pk, field, delta):
+    if pk is None or not delta:
+        return
+    model.objects.filter(pk=pk).update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def _count_subquery(queryset, group_by):
+    counts = queryset.order_by().values(group_by).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts), 0)
+
+
+def counter_definitions():
+    return [
+        (User, 'post_count', _count_subquery(Post.objects.filter(author=OuterRef('pk')), 'author')),
+        (Category, 'post_count', _count_subquery(Post.objects.filter(category=OuterRef('pk')), 'category')),
+        (Post, 'comment_count', _count_subquery(Comment.objects.filter(post=OuterRef('pk'), is_approved=True), 'post')),
+    ]
+
+
+def recount_counters(dry_run=False):
+    repaired = {}
+    for model, field, actual in counter_definitions():
+        stale = model.objects.alias(actual=actual).exclude(**{field: F('actual')})
+        label = f'{model._meta.model_name}.{field}'
+        repaired[label] = stale.count() if dry_run else stale.update(**{field: actual})
+    return repaired
@@ -0,0 +1,144 @@
+import csv
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Post, Comment
+
+CHUNK_SIZE = 2000
+
+CSV_COLUMNS = [
+    'type', 'id', 'post_id', 'parent_id', 'title', 'excerpt', 'content', 'author', 'category',
+    'status', 'views', 'is_approved', 'published_at', 'created_at', 'updated_at',
+]
+
+
+def post_record(post):
+    return {
+        'type': 'post',
+        'id': post.pk,
+        'title': post.title,
+        'excerpt': post.excerpt,
+        'content': post.content,
+        'author': post.author.username,
+        'category': post.category.name if post.category_id else None,
+        'status': post.status,
+        'views': post.views,
+        'published_at': post.published_at,
+        'created_at': post.created_at,
+        'updated_at': post.updated_at,
+    }
+
+
+def comment_record(comment):
+    return {
+        'type': 'comment',
+        'id': comment.pk,
+        'post_id': comment.post_id,
+        'parent_id': comment.parent_id,
+        'content': comment.content,
+        'author': comment.author.username,
+        'is_approved': comment.is_approved,
+        'created_at': comment.created_at,
+    }
+
+
+def iter_records(published_only=False, include_comments=False, chunk_size=CHUNK_SIZE):
+    posts = Post.objects.select_related('author', 'category').order_by('id')
+    if published_only:
+        posts = posts.filter(published_at__isnull=False)
+    posts = posts.iterator(chunk_size=chunk_size)
+    if not include_comments:
+        for post in posts:
+            yield post_record(post)
+        return
+
+    # Обидва курсори впорядковані за id статті, тож коментарі зливаються зі статтями за один прохід
+    comments = Comment.objects.select_related('author').order_by('post_id', 'id').iterator(chunk_size=chunk_size)
+    pending = next(comments, None)
+    for post in posts:
+        yield post_record(post)
+        while pending is not None and pending.post_id <= post.pk:
+            if pending.post_id == post.pk:
+                yield comment_record(pending)
+            pending = next(comments, None)
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class NDJSONExporter:
+    content_type = 'application/x-ndjson'
+    extension = 'ndjson'
+
+    def __init__(self):
+        self.encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+    def header(self):
+        return []
+
+    def render(self, record):
+        return self.encoder.encode(record) + '\n'
+
+
+class CSVExporter:
+    content_type = 'text/csv'
+    extension = 'csv'
+
+    def __init__(self):
+        self.writer = csv.DictWriter(Echo(), fieldnames=CSV_COLUMNS, extrasaction='ignore')
+
+    def header(self):
+        return [self.writer.writeheader()]
+
+    def render(self, record):
+        row = {name: self._cell(value) for name, value in record.items()}
+        return self.writer.writerow(row)
+
+    def _cell(self, value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+
+EXPORTERS = {
+    'ndjson': NDJSONExporter,
+    'csv': CSVExporter,
+}
+
+
+def stream_export(output='ndjson', **options):
+    exporter = EXPORTERS[output]()
+    yield from exporter.header()
+    for record in iter_records(**options):
+        yield exporter.render(record)
+
+
+def buffered(lines, size=64 * 1024):
+    # Склеюємо рядки в шматки, щоб не віддавати клієнту тисячі дрібних фрагментів
+    buffer = []
+    length = 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+async def aiter_chunks(chunks):
+    # Синхронний генератор Django під ASGI спершу повністю збирає у список. Тут кожен шматок
+    # дістається окремим викликом у потоці запиту (thread_sensitive), тож серверний курсор БД
+    # весь час лишається в одному потоці, а пам'ять обмежена одним шматком
+    chunks = iter(chunks)
+    pull = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await pull(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close, thread_sensitive=True)()
@@ -0,0 +1,54 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.benchmarks import DATASET_SIZES, benchmark_database, run_concurrency_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Порівнює пропускну здатність синхронних (WSGI, пул потоків) і асинхронних (ASGI) '
+        'публічних ендпоінтів блогу під конкурентним навантаженням.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=sorted(DATASET_SIZES), default='small')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=200, help='Кількість запитів на маршрут і режим.')
+        parser.add_argument('--warm-cache', action='store_true', help='Не вимикати кеш відповідей.')
+        parser.add_argument('--keepdb', action='store_true', help='Не видаляти тестову базу між запусками.')
+        parser.add_argument('--output', type=Path, help='Записати результати у JSON-файл.')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('--concurrency і --requests мають бути додатними.')
+
+        with benchmark_database(options['size'], options['seed'], options['workers'], options['keepdb']):
+            results = run_concurrency_benchmarks(
+                concurrency=options['concurrency'],
+                total=options['requests'],
+                cold=not options['warm_cache'],
+            )
+
+        self.stdout.write(
+            f"{'route':<22}{'sync rps':>10}{'async rps':>11}{'sync p95':>10}{'async p95':>11}{'ratio':>8}"
+        )
+        errors = []
+        for name, result in results.items():
+            sync, async_ = result['sync'], result['async']
+            ratio = async_['rps'] / sync['rps'] if sync['rps'] else 0.0
+            self.stdout.write(
+                f"{name:<22}{sync['rps']:>10.1f}{async_['rps']:>11.1f}"
+                f"{sync['p95_ms']:>10.2f}{async_['p95_ms']:>11.2f}{ratio:>8.2f}"
+            )
+            if sync['errors'] or async_['errors']:
+                errors.append(f"{name}: помилок sync={sync['errors']}, async={async_['errors']}")
+
+        if options['output']:
+            options['output'].write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding='utf-8')
+        if errors:
+            raise CommandError('Частина запитів завершилась помилкою:\n  ' + '\n  '.join(errors))
+        self.stdout.write(self.style.SUCCESS(f"Конкурентність {options['concurrency']}, запитів на режим {options['requests']}."))
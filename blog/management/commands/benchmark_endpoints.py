@@ -0,0 +1,60 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.benchmarks import DATASET_SIZES, benchmark_database, compare_results, run_endpoint_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Наповнює тестову базу, проганяє всі маршрути blog/urls.py і перевіряє '
+        'бюджети SQL-запитів та регресії затримки відносно базової лінії.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=sorted(DATASET_SIZES), default='small')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--warm-cache', action='store_true', help='Не очищати кеш відповідей між запитами.')
+        parser.add_argument('--keepdb', action='store_true', help='Не видаляти тестову базу між запусками.')
+        parser.add_argument('--baseline', type=Path, help='JSON-файл базової лінії для порівняння.')
+        parser.add_argument('--save-baseline', action='store_true', help='Записати результати у --baseline.')
+        parser.add_argument('--max-regression', type=float, default=0.25, help='Допустиме зростання p95 (частка).')
+        parser.add_argument('--output', type=Path, help='Записати результати у JSON-файл.')
+
+    def handle(self, *args, **options):
+        baseline_path = options['baseline']
+        if options['save_baseline'] and baseline_path is None:
+            raise CommandError('--save-baseline потребує --baseline.')
+        baseline = None
+        if baseline_path is not None and baseline_path.exists() and not options['save_baseline']:
+            baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+
+        with benchmark_database(options['size'], options['seed'], options['workers'], options['keepdb']):
+            results = run_endpoint_benchmarks(
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+                cold=not options['warm_cache'],
+            )
+
+        self.stdout.write(f"{'route':<22}{'status':>7}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'bytes':>10}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<22}{result['status']:>7}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+                f"{result['queries']:>9}{result['bytes']:>10}"
+            )
+
+        payload = json.dumps(results, indent=2, ensure_ascii=False)
+        if options['output']:
+            options['output'].write_text(payload, encoding='utf-8')
+        if options['save_baseline']:
+            baseline_path.write_text(payload, encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f"Базову лінію записано у {baseline_path}"))
+
+        failures = compare_results(results, baseline, options['max_regression'])
+        if failures:
+            raise CommandError('Порушено бюджети продуктивності:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Усі ендпоінти в межах бюджетів.'))
@@ -0,0 +1,55 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from blog.benchmarks import DATASET_SIZES, benchmark_database, run_sqlite_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Порівнює пропускну здатність SQLite у типовій конфігурації Django і в режимі production '
+        '(WAL, прагми, постійні з\'єднання) під одночасними читаннями і записами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=sorted(DATASET_SIZES), default='small')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--readers', type=int, default=8, help='Кількість потоків, що читають через ендпоінти.')
+        parser.add_argument('--writers', type=int, default=2, help='Кількість потоків, що додають коментарі.')
+        parser.add_argument('--duration', type=float, default=5.0, help='Тривалість навантаження на режим, с.')
+        parser.add_argument('--output', type=Path, help='Записати результати у JSON-файл.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Бенчмарк призначений лише для SQLite.')
+        if options['readers'] < 0 or options['writers'] < 0 or options['readers'] + options['writers'] == 0:
+            raise CommandError('Потрібен хоча б один потік читання або запису.')
+        if options['duration'] <= 0:
+            raise CommandError('--duration має бути додатним.')
+
+        with tempfile.TemporaryDirectory() as directory:
+            test_name = str(Path(directory) / 'benchmark.sqlite3')
+            with benchmark_database(options['size'], options['seed'], options['workers'], test_name=test_name):
+                results = run_sqlite_benchmarks(options['readers'], options['writers'], options['duration'])
+
+        self.stdout.write(
+            f"{'mode':<12}{'reads/s':>10}{'writes/s':>10}{'read p95':>10}{'write p95':>11}{'errors':>8}"
+        )
+        for mode, result in results.items():
+            read, write = result['read'], result['write']
+            self.stdout.write(
+                f"{mode:<12}{read['ops_per_s']:>10.1f}{write['ops_per_s']:>10.1f}"
+                f"{read['p95_ms']:>10.2f}{write['p95_ms']:>11.2f}{read['errors'] + write['errors']:>8}"
+            )
+
+        if options['output']:
+            options['output'].write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding='utf-8')
+        baseline, production = results['baseline'], results['production']
+        for kind, label in (('read', 'читань'), ('write', 'записів')):
+            if baseline[kind]['ops_per_s']:
+                ratio = production[kind]['ops_per_s'] / baseline[kind]['ops_per_s']
+                self.stdout.write(f"Пропускна здатність {label}: x{ratio:.2f} у режимі production.")
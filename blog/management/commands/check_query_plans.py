@@ -0,0 +1,180 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from blog.models import User, Post, Comment, PostActivity, StatisticsRollup
+from blog.pagination import (
+    CommentCursorPagination, PostCursorPagination, PopularPostCursorPagination, PopularPostFallbackPagination,
+)
+from blog.trending import fallback_queryset, hour_of, trending_queryset
+from blog.views import PostListAPIView, CategoryPostListAPIView, PostCommentListAPIView
+
+
+def _first_page(pagination_class, queryset, position=None):
+    paginator = pagination_class()
+    query = {} if position is None else {paginator.cursor_query_param: paginator.encode_cursor(position)}
+    request = Request(APIRequestFactory().get('/', query))
+    paginator.page_size = paginator.get_page_size(request)
+    return paginator.get_page_segments(queryset, request)[0][:paginator.page_size + 1]
+
+
+def _seeks(plan, index):
+    # Сторінка за курсором має починатися з пошуку в індексі, а не з його сканування від початку
+    if connection.vendor == 'sqlite':
+        return any('SEARCH' in line and index in line for line in plan.splitlines())
+    if connection.vendor == 'postgresql':
+        return index in plan and 'Index Cond' in plan
+    return index in plan
+
+
+def query_plans():
+    return [
+        (
+            'post_list',
+            lambda: _first_page(PostCursorPagination, PostListAPIView().get_queryset()),
+            'blog_post_published_idx',
+        ),
+        (
+            'category_posts',
+            lambda: _first_page(
+                PostCursorPagination, CategoryPostListAPIView(kwargs={'category_id': 1}).get_queryset()
+            ),
+            'blog_post_category_pub_idx',
+        ),
+        (
+            'author_posts',
+            lambda: _first_page(PostCursorPagination, Post.objects.for_list().filter(author_id=1)),
+            'blog_post_author_pub_idx',
+        ),
+        (
+            'popular_posts',
+            lambda: _first_page(PopularPostCursorPagination, trending_queryset('week')),
+            'blog_trending_rank_idx',
+        ),
+        (
+            'popular_posts_category',
+            lambda: _first_page(PopularPostCursorPagination, trending_queryset('week', 1)),
+            'blog_trending_category_idx',
+        ),
+        (
+            'popular_posts_fallback',
+            lambda: _first_page(PopularPostFallbackPagination, fallback_queryset(Post.objects.for_list())),
+            'blog_post_views_idx',
+        ),
+        (
+            'trending_activity_prune',
+            lambda: PostActivity.objects.filter(hour__lte=hour_of(timezone.now()) - 30 * 24),
+            'blog_postactivity_hour_idx',
+        ),
+        (
+            'statistics_top_posts',
+            lambda: Post.objects.for_list().order_by('-views', '-id')[:5],
+            'blog_post_views_idx',
+        ),
+        (
+            'statistics_top_authors',
+            lambda: User.objects.filter(post_count__gt=0).order_by('-post_count', 'id')[:3],
+            'blog_user_post_count_idx',
+        ),
+        (
+            'statistics_rollup',
+            lambda: StatisticsRollup.objects.filter(category_id=1),
+            'blog_statisticsrollup_category_id',
+        ),
+        (
+            'post_comments_page',
+            lambda: _first_page(
+                CommentCursorPagination, PostCommentListAPIView(kwargs={'post_id': 1}).get_queryset()
+            ),
+            'blog_comment_thread_idx',
+        ),
+        (
+            'comment_replies',
+            lambda: Comment.objects.for_thread().approved().filter(parent_id__in=[1, 2]).order_by('created_at', 'id'),
+            'blog_comment_parent_id',
+        ),
+        (
+            'approved_comments',
+            lambda: Comment.objects.filter(post_id=1, is_approved=True).order_by('created_at'),
+            'blog_comment_approved_idx',
+        ),
+        (
+            'user_email_lookup',
+            lambda: User.objects.alias(email_lower=Lower('email')).filter(email_lower='user@example.com'),
+            'blog_user_email_lower_idx',
+        ),
+    ]
+
+
+def cursor_query_plans():
+    moment = timezone.now().isoformat()
+    return [
+        (
+            'post_list_cursor',
+            lambda: _first_page(PostCursorPagination, PostListAPIView().get_queryset(), [moment, 1000]),
+            'blog_post_published_idx',
+        ),
+        (
+            'category_posts_cursor',
+            lambda: _first_page(
+                PostCursorPagination, CategoryPostListAPIView(kwargs={'category_id': 1}).get_queryset(), [moment, 1000]
+            ),
+            'blog_post_category_pub_idx',
+        ),
+        (
+            'author_posts_cursor',
+            lambda: _first_page(PostCursorPagination, Post.objects.for_list().filter(author_id=1), [moment, 1000]),
+            'blog_post_author_pub_idx',
+        ),
+        (
+            'post_comments_cursor',
+            lambda: _first_page(
+                CommentCursorPagination, PostCommentListAPIView(kwargs={'post_id': 1}).get_queryset(), [moment, 1000]
+            ),
+            'blog_comment_thread_idx',
+        ),
+        (
+            'popular_posts_cursor',
+            lambda: _first_page(PopularPostCursorPagination, trending_queryset('week'), [10.0, 1000]),
+            'blog_trending_rank_idx',
+        ),
+        (
+            'popular_posts_fallback_cursor',
+            lambda: _first_page(
+                PopularPostFallbackPagination, fallback_queryset(Post.objects.for_list()), [100, 1000]
+            ),
+            'blog_post_views_idx',
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Перевіряє через EXPLAIN, що запити ендпоінтів блогу використовують очікувані індекси.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Виводити повний план кожного запиту.')
+
+    def handle(self, *args, **options):
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # На малих таблицях Postgres обирає seq scan, тож перевіряємо саме придатність індексів
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            checks = [(*entry, False) for entry in query_plans()]
+            checks += [(*entry, True) for entry in cursor_query_plans()]
+            for label, build_queryset, expected_index, seek in checks:
+                plan = build_queryset().explain()
+                ok = _seeks(plan, expected_index) if seek else expected_index in plan
+                if not ok:
+                    failures.append(label)
+                status = self.style.SUCCESS('OK') if ok else self.style.ERROR('FAIL')
+                self.stdout.write(f"{status} {label}: очікується {expected_index}")
+                if options['verbose_plans'] or not ok:
+                    self.stdout.write('    ' + plan.replace('\n', '\n    '))
+        if failures:
+            raise CommandError(f"Запити без очікуваних індексів: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('Усі запити використовують індекси.'))
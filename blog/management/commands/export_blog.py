@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from blog.export import CHUNK_SIZE, EXPORTERS, buffered, stream_export
+
+
+class Command(BaseCommand):
+    help = 'Потоково вивантажує статті (і за потреби коментарі) у NDJSON або CSV зі сталим споживанням пам\'яті.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', choices=sorted(EXPORTERS), default='ndjson')
+        parser.add_argument('--file', help='Шлях до файлу; за замовчуванням stdout.')
+        parser.add_argument('--comments', action='store_true', help='Додати коментарі після кожної статті.')
+        parser.add_argument('--published', action='store_true', help='Лише опубліковані статті.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        chunks = buffered(stream_export(
+            options['output'],
+            published_only=options['published'],
+            include_comments=options['comments'],
+            chunk_size=options['chunk_size'],
+        ))
+        if options['file']:
+            with open(options['file'], 'w', encoding='utf-8', newline='') as stream:
+                for chunk in chunks:
+                    stream.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Вивантаження записано у {options['file']}"))
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -1,202 +1,300 @@
-from django.core.management.base import BaseCommand
-from django.apps import apps
-from django.contrib.auth import get_user_model
-from django.utils.text import slugify
-from django.db import IntegrityError
-import random
 import datetime
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from blog.caching import bump_generation
+from blog.counters import recount_counters
+from blog.models import User, Category, Post, Comment, PostActivity, count_words
+from blog.search import get_backend
+from blog.statistics import refresh_all_rollups
+from blog.trending import get_setting as get_trending_setting, hour_of, refresh_trending
+
+FALLBACK_WORDS = [
+    'lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'adipiscing', 'elit', 'sed', 'do',
+    'eiusmod', 'tempor', 'incididunt', 'ut', 'labore', 'et', 'dolore', 'magna', 'aliqua', 'enim',
+    'ad', 'minim', 'veniam', 'quis', 'nostrud', 'exercitation', 'ullamco', 'laboris', 'nisi', 'aliquip',
+]
+
+
+GENERATOR_OPTIONS = (
+    'posts', 'comments', 'seed', 'draft_ratio', 'approval_ratio', 'reply_ratio',
+    'max_depth', 'min_words', 'max_words', 'days',
+)
+
+
+def load_vocabulary():
+    try:
+        from faker.providers.lorem.en_US import Provider
+        return list(Provider.word_list)
+    except Exception:
+        return FALLBACK_WORDS
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _sentence(rng, words, min_words, max_words):
+    return ' '.join(rng.choices(words, k=rng.randint(min_words, max_words))).capitalize() + '.'
+
+
+def _text(rng, words, word_count):
+    sentences = []
+    remaining = word_count
+    while remaining > 0:
+        size = min(remaining, rng.randint(6, 18))
+        sentences.append(' '.join(rng.choices(words, k=size)).capitalize() + '.')
+        remaining -= size
+    paragraphs = [' '.join(sentences[i:i + 5]) for i in range(0, len(sentences), 5)]
+    return '\n\n'.join(paragraphs)
+
+
+def _activity(rng, published_at, views, comments, now, hours):
+    # Погодинна активність за останні `hours` годин: нові статті отримують усі свої перегляди,
+    # невелика частка старих — трохи «довгого хвоста»
+    now_hour = hour_of(now)
+    earliest = now_hour - hours + 1
+    buckets = {}
+    first = max(hour_of(published_at), earliest)
+    recent_views = views
+    if first > now_hour:
+        first, recent_views = earliest, (views // 20 if rng.random() < 0.05 else 0)
+    if recent_views:
+        spread = min(24, now_hour - first + 1)
+        for _ in range(spread):
+            buckets.setdefault(rng.randint(first, now_hour), [0, 0])[0] += recent_views // spread
+    for comment in comments:
+        hour = hour_of(comment['created_at'])
+        if comment['is_approved'] and hour >= earliest:
+            buckets.setdefault(hour, [0, 0])[1] += 1
+    return [(hour, counts[0], counts[1]) for hour, counts in sorted(buckets.items()) if any(counts)]
+
+
+def generate_chunk(task):
+    # Кожен чанк має власний генератор, тож результат не залежить від кількості процесів
+    options = task['options']
+    rng = random.Random(f"{options['seed']}:{task['index']}")
+    # Окремий генератор, щоб активність не зсувала решту згенерованих даних
+    activity_rng = random.Random(f"{options['seed']}:{task['index']}:activity")
+    words = task['words']
+    now = task['now']
+    span = datetime.timedelta(days=options['days'])
+    published_posts = options['posts'] * (1 - options['draft_ratio'])
+    comments_per_post = options['comments'] / max(published_posts, 1)
+
+    posts = []
+    for _ in range(task['size']):
+        is_draft = rng.random() < options['draft_ratio']
+        created_at = now - span * rng.random()
+        published_at = None if is_draft else min(created_at + datetime.timedelta(hours=rng.random() * 48), now)
+        content = _text(rng, words, rng.randint(options['min_words'], options['max_words']))
+        views = 0 if is_draft else min(int(rng.paretovariate(1.16) * 10) - 10, 10_000_000)
+
+        comments = []
+        if not is_draft:
+            total = round(rng.expovariate(1 / comments_per_post)) if comments_per_post > 0 else 0
+            for index in range(total):
+                parent = None
+                depth = 0
+                if comments and rng.random() < options['reply_ratio']:
+                    candidates = [i for i, c in enumerate(comments) if c['depth'] < options['max_depth']]
+                    if candidates:
+                        parent = rng.choice(candidates)
+                        depth = comments[parent]['depth'] + 1
+                earliest = comments[parent]['created_at'] if parent is not None else published_at
+                comments.append({
+                    'index': index,
+                    'parent': parent,
+                    'depth': depth,
+                    'author': rng.randrange(options['authors']),
+                    'content': _sentence(rng, words, 4, 30),
+                    'is_approved': rng.random() < options['approval_ratio'],
+                    'created_at': min(earliest + datetime.timedelta(minutes=rng.expovariate(1 / 600)), now),
+                })
+
+        posts.append({
+            'title': _sentence(rng, words, 4, 10)[:200],
+            'excerpt': _sentence(rng, words, 10, 30)[:300],
+            'content': content,
+            'word_count': count_words(content),
+            'author': rng.randrange(options['authors']),
+            'category': rng.randrange(options['categories']) if options['categories'] else None,
+            'status': 'draft' if is_draft else 'published',
+            'views': max(views, 0),
+            'created_at': created_at,
+            'updated_at': published_at or created_at,
+            'published_at': published_at,
+            'comments': comments,
+            'activity': _activity(
+                activity_rng, published_at, max(views, 0), comments, now, task['activity_hours']
+            ) if not is_draft else [],
+        })
+    return posts
+
 
 class Command(BaseCommand):
+    help = 'Генерує тестовий набір даних блогу (до мільйонів статей і коментарів) пакетними вставками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=3)
+        parser.add_argument('--categories', type=int, default=5)
+        parser.add_argument('--posts', type=int, default=20)
+        parser.add_argument('--comments', type=int, default=50, help='Орієнтовна загальна кількість коментарів.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--workers', type=int, default=1, help='Кількість процесів для генерації тексту.')
+        parser.add_argument('--draft-ratio', type=float, default=0.2)
+        parser.add_argument('--approval-ratio', type=float, default=0.8)
+        parser.add_argument('--reply-ratio', type=float, default=0.4)
+        parser.add_argument('--max-depth', type=int, default=3)
+        parser.add_argument('--min-words', type=int, default=150)
+        parser.add_argument('--max-words', type=int, default=800)
+        parser.add_argument('--days', type=int, default=3 * 365, help='Глибина архіву в днях.')
+        parser.add_argument('--password', default='pass1234')
+
     def handle(self, *args, **options):
-        fake = None
-        try:
-            from faker import Faker
-            fake = Faker()
-        except Exception:
-            fake = None
-
-        def gen_sentence():
-            if fake:
-                return fake.sentence(nb_words=6)
-            words = ["lorem","ipsum","dolor","sit","amet","consectetur","adipiscing","elit","sed","do"]
-            return " ".join(random.choices(words, k=8)).capitalize() + "."
-
-        def gen_paragraph():
-            if fake:
-                return "\n\n".join(fake.paragraphs(nb=3))
-            return "\n\n".join(gen_sentence() for _ in range(6))
-
-        def get_model_by_names(names):
-            for name in names:
-                try:
-                    return apps.get_model('blog', name)
-                except LookupError:
-                    continue
-            return None
-
-        AuthorModel = get_model_by_names(['Author', 'Profile'])
-        if AuthorModel is None:
-            try:
-                AuthorModel = get_user_model()
-            except Exception:
-                AuthorModel = None
-
-        CategoryModel = get_model_by_names(['Category', 'BlogCategory'])
-        TagModel = get_model_by_names(['Tag', 'Label'])
-        ArticleModel = get_model_by_names(['Article', 'Post', 'BlogPost'])
-        CommentModel = get_model_by_names(['Comment', 'Feedback', 'PostComment'])
-
-        created = {'authors': [], 'categories': [], 'tags': [], 'articles': [], 'comments': []}
-
-        def create_instance(Model, defaults):
-            if Model is None:
-                return None
-            try:
-                if getattr(Model.objects, 'create_user', None):
-                    u_kwargs = {}
-                    if 'username' in defaults:
-                        u_kwargs['username'] = defaults.get('username')
-                    if 'email' in defaults:
-                        u_kwargs['email'] = defaults.get('email')
-                    password = defaults.pop('password', 'password123')
-                    try:
-                        return Model.objects.create_user(**u_kwargs, password=password)
-                    except Exception:
-                        return Model.objects.create(**{k: v for k, v in defaults.items() if k in [f.name for f in Model._meta.fields]})
-                else:
-                    valid = {f.name for f in Model._meta.fields}
-                    create_kwargs = {k: v for k, v in defaults.items() if k in valid}
-                    return Model.objects.create(**create_kwargs)
-            except IntegrityError:
-                lookup = {}
-                if 'username' in defaults:
-                    lookup['username'] = defaults['username']
-                elif 'name' in defaults:
-                    lookup['name'] = defaults['name']
-                try:
-                    return Model.objects.filter(**lookup).first()
-                except Exception:
-                    return Model.objects.first()
-            except Exception:
-                return None
-
-        for i in range(3):
-            name = f"Author {i+1}"
-            username = f"author{i+1}"
-            email = f"author{i+1}@example.com"
-            defaults = {'name': name, 'username': username, 'email': email, 'password': 'pass1234'}
-            author = create_instance(AuthorModel, defaults)
-            if author:
-                created['authors'].append(author)
-
-        for i in range(5):
-            title = f"Category {i+1}"
-            slug = slugify(title)
-            if CategoryModel:
-                try:
-                    obj = CategoryModel.objects.create(name=title) if 'name' in {f.name for f in CategoryModel._meta.fields} else CategoryModel.objects.create(title=title, slug=slug)
-                except Exception:
-                    obj = CategoryModel.objects.filter(name=title).first() or CategoryModel.objects.first()
-                created['categories'].append(obj)
-
-        for i in range(10):
-            title = f"Tag{i+1}"
-            if TagModel:
-                try:
-                    obj = TagModel.objects.create(name=title) if 'name' in {f.name for f in TagModel._meta.fields} else TagModel.objects.create(title=title)
-                except Exception:
-                    obj = TagModel.objects.filter(name=title).first() or TagModel.objects.first()
-                created['tags'].append(obj)
-
-        for i in range(20):
-            title = f"Sample Article {i+1}"
-            slug = slugify(title)
-            body = gen_paragraph()
-            author = random.choice(created['authors']) if created['authors'] else None
-            category = random.choice(created['categories']) if created['categories'] else None
-            if ArticleModel:
-                try:
-                    valid_fields = {f.name for f in ArticleModel._meta.fields}
-                    kwargs = {}
-                    if 'title' in valid_fields:
-                        kwargs['title'] = title
-                    if 'slug' in valid_fields:
-                        kwargs['slug'] = slug
-                    if 'body' in valid_fields:
-                        kwargs['body'] = body
-                    elif 'content' in valid_fields:
-                        kwargs['content'] = body
-                    if author:
-                        for f in ArticleModel._meta.fields:
-                            if getattr(f, 'remote_field', None) and f.remote_field.model == AuthorModel:
-                                kwargs[f.name] = author
-                                break
-                    if category:
-                        for f in ArticleModel._meta.fields:
-                            if getattr(f, 'remote_field', None) and f.remote_field.model == CategoryModel:
-                                kwargs[f.name] = category
-                                break
-                    article = ArticleModel.objects.create(**kwargs)
-                    if created['tags']:
-                        try:
-                            if hasattr(article, 'tags'):
-                                sample_tags = random.sample(created['tags'], k=min(3, len(created['tags'])))
-                                article.tags.add(*sample_tags)
-                            else:
-                                for m in ArticleModel._meta.many_to_many:
-                                    if m.related_model == TagModel or m.name.lower().find('tag') != -1:
-                                        field = getattr(article, m.name)
-                                        sample_tags = random.sample(created['tags'], k=min(3, len(created['tags'])))
-                                        field.add(*sample_tags)
-                                        break
-                        except Exception:
-                            pass
-                    created['articles'].append(article)
-                except Exception:
-                    continue
-
-        def find_fk_field_name(Model, target_model):
-            for f in Model._meta.fields:
-                if getattr(f, 'remote_field', None) and getattr(f.remote_field, 'model', None) == target_model:
-                    return f.name
-            for candidate in ('article', 'post', 'blogpost', 'object', 'entry'):
-                if candidate in {f.name for f in Model._meta.fields}:
-                    return candidate
-            return None
-
-        article_fk_name = find_fk_field_name(CommentModel, ArticleModel) if CommentModel and ArticleModel else None
-        author_fk_name = find_fk_field_name(CommentModel, AuthorModel) if CommentModel and AuthorModel else None
-
-        for i in range(50):
-            body = gen_sentence()
-            article = random.choice(created['articles']) if created['articles'] else None
-            author = random.choice(created['authors']) if created['authors'] else None
-            if CommentModel:
-                try:
-                    kwargs = {}
-                    if article and article_fk_name:
-                        kwargs[article_fk_name] = article
-                    if author and author_fk_name:
-                        kwargs[author_fk_name] = author
-                    if 'text' in {f.name for f in CommentModel._meta.fields}:
-                        kwargs['text'] = body
-                    elif 'body' in {f.name for f in CommentModel._meta.fields}:
-                        kwargs['body'] = body
-                    elif 'message' in {f.name for f in CommentModel._meta.fields}:
-                        kwargs['message'] = body
-                    else:
-                        for f in CommentModel._meta.fields:
-                            if getattr(f, 'get_internal_type', None) and f.get_internal_type() in ('TextField', 'CharField'):
-                                kwargs[f.name] = body
-                                break
-                    if 'created' in {f.name for f in CommentModel._meta.fields}:
-                        kwargs['created'] = datetime.datetime.now()
-                    comment = CommentModel.objects.create(**kwargs)
-                    created['comments'].append(comment)
-                except Exception:
-                    continue
+        if options['authors'] < 1:
+            raise CommandError('Потрібен щонайменше один автор.')
+        if options['min_words'] > options['max_words']:
+            raise CommandError('--min-words не може перевищувати --max-words.')
+        started = time.monotonic()
+        rng = random.Random(options['seed'])
+        words = load_vocabulary()
+
+        authors = self.create_authors(options)
+        categories = self.create_categories(options, rng, words)
+        spec = {name: options[name] for name in GENERATOR_OPTIONS}
+        spec.update(authors=len(authors), categories=len(categories))
+
+        chunk_size = options['chunk_size']
+        now = timezone.now()
+        tasks = [
+            {
+                'index': index,
+                'start': start,
+                'size': min(chunk_size, options['posts'] - start),
+                'options': spec,
+                'words': words,
+                'now': now,
+                'activity_hours': max((hours for hours, _ in get_trending_setting('WINDOWS').values()), default=0),
+            }
+            for index, start in enumerate(range(0, options['posts'], chunk_size))
+        ]
+
+        totals = {'posts': 0, 'comments': 0}
+        if options['workers'] > 1:
+            with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+                for chunk in executor.map(generate_chunk, tasks):
+                    self.insert_chunk(chunk, authors, categories, totals)
+        else:
+            for task in tasks:
+                self.insert_chunk(generate_chunk(task), authors, categories, totals)
+
+        with transaction.atomic():
+            recount_counters()
+            # bulk_create оминає сигнали, тож індекс пошуку перебудовуємо цілком
+            backend = get_backend()
+            if backend is not None:
+                backend.rebuild()
+        refresh_all_rollups()
+        refresh_trending()
+        bump_generation('post', 'comment', 'category', 'user', 'views')
 
         self.stdout.write(self.style.SUCCESS(
-            f"Created: authors={len(created['authors'])}, categories={len(created['categories'])}, "
-            f"tags={len(created['tags'])}, articles={len(created['articles'])}, comments={len(created['comments'])}"
-        ))
\ No newline at end of file
+            f"Created: authors={len(authors)}, categories={len(categories)}, "
+            f"articles={totals['posts']}, comments={totals['comments']} "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
+
+    def create_authors(self, options):
+        password = make_password(options['password'])
+        usernames = [f"author{i + 1}" for i in range(options['authors'])]
+        User.objects.bulk_create(
+            [User(username=name, email=f"{name}@example.com", password=password) for name in usernames],
+            batch_size=options['chunk_size'],
+            ignore_conflicts=True,
+        )
+        return list(User.objects.filter(username__in=usernames).order_by('pk').values_list('pk', flat=True))
+
+    def create_categories(self, options, rng, words):
+        categories = Category.objects.bulk_create(
+            [
+                Category(name=f"Category {i + 1}", description=_sentence(rng, words, 8, 20))
+                for i in range(options['categories'])
+            ],
+            batch_size=options['chunk_size'],
+        )
+        return [category.pk for category in categories]
+
+    def insert_chunk(self, chunk, authors, categories, totals):
+        with transaction.atomic(), explicit_timestamps(
+            Post._meta.get_field('created_at'),
+            Post._meta.get_field('updated_at'),
+            Comment._meta.get_field('created_at'),
+        ):
+            posts = Post.objects.bulk_create([
+                Post(
+                    title=data['title'],
+                    excerpt=data['excerpt'],
+                    content=data['content'],
+                    word_count=data['word_count'],
+                    author_id=authors[data['author']],
+                    category_id=categories[data['category']] if data['category'] is not None else None,
+                    status=data['status'],
+                    views=data['views'],
+                    created_at=data['created_at'],
+                    updated_at=data['updated_at'],
+                    published_at=data['published_at'],
+                )
+                for data in chunk
+            ])
+            totals['posts'] += len(posts)
+            PostActivity.objects.bulk_create([
+                PostActivity(post_id=post.pk, hour=hour, views=views, comments=comments)
+                for post, data in zip(posts, chunk)
+                for hour, views, comments in data['activity']
+            ])
+
+            # Вставляємо коментарі шарами за глибиною, щоб батьківські id вже були відомі
+            depth = 0
+            created = {}
+            while True:
+                layer = [
+                    (post, data, comment)
+                    for post, data in zip(posts, chunk)
+                    for comment in data['comments']
+                    if comment['depth'] == depth
+                ]
+                if not layer:
+                    break
+                objects = Comment.objects.bulk_create([
+                    Comment(
+                        post_id=post.pk,
+                        author_id=authors[comment['author']],
+                        content=comment['content'],
+                        parent_id=created[(post.pk, comment['parent'])] if comment['parent'] is not None else None,
+                        is_approved=comment['is_approved'],
+                        created_at=comment['created_at'],
+                    )
+                    for post, data, comment in layer
+                ])
+                for (post, data, comment), obj in zip(layer, objects):
+                    created[(post.pk, comment['index'])] = obj.pk
+                totals['comments'] += len(objects)
+                depth += 1
+        self.stdout.write(f"  posts={totals['posts']} comments={totals['comments']}")
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.profiling import (
+    RUNTIME_OPTIONS, clear_overrides, get_directory, get_overrides, get_overrides_path, get_setting, set_overrides,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Вмикає, вимикає або налаштовує вибіркове профілювання запитів без перезапуску '
+        '(зміни записуються у файл у каталозі профілів, який перечитують усі воркери).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['status', 'on', 'off', 'reset'])
+        parser.add_argument('--sample-rate', type=float, help='Частка запитів для профілювання (0..1).')
+        parser.add_argument('--slow-ms', type=float, help='Профілювати всі запити, довші за поріг у мс.')
+        parser.add_argument('--no-slow', action='store_true', help='Вимкнути поріг затримки.')
+
+    def handle(self, *args, **options):
+        action = options['action']
+        rate = options['sample_rate']
+        if rate is not None and not 0 <= rate <= 1:
+            raise CommandError('--sample-rate має бути в межах від 0 до 1.')
+
+        if action == 'reset':
+            clear_overrides()
+        elif action != 'status' or rate is not None or options['slow_ms'] is not None or options['no_slow']:
+            changes = {}
+            if action in ('on', 'off'):
+                changes['enabled'] = action == 'on'
+            if rate is not None:
+                changes['sample_rate'] = rate
+            if options['no_slow']:
+                changes['slow_threshold_ms'] = None
+            elif options['slow_ms'] is not None:
+                changes['slow_threshold_ms'] = options['slow_ms']
+            set_overrides(**changes)
+
+        overrides = get_overrides()
+        for name in RUNTIME_OPTIONS:
+            value = overrides.get(name, get_setting(name))
+            source = 'файл' if name in overrides else 'settings'
+            self.stdout.write(f"{name} = {value} ({source})")
+        self.stdout.write(f"Каталог профілів: {get_directory()}")
+        self.stdout.write(f"Файл налаштувань: {get_overrides_path()}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Зміни застосуються у воркерах протягом {get_setting('CONFIG_TTL')} с."
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.changes import prune_changes
+
+
+class Command(BaseCommand):
+    help = 'Видаляє записи журналу змін, старші за вказану кількість днів.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30)
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days має бути не менше 1.')
+        deleted = prune_changes(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Видалено записів журналу: {deleted}"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from blog.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Повністю перебудовує повнотекстовий індекс опублікованих статей.'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        if backend is None:
+            raise CommandError('Повнотекстовий пошук не підтримується для цієї бази даних.')
+        with transaction.atomic():
+            indexed = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Проіндексовано статей: {indexed}"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.counters import recount_counters
+
+
+class Command(BaseCommand):
+    help = 'Перераховує денормалізовані лічильники статей і коментарів та виправляє розбіжності.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Лише показати кількість розбіжностей.')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        with transaction.atomic():
+            repaired = recount_counters(dry_run=dry_run)
+        verb = 'Розбіжностей' if dry_run else 'Виправлено'
+        for label, count in repaired.items():
+            self.stdout.write(f"{label}: {verb.lower()} {count}")
+        self.stdout.write(self.style.SUCCESS(f"{verb}: {sum(repaired.values())}"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post, count_words
+
+
+class Command(BaseCommand):
+    help = 'Перераховує кількість слів (і час читання) для всіх статей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        pending = []
+        updated = 0
+        for post in Post.objects.order_by().only('id', 'content', 'word_count').iterator(chunk_size=chunk_size):
+            word_count = count_words(post.content)
+            if word_count != post.word_count:
+                post.word_count = word_count
+                pending.append(post)
+            if len(pending) >= chunk_size:
+                updated += Post.objects.bulk_update(pending, ['word_count'])
+                pending = []
+        if pending:
+            updated += Post.objects.bulk_update(pending, ['word_count'])
+        self.stdout.write(self.style.SUCCESS(f"Оновлено статей: {updated}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from blog.statistics import refresh_all_rollups
+
+
+class Command(BaseCommand):
+    help = 'Повністю перераховує зведену статистику блогу (загальну та по категоріях).'
+
+    def handle(self, *args, **options):
+        refreshed = refresh_all_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Оновлено зведень: {refreshed}"))
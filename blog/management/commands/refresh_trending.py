@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from blog.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Перераховує рейтинг популярних статей за вікнами активності з загасанням у часі '
+        'і видаляє застарілу погодинну активність. Запускається за розкладом.'
+    )
+
+    def handle(self, *args, **options):
+        totals = refresh_trending()
+        summary = ', '.join(f'{window}={count}' for window, count in totals.items())
+        self.stdout.write(self.style.SUCCESS(f"Оновлено рейтинги: {summary}"))
@@ -0,0 +1,389 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .query_tracking import track_queries
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'DIRECTORY': None,
+    'FLUSH_INTERVAL': 15,
+    'BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    'TOKEN': None,
+    # Файл, який не оновлювався стільки секунд і чий процес завершився, вважається файлом мертвого воркера
+    'STALE_AFTER': 60,
+}
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+def get_setting(name):
+    return getattr(settings, 'BLOG_METRICS', {}).get(name, DEFAULTS[name])
+
+
+def _empty_series(buckets):
+    return {
+        'count': 0,
+        'duration_sum': 0.0,
+        'buckets': [0] * len(buckets),
+        'queries': 0,
+        'query_seconds': 0.0,
+        'bytes': 0,
+    }
+
+
+def _pid_alive(pid):
+    if os.name == 'nt':
+        # На Windows os.kill завершує процес, тож там покладаємось лише на вік файлу
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge_series(target, series):
+    target['count'] += series['count']
+    target['duration_sum'] += series['duration_sum']
+    target['buckets'] = [a + b for a, b in zip(target['buckets'], series['buckets'])]
+    target['queries'] += series['queries']
+    target['query_seconds'] += series['query_seconds']
+    target['bytes'] += series['bytes']
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        # Лічильники завершених воркерів, перенесені в цей процес, щоб сумарні значення не зменшувались
+        self._retired = {}
+        self._absorbed = set()
+        self._buckets = None
+        self._started = int(time.time())
+        self._thread = None
+        self._pid = None
+        self._stopped = threading.Event()
+
+    @property
+    def buckets(self):
+        if self._buckets is None:
+            self._buckets = tuple(get_setting('BUCKETS'))
+        return self._buckets
+
+    def observe(self, route, method, status, duration, queries=0, query_seconds=0.0, size=0):
+        buckets = self.buckets
+        key = (route, method, str(status))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _empty_series(buckets)
+            series['count'] += 1
+            series['duration_sum'] += duration
+            for index, bound in enumerate(buckets):
+                if duration <= bound:
+                    series['buckets'][index] += 1
+                    break
+            series['queries'] += queries
+            series['query_seconds'] += query_seconds
+            series['bytes'] += size
+        self._ensure_worker()
+
+    def snapshot(self):
+        with self._lock:
+            merged = {}
+            for source in (self._retired, self._series):
+                for key, series in source.items():
+                    if key not in merged:
+                        merged[key] = _empty_series(self.buckets)
+                    merge_series(merged[key], series)
+            return {
+                'buckets': list(self.buckets),
+                'series': [{'labels': list(key), **series} for key, series in merged.items()],
+                'absorbed': sorted(self._absorbed),
+            }
+
+    def get_path(self):
+        directory = get_setting('DIRECTORY')
+        if directory is None:
+            return None
+        # Час старту в імені, щоб новий процес з тим самим pid не затер лічильники попереднього
+        return os.path.join(str(directory), f'metrics-{os.getpid()}-{self._started}.json')
+
+    def export(self):
+        path = self.get_path()
+        if path is None:
+            return
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            # Назви поглинених файлів потрібні читачам лише доки ці файли ще не видалено
+            self._absorbed = {name for name in self._absorbed if os.path.exists(os.path.join(directory, name))}
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as stream:
+            json.dump(self.snapshot(), stream)
+        os.replace(temporary, path)
+
+    def collect(self):
+        own_path = self.get_path()
+        if own_path is None:
+            return self.merge([self.snapshot()])
+        # Усі воркери, включно з поточним, читаються з файлів: живі дані цього процесу поруч зі
+        # старішими файлами інших давали б лічильники, що зменшуються між сусідніми скрейпами
+        self.absorb_dead(os.path.dirname(own_path))
+        self.export()
+        snapshots = {}
+        for path in glob.glob(os.path.join(os.path.dirname(own_path), 'metrics-*.json')):
+            try:
+                with open(path, encoding='utf-8') as stream:
+                    snapshots[os.path.basename(path)] = json.load(stream)
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError):
+                logger.warning('Пропущено пошкоджений файл метрик %s', path)
+        absorbed = {name for snapshot in snapshots.values() for name in snapshot.get('absorbed', ())}
+        return self.merge([snapshot for name, snapshot in snapshots.items() if name not in absorbed])
+
+    def merge(self, snapshots):
+        merged = {}
+        for snapshot in snapshots:
+            if snapshot['buckets'] != list(self.buckets):
+                logger.warning('Пропущено знімок метрик з іншими межами гістограми.')
+                continue
+            for series in snapshot['series']:
+                key = tuple(series['labels'])
+                if key not in merged:
+                    merged[key] = _empty_series(self.buckets)
+                merge_series(merged[key], series)
+        return merged
+
+    def is_dead(self, path, now):
+        try:
+            age = now - os.path.getmtime(path)
+        except OSError:
+            return False
+        if age < get_setting('STALE_AFTER'):
+            return False
+        try:
+            pid = int(os.path.basename(path).split('-')[1])
+        except (IndexError, ValueError):
+            return False
+        return pid == os.getpid() or not _pid_alive(pid)
+
+    def absorb_dead(self, directory):
+        # Файл мертвого воркера забирає рівно один живий процес (маркер .claim створюється ексклюзивно),
+        # переносить його лічильники у свої, записує власний знімок і лише тоді видаляє файл
+        now = time.time()
+        own_path = self.get_path()
+        claimed = []
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+            if path == own_path or not self.is_dead(path, now):
+                continue
+            marker = f'{path}.claim'
+            try:
+                os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            except FileExistsError:
+                # Маркер процесу, що впав посеред перенесення
+                try:
+                    if now - os.path.getmtime(marker) >= get_setting('STALE_AFTER'):
+                        os.remove(marker)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path, encoding='utf-8') as stream:
+                    snapshot = json.load(stream)
+            except (OSError, ValueError):
+                os.remove(marker)
+                continue
+            if snapshot['buckets'] != list(self.buckets):
+                logger.warning('Файл метрик %s має інші межі гістограми, його лічильники відкинуто.', path)
+            else:
+                with self._lock:
+                    for series in snapshot['series']:
+                        key = tuple(series['labels'])
+                        if key not in self._retired:
+                            self._retired[key] = _empty_series(self.buckets)
+                        merge_series(self._retired[key], series)
+                    self._absorbed.update([os.path.basename(path), *snapshot.get('absorbed', ())])
+            claimed.append((path, marker, snapshot.get('absorbed', ())))
+        if not claimed:
+            return 0
+        self.export()
+        for path, marker, inherited in claimed:
+            for leftover in [path, *(os.path.join(directory, name) for name in inherited)]:
+                try:
+                    os.remove(leftover)
+                except FileNotFoundError:
+                    pass
+            os.remove(marker)
+        return len(claimed)
+
+    def _ensure_worker(self):
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        if get_setting('DIRECTORY') is None:
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            if self._pid is not None and self._pid != pid:
+                # Після fork лічильники батьківського процесу вже записані у його файл
+                self._series = {}
+                self._retired = {}
+                self._absorbed = set()
+                self._started = int(time.time())
+            self._pid = pid
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='blog-metrics', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(get_setting('FLUSH_INTERVAL')):
+            try:
+                self.export()
+            except Exception:
+                logger.exception('Не вдалося записати метрики процесу.')
+
+    def shutdown(self):
+        self._stopped.set()
+        if self._series or self._retired:
+            try:
+                self.export()
+            except Exception:
+                logger.exception('Не вдалося записати метрики процесу.')
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def add(self, sql, duration):
+        self.count += 1
+        self.seconds += duration
+
+
+registry = MetricsRegistry()
+atexit.register(registry.shutdown)
+
+
+def response_size(response):
+    if response.streaming:
+        return 0
+    return len(response.content)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not get_setting('ENABLED'):
+            return self.get_response(request)
+        queries = QueryCounter()
+        started = time.perf_counter()
+        with track_queries(queries):
+            response = self.get_response(request)
+        self.observe(request, response, time.perf_counter() - started, queries)
+        return response
+
+    async def __acall__(self, request):
+        if not get_setting('ENABLED'):
+            return await self.get_response(request)
+        queries = QueryCounter()
+        started = time.perf_counter()
+        with track_queries(queries):
+            response = await self.get_response(request)
+        self.observe(request, response, time.perf_counter() - started, queries)
+        return response
+
+    def observe(self, request, response, duration, queries):
+        match = getattr(request, 'resolver_match', None)
+        registry.observe(
+            match.route if match else UNMATCHED_ROUTE,
+            request.method,
+            response.status_code,
+            duration,
+            queries.count,
+            queries.seconds,
+            response_size(response),
+        )
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(route, method, status, **extra):
+    pairs = [('route', route), ('method', method), ('status', status), *extra.items()]
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(merged, buckets):
+    lines = []
+
+    def header(name, kind, description):
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    ordered = sorted(merged.items())
+    header('blog_http_requests_total', 'counter', 'Total HTTP requests by route, method and status.')
+    for key, series in ordered:
+        lines.append(f"blog_http_requests_total{_labels(*key)} {series['count']}")
+
+    header('blog_http_request_duration_seconds', 'histogram', 'HTTP request latency in seconds.')
+    for key, series in ordered:
+        cumulative = 0
+        for bound, count in zip(buckets, series['buckets']):
+            cumulative += count
+            lines.append(f"blog_http_request_duration_seconds_bucket{_labels(*key, le=bound)} {cumulative}")
+        lines.append(f"blog_http_request_duration_seconds_bucket{_labels(*key, le='+Inf')} {series['count']}")
+        lines.append(f"blog_http_request_duration_seconds_sum{_labels(*key)} {_number(series['duration_sum'])}")
+        lines.append(f"blog_http_request_duration_seconds_count{_labels(*key)} {series['count']}")
+
+    header('blog_db_queries_total', 'counter', 'Total SQL queries executed while serving requests.')
+    for key, series in ordered:
+        lines.append(f"blog_db_queries_total{_labels(*key)} {series['queries']}")
+
+    header('blog_db_query_duration_seconds_total', 'counter', 'Total time spent in SQL queries.')
+    for key, series in ordered:
+        lines.append(f"blog_db_query_duration_seconds_total{_labels(*key)} {_number(series['query_seconds'])}")
+
+    header('blog_http_response_bytes_total', 'counter', 'Total response body bytes (streaming responses excluded).')
+    for key, series in ordered:
+        lines.append(f"blog_http_response_bytes_total{_labels(*key)} {series['bytes']}")
+
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    token = get_setting('TOKEN')
+    if token is not None and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponseForbidden()
+    body = render_prometheus(registry.collect(), registry.buckets)
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:20
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count_subquery(queryset, group_by):
+    counts = queryset.order_by().values(group_by).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    User = apps.get_model('blog', 'User')
+    Category = apps.get_model('blog', 'Category')
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    User.objects.update(post_count=_count_subquery(Post.objects.filter(author=OuterRef('pk')), 'author'))
+    Category.objects.update(post_count=_count_subquery(Post.objects.filter(category=OuterRef('pk')), 'category'))
+    Post.objects.update(comment_count=_count_subquery(
+        Comment.objects.filter(post=OuterRef('pk'), is_approved=True), 'post'
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Кількість статей'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Кількість схвалених коментарів'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Кількість статей'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
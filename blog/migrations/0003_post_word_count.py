@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:20
+
+from django.db import migrations, models
+
+
+def backfill_word_counts(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    pending = []
+    for post in Post.objects.order_by().only('id', 'content').iterator(chunk_size=500):
+        post.word_count = len(post.content.split()) if post.content else 0
+        pending.append(post)
+        if len(pending) >= 500:
+            Post.objects.bulk_update(pending, ['word_count'])
+            pending = []
+    if pending:
+        Post.objects.bulk_update(pending, ['word_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Кількість слів'),
+        ),
+        migrations.RunPython(backfill_word_counts, migrations.RunPython.noop),
+    ]
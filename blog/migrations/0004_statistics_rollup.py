@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:22
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_post_word_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatisticsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Кількість статей')),
+                ('published_count', models.PositiveIntegerField(default=0, verbose_name='Кількість опублікованих статей')),
+                ('comments_count', models.PositiveIntegerField(default=0, verbose_name='Кількість коментарів')),
+                ('views_total', models.PositiveBigIntegerField(default=0, verbose_name='Сума переглядів')),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата повного перерахунку')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='blog.category', verbose_name='Категорія')),
+            ],
+            options={
+                'verbose_name': 'Зведена статистика',
+                'verbose_name_plural': 'Зведена статистика',
+                'constraints': [models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('category', models.Value(0)), name='blog_statisticsrollup_scope_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS blog_post_fts "
+            "USING fts5(title, excerpt, content, tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            'INSERT INTO blog_post_fts (rowid, title, excerpt, content) '
+            'SELECT id, title, excerpt, content FROM blog_post WHERE published_at IS NOT NULL'
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE IF NOT EXISTS blog_post_search ('
+            'post_id bigint PRIMARY KEY REFERENCES blog_post (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+            'document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS blog_post_search_document_idx ON blog_post_search USING GIN (document)'
+        )
+        schema_editor.execute(
+            'INSERT INTO blog_post_search (post_id, document) '
+            "SELECT id, setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(excerpt, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(content, '')), 'D') "
+            'FROM blog_post WHERE published_at IS NOT NULL'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS blog_post_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP TABLE IF EXISTS blog_post_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_post_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(choices=[('post', 'Стаття'), ('comment', 'Коментар'), ('category', 'Категорія')], max_length=20, verbose_name='Тип обʼєкта')),
+                ('object_id', models.BigIntegerField(verbose_name='Ідентифікатор обʼєкта')),
+                ('action', models.CharField(choices=[('created', 'Створено'), ('updated', 'Оновлено'), ('deleted', 'Видалено')], max_length=10, verbose_name='Дія')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата зміни')),
+            ],
+            options={
+                'verbose_name': 'Запис журналу змін',
+                'verbose_name_plural': 'Журнал змін',
+                'ordering': ['id'],
+            },
+        ),
+    ]
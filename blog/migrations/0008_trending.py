@@ -0,0 +1,81 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_change_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.PositiveIntegerField(verbose_name='Година (від початку епохи)')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Перегляди')),
+                ('comments', models.PositiveIntegerField(default=0, verbose_name='Схвалені коментарі')),
+            ],
+            options={
+                'verbose_name': 'Активність статті',
+                'verbose_name_plural': 'Активність статей',
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(max_length=10, verbose_name='Вікно')),
+                ('score', models.FloatField(verbose_name='Рейтинг')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Перегляди у вікні')),
+                ('comments', models.PositiveIntegerField(default=0, verbose_name='Коментарі у вікні')),
+                ('computed_at', models.DateTimeField(verbose_name='Дата перерахунку')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг популярності',
+                'verbose_name_plural': 'Рейтинги популярності',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='blog_post_popular_idx',
+        ),
+        migrations.AddField(
+            model_name='postactivity',
+            name='post',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='blog.post', verbose_name='Стаття'),
+        ),
+        migrations.AddField(
+            model_name='trendingscore',
+            name='category',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='blog.category', verbose_name='Категорія'),
+        ),
+        migrations.AddField(
+            model_name='trendingscore',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending_scores', to='blog.post', verbose_name='Стаття'),
+        ),
+        migrations.AddIndex(
+            model_name='postactivity',
+            index=models.Index(fields=['hour'], name='blog_postactivity_hour_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='postactivity',
+            constraint=models.UniqueConstraint(fields=('post', 'hour'), name='blog_postactivity_post_hour_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='trendingscore',
+            index=models.Index(fields=['window', '-score', '-id'], name='blog_trending_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trendingscore',
+            index=models.Index(fields=['window', 'category', '-score', '-id'], name='blog_trending_category_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='trendingscore',
+            constraint=models.UniqueConstraint(fields=('window', 'post'), name='blog_trendingscore_window_post_uniq'),
+        ),
+    ]
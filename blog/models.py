@@ -1,18 +1,73 @@
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Coalesce, Lower
 from django.contrib.auth.models import AbstractUser
 
-class User(AbstractUser):
+WORDS_PER_MINUTE = 200
+# Найбільший ідентифікатор BigAutoField: більші значення база не прийме як параметр
+MAX_ID = 2 ** 63 - 1
+
+
+def count_words(text):
+	return len(text.split()) if text else 0
+
+
+class CounterFieldsMixin:
+	# Лічильники змінюються лише атомарними UPDATE з F(), тож save() пише їх тільки при вставці:
+	# інакше повне збереження раніше прочитаного екземпляра повернуло б старі значення
+	counter_fields = ()
+
+	def save(self, *args, **kwargs):
+		if not self._state.adding and not kwargs.get('force_insert'):
+			update_fields = kwargs.get('update_fields')
+			if update_fields is None:
+				deferred = self.get_deferred_fields()
+				update_fields = [
+					field.name for field in self._meta.concrete_fields
+					if not field.primary_key and field.attname not in deferred
+				]
+			kwargs['update_fields'] = [name for name in update_fields if name not in self.counter_fields]
+		super().save(*args, **kwargs)
+
+
+class User(CounterFieldsMixin, AbstractUser):
+	post_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Кількість статей')
+
+	counter_fields = ('post_count',)
+
+	class Meta(AbstractUser.Meta):
+		indexes = [
+			models.Index(Lower('email'), name='blog_user_email_lower_idx'),
+			models.Index(fields=['-post_count', 'id'], name='blog_user_post_count_idx'),
+		]
+
 	def get_post_count(self):
-		return self.posts.count()
+		return self.post_count
 
 
-class Category(models.Model):
+class Category(CounterFieldsMixin, models.Model):
 	name = models.CharField(max_length=60, verbose_name='Назва категорії')
 	description = models.TextField(verbose_name='Опис категорії')
 	created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата створення')
+	post_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Кількість статей')
+
+	counter_fields = ('post_count',)
+
+
+class PostQuerySet(models.QuerySet):
+	def for_list(self):
+		return self.select_related('author', 'category').defer('content')
+
 
+class CommentQuerySet(models.QuerySet):
+	def for_thread(self):
+		return self.select_related('author')
 
-class Post(models.Model):
+	def approved(self):
+		return self.filter(is_approved=True)
+
+
+class Post(CounterFieldsMixin, models.Model):
 	title = models.CharField(max_length=200, verbose_name='Заголовок статті')
 	author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts', verbose_name='Автор')
 	category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='posts', verbose_name='Категорія')
@@ -21,21 +76,41 @@ class Post(models.Model):
 	featured_image = models.ImageField(upload_to='post_images/', null=True, blank=True, verbose_name='Головне зображення')
 	status = models.CharField(choices=[('draft', 'Чернетка'), ('published', 'Опубліковано')], default='draft', verbose_name='Статус')
 	views = models.PositiveIntegerField(default=0, verbose_name='Кількість переглядів')
+	comment_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Кількість схвалених коментарів')
+	word_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Кількість слів')
 	created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата створення')
 	updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата оновлення')
 	published_at = models.DateTimeField(null=True, blank=True, verbose_name='Дата публікації')
 
+	objects = PostQuerySet.as_manager()
+
+	counter_fields = ('comment_count', 'views')
+
 	class Meta:
 		ordering = ['-published_at']
+		indexes = [
+			models.Index(fields=['-published_at', '-id'], name='blog_post_published_idx'),
+			models.Index(fields=['category', '-published_at', '-id'], name='blog_post_category_pub_idx'),
+			models.Index(fields=['author', '-published_at', '-id'], name='blog_post_author_pub_idx'),
+			models.Index(fields=['-views', '-id'], name='blog_post_views_idx'),
+		]
 		verbose_name = 'Стаття'
 		verbose_name_plural = 'Статті'
 
+	def save(self, *args, **kwargs):
+		if 'content' not in self.get_deferred_fields():
+			self.word_count = count_words(self.content)
+			update_fields = kwargs.get('update_fields')
+			if update_fields is not None and 'content' in update_fields and 'word_count' not in update_fields:
+				kwargs['update_fields'] = [*update_fields, 'word_count']
+		super().save(*args, **kwargs)
+
 	def get_comment_count(self):
-		return self.comments.filter(is_approved=True).count()
+		return self.comment_count
 	
 	def get_reading_time(self):
-		words = len(self.content.split())
-		reading_time_minutes = words // 200 + (1 if words % 200 > 0 else 0)
+		words = self.word_count
+		reading_time_minutes = words // WORDS_PER_MINUTE + (1 if words % WORDS_PER_MINUTE > 0 else 0)
 		return reading_time_minutes
 
 
@@ -47,7 +122,88 @@ class Comment(models.Model):
 	is_approved = models.BooleanField(default=False, verbose_name='Схвалено')
 	created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата створення')
 
+	objects = CommentQuerySet.as_manager()
+
 	class Meta:
 		ordering = ['created_at']
+		indexes = [
+			models.Index(
+				fields=['post', 'created_at', 'id'], condition=models.Q(is_approved=True),
+				name='blog_comment_approved_idx',
+			),
+			models.Index(fields=['post', 'parent', 'created_at'], name='blog_comment_thread_idx'),
+		]
 		verbose_name = 'Коментар'
-		verbose_name_plural = 'Коментарі'
\ No newline at end of file
+		verbose_name_plural = 'Коментарі'
+
+class StatisticsRollup(models.Model):
+	category = models.ForeignKey(Category, null=True, blank=True, on_delete=models.CASCADE, related_name='statistics', verbose_name='Категорія')
+	posts_count = models.PositiveIntegerField(default=0, verbose_name='Кількість статей')
+	published_count = models.PositiveIntegerField(default=0, verbose_name='Кількість опублікованих статей')
+	comments_count = models.PositiveIntegerField(default=0, verbose_name='Кількість коментарів')
+	views_total = models.PositiveBigIntegerField(default=0, verbose_name='Сума переглядів')
+	refreshed_at = models.DateTimeField(null=True, blank=True, verbose_name='Дата повного перерахунку')
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(Coalesce('category', Value(0)), name='blog_statisticsrollup_scope_uniq'),
+		]
+		verbose_name = 'Зведена статистика'
+		verbose_name_plural = 'Зведена статистика'
+
+
+class ChangeLogEntry(models.Model):
+	RESOURCE_CHOICES = [('post', 'Стаття'), ('comment', 'Коментар'), ('category', 'Категорія')]
+	ACTION_CHOICES = [('created', 'Створено'), ('updated', 'Оновлено'), ('deleted', 'Видалено')]
+
+	resource = models.CharField(max_length=20, choices=RESOURCE_CHOICES, verbose_name='Тип обʼєкта')
+	object_id = models.BigIntegerField(verbose_name='Ідентифікатор обʼєкта')
+	action = models.CharField(max_length=10, choices=ACTION_CHOICES, verbose_name='Дія')
+	created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата зміни')
+
+	class Meta:
+		ordering = ['id']
+		verbose_name = 'Запис журналу змін'
+		verbose_name_plural = 'Журнал змін'
+
+
+class PostActivity(models.Model):
+	# Окремий індекс на post не потрібен: його покриває унікальність (post, hour)
+	post = models.ForeignKey(Post, on_delete=models.CASCADE, db_index=False, related_name='activity', verbose_name='Стаття')
+	hour = models.PositiveIntegerField(verbose_name='Година (від початку епохи)')
+	views = models.PositiveIntegerField(default=0, verbose_name='Перегляди')
+	comments = models.PositiveIntegerField(default=0, verbose_name='Схвалені коментарі')
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(fields=['post', 'hour'], name='blog_postactivity_post_hour_uniq'),
+		]
+		indexes = [
+			models.Index(fields=['hour'], name='blog_postactivity_hour_idx'),
+		]
+		verbose_name = 'Активність статті'
+		verbose_name_plural = 'Активність статей'
+
+
+class TrendingScore(models.Model):
+	window = models.CharField(max_length=10, verbose_name='Вікно')
+	post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='trending_scores', verbose_name='Стаття')
+	# Копія категорії статті на момент перерахунку, щоб фільтр по категорії читав лише індекс
+	category = models.ForeignKey(
+		Category, null=True, blank=True, on_delete=models.SET_NULL, db_index=False, related_name='+', verbose_name='Категорія'
+	)
+	score = models.FloatField(verbose_name='Рейтинг')
+	views = models.PositiveIntegerField(default=0, verbose_name='Перегляди у вікні')
+	comments = models.PositiveIntegerField(default=0, verbose_name='Коментарі у вікні')
+	computed_at = models.DateTimeField(verbose_name='Дата перерахунку')
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(fields=['window', 'post'], name='blog_trendingscore_window_post_uniq'),
+		]
+		indexes = [
+			models.Index(fields=['window', '-score', '-id'], name='blog_trending_rank_idx'),
+			models.Index(fields=['window', 'category', '-score', '-id'], name='blog_trending_category_idx'),
+		]
+		verbose_name = 'Рейтинг популярності'
+		verbose_name_plural = 'Рейтинги популярності'
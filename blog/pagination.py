@@ -0,0 +1,220 @@
+import base64
+import binascii
+import json
+import math
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .models import MAX_ID
+
+
+class KeysetPagination(BasePagination):
+    ordering = ('-published_at', '-id')
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Невірний курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        rows = []
+        for segment in self.get_page_segments(queryset, request):
+            rows.extend(segment[:self.page_size + 1 - len(rows)])
+            if len(rows) > self.page_size:
+                break
+        return self.finalize_page(rows)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        rows = []
+        for segment in self.get_page_segments(queryset, request):
+            rows.extend([row async for row in segment[:self.page_size + 1 - len(rows)]])
+            if len(rows) > self.page_size:
+                break
+        return self.finalize_page(rows)
+
+    def get_page_segments(self, queryset, request):
+        # Сторінка читається одним або двома діапазонами індексу: рядки з NULL у провідному полі
+        # (NULLS LAST) довантажуються окремим запитом лише тоді, коли непорожні значення скінчились
+        model = queryset.model
+        position = self.decode_cursor(request, model)
+        order_by = self.get_order_by(model)
+        fields = self._fields()
+        leading = fields[0][0]
+        if not model._meta.get_field(leading).null:
+            if position is not None:
+                queryset = queryset.filter(self.build_filter(fields, position))
+            return [queryset.order_by(*order_by)]
+        nulls = queryset.filter(**{f'{leading}__isnull': True})
+        if position is not None and position[0] is None:
+            return [nulls.filter(self.build_filter(fields[1:], position[1:])).order_by(*order_by)]
+        values = queryset.filter(**{f'{leading}__isnull': False})
+        if position is not None:
+            values = values.filter(self.build_filter(fields, position))
+        return [values.order_by(*order_by), nulls.order_by(*order_by)]
+
+    def finalize_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        page = rows[:self.page_size]
+        self.next_position = self.get_position(page[-1]) if self.has_next else None
+        return page
+
+    def get_position(self, obj):
+        return [self._get_value(obj, name) for name, _ in self._fields()]
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ])
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def encode_cursor(self, position):
+        raw = json.dumps(position, separators=(',', ':'), default=str).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def load_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            values = json.loads(raw.decode('utf-8'))
+        except (ValueError, UnicodeDecodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self._fields()):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def decode_cursor(self, request, model):
+        values = self.load_cursor(request)
+        if values is None:
+            return None
+        fields = self._fields()
+        position = []
+        for (name, _), value in zip(fields, values):
+            field = model._meta.get_field(name)
+            if value is None:
+                if not field.null or position:
+                    raise NotFound(self.invalid_cursor_message)
+                position.append(None)
+                continue
+            try:
+                value = field.to_python(value)
+                field.run_validators(value)
+                position.append(value)
+            except (TypeError, ValueError, DjangoValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_order_by(self, model):
+        order_by = []
+        for name, descending in self._fields():
+            expression = F(name)
+            if model._meta.get_field(name).null:
+                expression = expression.desc(nulls_last=True) if descending else expression.asc(nulls_last=True)
+            else:
+                expression = expression.desc() if descending else expression.asc()
+            order_by.append(expression)
+        return order_by
+
+    def build_filter(self, fields, position):
+        # Лексикографічне (a, b, ...) > (a0, b0, ...) у формі a >= a0 AND (a > a0 OR (b, ...) > (b0, ...)):
+        # нестроге обмеження на провідне поле дає базі діапазон індексу замість сканування від початку.
+        # Значення тут непорожні: NULL у провідному полі обробляє get_page_segments
+        (name, descending), value = fields[0], position[0]
+        after = Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+        if len(fields) == 1:
+            return after
+        bound = Q(**{f"{name}__{'lte' if descending else 'gte'}": value})
+        return bound & (after | self.build_filter(fields[1:], position[1:]))
+
+    def _fields(self):
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def _get_value(self, obj, name):
+        value = getattr(obj, name)
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+
+class PostCursorPagination(KeysetPagination):
+    ordering = ('-published_at', '-id')
+
+
+class CommentCursorPagination(KeysetPagination):
+    ordering = ('created_at', 'id')
+
+
+class PopularPostCursorPagination(KeysetPagination):
+    ordering = ('-score', '-id')
+    page_size = 5
+
+
+class PopularPostFallbackPagination(PopularPostCursorPagination):
+    # Окремий параметр курсора: сторінки за переглядами не плутаються з курсорами рейтингу
+    ordering = ('-views', '-id')
+    cursor_query_param = 'fallback_cursor'
+
+
+class SearchCursorPagination(KeysetPagination):
+    ordering = ('score', 'id')
+
+    def paginate_search(self, backend, terms, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        hits = backend.search(terms, self.page_size + 1, after=self.decode_cursor(request, None))
+        return self.finalize_page(hits)
+
+    def decode_cursor(self, request, model):
+        values = self.load_cursor(request)
+        if values is None:
+            return None
+        score, post_id = values
+        if not isinstance(score, (int, float)) or isinstance(score, bool) or type(post_id) is not int:
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            score = float(score)
+        except OverflowError:
+            raise NotFound(self.invalid_cursor_message)
+        # Як і в інших курсорів: значення, яких база не прийме, — це невірний курсор, а не 500
+        if not math.isfinite(score) or not 1 <= post_id <= MAX_ID:
+            raise NotFound(self.invalid_cursor_message)
+        return [score, post_id]
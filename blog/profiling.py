@@ -0,0 +1,286 @@
+import atexit
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils import timezone
+
+from .query_tracking import track_queries
+
+logger = logging.getLogger(__name__)
+
+OVERRIDES_FILE = 'overrides.json'
+
+DEFAULTS = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.0,
+    'SLOW_THRESHOLD_MS': None,
+    'HEADER': 'X-Blog-Profile',
+    'HEADER_SECRET': None,
+    'DIRECTORY': None,
+    'FLUSH_INTERVAL': 5,
+    'MAX_PENDING': 500,
+    'MAX_QUERIES': 200,
+    'MAX_FILE_BYTES': 50 * 1024 * 1024,
+    'CONFIG_TTL': 5,
+}
+
+# Параметри, які можна змінити під час роботи без перезапуску
+RUNTIME_OPTIONS = ('ENABLED', 'SAMPLE_RATE', 'SLOW_THRESHOLD_MS')
+
+
+def get_setting(name):
+    return getattr(settings, 'BLOG_PROFILING', {}).get(name, DEFAULTS[name])
+
+
+def get_directory():
+    directory = get_setting('DIRECTORY')
+    if directory is None:
+        directory = os.path.join(settings.BASE_DIR, 'profiles')
+    return str(directory)
+
+
+def get_overrides_path():
+    return os.path.join(get_directory(), OVERRIDES_FILE)
+
+
+def get_overrides():
+    # Файл у каталозі профілів читають усі воркери і команди на хості, на відміну від кешу в пам'яті
+    try:
+        with open(get_overrides_path(), encoding='utf-8') as stream:
+            overrides = json.load(stream)
+    except FileNotFoundError:
+        return {}
+    return {name: value for name, value in overrides.items() if name in RUNTIME_OPTIONS}
+
+
+def set_overrides(**options):
+    overrides = get_overrides()
+    overrides.update({name.upper(): value for name, value in options.items()})
+    path = get_overrides_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Запис через тимчасовий файл, щоб воркер ніколи не прочитав його наполовину
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as stream:
+        json.dump(overrides, stream)
+    os.replace(temporary, path)
+    return overrides
+
+
+def clear_overrides():
+    try:
+        os.remove(get_overrides_path())
+    except FileNotFoundError:
+        pass
+
+
+class RuntimeConfig:
+    def __init__(self):
+        self._values = None
+        self._loaded_at = 0.0
+
+    def get(self):
+        now = time.monotonic()
+        if self._values is None or now - self._loaded_at >= get_setting('CONFIG_TTL'):
+            values = {name: get_setting(name) for name in RUNTIME_OPTIONS}
+            try:
+                values.update(get_overrides())
+            except Exception:
+                logger.exception('Не вдалося прочитати налаштування профілювання з файлу.')
+            self._values = values
+            self._loaded_at = now
+        return self._values
+
+    def reset(self):
+        self._values = None
+
+
+class ProfileRecorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        self._dropped = 0
+        self._thread = None
+        self._pid = None
+        self._stopped = threading.Event()
+
+    def record(self, entry):
+        with self._lock:
+            if len(self._pending) >= get_setting('MAX_PENDING'):
+                self._dropped += 1
+                return False
+            self._pending.append(entry)
+        self._ensure_worker()
+        return True
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    @property
+    def dropped(self):
+        return self._dropped
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+            try:
+                self._write(pending)
+            except Exception:
+                logger.exception('Не вдалося записати профілі запитів, їх відкинуто.')
+                return 0
+            return len(pending)
+
+    def get_path(self):
+        return os.path.join(get_directory(), f'requests-{os.getpid()}.jsonl')
+
+    def _write(self, pending):
+        path = self.get_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) >= get_setting('MAX_FILE_BYTES'):
+            os.replace(path, path + '.1')
+        with open(path, 'a', encoding='utf-8') as stream:
+            for entry in pending:
+                stream.write(json.dumps(entry, ensure_ascii=False, default=str))
+                stream.write('\n')
+
+    def _ensure_worker(self):
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='blog-profiler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(get_setting('FLUSH_INTERVAL')):
+            self.flush()
+
+    def shutdown(self):
+        self._stopped.set()
+        self.flush()
+
+
+class QueryRecorder:
+    def __init__(self, keep_sql):
+        self.keep_sql = keep_sql
+        self.count = 0
+        self.total = 0.0
+        self.queries = []
+
+    def add(self, sql, duration):
+        self.count += 1
+        self.total += duration
+        if self.keep_sql and len(self.queries) < get_setting('MAX_QUERIES'):
+            self.queries.append((sql, duration))
+
+
+runtime_config = RuntimeConfig()
+recorder = ProfileRecorder()
+atexit.register(recorder.shutdown)
+
+
+def requested_by_header(request):
+    value = request.headers.get(get_setting('HEADER'))
+    if not value:
+        return False
+    secret = get_setting('HEADER_SECRET')
+    if secret is None:
+        return settings.DEBUG
+    return value == secret
+
+
+def sampling_reason(request, config):
+    if requested_by_header(request):
+        return 'header'
+    rate = config['SAMPLE_RATE'] or 0
+    if rate > 0 and random.random() < rate:
+        return 'sampled'
+    return None
+
+
+def silk_intercept(request):
+    # Silk пише лише ті запити, які вже відібрало вибіркове профілювання
+    return getattr(request, 'profiling_reason', None) is not None
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        reason, threshold = self.start(request)
+        if reason is None and threshold is None:
+            return self.get_response(request)
+        queries = QueryRecorder(keep_sql=True)
+        started = time.perf_counter()
+        with track_queries(queries):
+            response = self.get_response(request)
+        self.finish(request, response, reason, threshold, time.perf_counter() - started, queries)
+        return response
+
+    async def __acall__(self, request):
+        reason, threshold = self.start(request)
+        if reason is None and threshold is None:
+            return await self.get_response(request)
+        queries = QueryRecorder(keep_sql=True)
+        started = time.perf_counter()
+        with track_queries(queries):
+            response = await self.get_response(request)
+        self.finish(request, response, reason, threshold, time.perf_counter() - started, queries)
+        return response
+
+    def start(self, request):
+        config = runtime_config.get()
+        request.profiling_reason = None
+        if not config['ENABLED']:
+            return None, None
+        request.profiling_reason = sampling_reason(request, config)
+        return request.profiling_reason, config['SLOW_THRESHOLD_MS']
+
+    def finish(self, request, response, reason, threshold, duration, queries):
+        duration_ms = duration * 1000
+        if reason is None and threshold is not None and duration_ms >= threshold:
+            reason = 'slow'
+        if reason is not None:
+            recorder.record(self.build_entry(request, response, reason, duration_ms, queries))
+
+    def build_entry(self, request, response, reason, duration_ms, queries):
+        match = getattr(request, 'resolver_match', None)
+        return {
+            'timestamp': timezone.now().isoformat(),
+            'reason': reason,
+            'method': request.method,
+            'path': request.path,
+            'query_string': request.META.get('QUERY_STRING', ''),
+            'route': match.route if match else None,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 3),
+            'query_count': queries.count,
+            'query_ms': round(queries.total * 1000, 3),
+            'queries': [
+                {'sql': sql, 'duration_ms': round(duration * 1000, 3)}
+                for sql, duration in sorted(queries.queries, key=lambda item: item[1], reverse=True)
+            ],
+        }
@@ -0,0 +1,46 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Трекери зберігаються в ContextVar: asgiref копіює контекст у потоки sync_to_async,
+# тож запити асинхронного ORM враховуються так само, як і синхронні
+_active_trackers = ContextVar('blog_query_trackers', default=())
+
+
+def tracked_execute(execute, sql, params, many, context):
+    trackers = _active_trackers.get()
+    if not trackers:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        for tracker in trackers:
+            tracker.add(sql, duration)
+
+
+def install(connection):
+    if tracked_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(tracked_execute)
+
+
+def install_on_connect(sender, connection, **kwargs):
+    install(connection)
+
+
+connection_created.connect(install_on_connect, dispatch_uid='blog_query_tracking')
+
+
+@contextmanager
+def track_queries(tracker):
+    for connection in connections.all(initialized_only=True):
+        install(connection)
+    token = _active_trackers.set(_active_trackers.get() + (tracker,))
+    try:
+        yield tracker
+    finally:
+        _active_trackers.reset(token)
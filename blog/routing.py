@@ -0,0 +1,167 @@
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'REPLICAS': (),
+    'PATH_PREFIXES': ('/blog/',),
+    'PIN_SECONDS': 5,
+    'PIN_COOKIE': 'blog_db_pin',
+    'MAX_LAG_SECONDS': 5,
+    'CHECK_INTERVAL': 5,
+    'RETRY_AFTER': 30,
+}
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Стан маршрутизації поточного запиту; фонові потоки (лічильник переглядів) його не бачать і йдуть у primary
+_request_state = ContextVar('blog_db_routing', default=None)
+
+
+def get_setting(name):
+    return getattr(settings, 'BLOG_DB_ROUTING', {}).get(name, DEFAULTS[name])
+
+
+class RoutingState:
+    __slots__ = ('use_replica', 'wrote')
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+def replica_lag(alias):
+    # Журнал змін пишеться при кожній зміні контенту, тож відставання репліки — це вік
+    # найстарішого запису, якого вона ще не бачить
+    from .models import ChangeLogEntry
+
+    seen = ChangeLogEntry.objects.using(alias).order_by('-id').values_list('id', flat=True).first() or 0
+    missing = (
+        ChangeLogEntry.objects.using(DEFAULT_DB_ALIAS)
+        .filter(id__gt=seen).order_by('id').values_list('created_at', flat=True).first()
+    )
+    if missing is None:
+        return 0.0
+    return max((timezone.now() - missing).total_seconds(), 0.0)
+
+
+class ReplicaPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._status = {}
+
+    def choose(self):
+        healthy = [alias for alias in get_setting('REPLICAS') if self.is_healthy(alias)]
+        return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+    def is_healthy(self, alias):
+        status = self._status.get(alias)
+        if status is not None and time.monotonic() < status[1]:
+            return status[0]
+        with self._lock:
+            status = self._status.get(alias)
+            if status is not None and time.monotonic() < status[1]:
+                return status[0]
+            healthy = self.check(alias)
+            interval = get_setting('CHECK_INTERVAL') if healthy else get_setting('RETRY_AFTER')
+            self._status[alias] = (healthy, time.monotonic() + interval)
+        return healthy
+
+    def check(self, alias):
+        try:
+            lag = replica_lag(alias)
+        except DatabaseError:
+            logger.warning('Репліка %s недоступна, читання йдуть у primary.', alias, exc_info=True)
+            return False
+        if lag > get_setting('MAX_LAG_SECONDS'):
+            logger.warning('Репліка %s відстає на %.1f с, читання йдуть у primary.', alias, lag)
+            return False
+        return True
+
+    def reset(self):
+        with self._lock:
+            self._status.clear()
+
+
+replica_pool = ReplicaPool()
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or not state.use_replica or state.wrote:
+            return DEFAULT_DB_ALIAS
+        return replica_pool.choose()
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            # Після запису запит до кінця читає з primary, щоб бачити власні зміни
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_setting('REPLICAS')}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Репліки отримують схему разом з даними від primary
+        return db == DEFAULT_DB_ALIAS
+
+
+class DatabaseRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.start(request)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.finish(state, response)
+
+    def start(self, request):
+        use_replica = (
+            bool(get_setting('REPLICAS'))
+            and request.method in SAFE_METHODS
+            and request.path.startswith(tuple(get_setting('PATH_PREFIXES')))
+            # Клієнт, який щойно писав, деякий час читає з primary
+            and get_setting('PIN_COOKIE') not in request.COOKIES
+        )
+        return RoutingState(use_replica)
+
+    def finish(self, state, response):
+        if state.wrote and get_setting('PIN_SECONDS'):
+            response.set_cookie(
+                get_setting('PIN_COOKIE'), '1', max_age=get_setting('PIN_SECONDS'), httponly=True, samesite='Lax'
+            )
+        return response
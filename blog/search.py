@@ -0,0 +1,221 @@
+import re
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+
+SearchHit = namedtuple('SearchHit', ['id', 'score'])
+
+MAX_TERMS = 10
+MIN_PREFIX_LENGTH = 2
+SNIPPET_TOKENS = 24
+
+# Службові символи замість тегів: текст екрануємо вже після SQL, а потім підставляємо <mark>
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+TOKEN_RE = re.compile(r'"([^"]*)"|(\w+)(\*?)')
+WORD_RE = re.compile(r'\w+')
+
+
+class SearchTerm(namedtuple('SearchTerm', ['words', 'prefix'])):
+    @property
+    def is_phrase(self):
+        return len(self.words) > 1
+
+
+def parse_query(text):
+    terms = []
+    for phrase, word, star in TOKEN_RE.findall(text or ''):
+        words = WORD_RE.findall(phrase) if phrase else [word]
+        if not words:
+            continue
+        prefix = bool(star) and len(words[0]) >= MIN_PREFIX_LENGTH
+        terms.append(SearchTerm(tuple(word.lower() for word in words), prefix))
+        if len(terms) >= MAX_TERMS:
+            break
+    return terms
+
+
+def render_snippet(raw):
+    if not raw:
+        return ''
+    return escape(raw).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+
+
+class SearchBackend:
+    indexed_fields = ('title', 'excerpt', 'content', 'published_at')
+
+    def index_post(self, post):
+        if post.published_at is None:
+            self.remove_post(post.pk)
+        else:
+            self.update_post(post)
+
+    def update_post(self, post):
+        raise NotImplementedError
+
+    def remove_post(self, post_id):
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def search(self, terms, limit, after=None):
+        raise NotImplementedError
+
+    def snippets(self, terms, post_ids):
+        raise NotImplementedError
+
+
+class SQLiteSearchBackend(SearchBackend):
+    table = 'blog_post_fts'
+    # Ваги bm25 для колонок title, excerpt, content
+    weights = (10.0, 4.0, 1.0)
+
+    def match_expression(self, terms):
+        parts = []
+        for term in terms:
+            part = '"{}"'.format(' '.join(term.words))
+            parts.append(part + '*' if term.prefix else part)
+        return ' AND '.join(parts)
+
+    def update_post(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [post.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, title, excerpt, content) VALUES (%s, %s, %s, %s)',
+                [post.pk, post.title, post.excerpt, post.content],
+            )
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [post_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, title, excerpt, content) '
+                'SELECT id, title, excerpt, content FROM blog_post WHERE published_at IS NOT NULL'
+            )
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+            cursor.execute(f'SELECT count(*) FROM {self.table}')
+            return cursor.fetchone()[0]
+
+    def search(self, terms, limit, after=None):
+        weights = ', '.join(str(weight) for weight in self.weights)
+        sql = (
+            f'SELECT id, score FROM ('
+            f'SELECT rowid AS id, bm25({self.table}, {weights}) AS score '
+            f'FROM {self.table} WHERE {self.table} MATCH %s'
+            f')'
+        )
+        params = [self.match_expression(terms)]
+        if after is not None:
+            sql += ' WHERE score > %s OR (score = %s AND id > %s)'
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY score, id LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [SearchHit(*row) for row in cursor.fetchall()]
+
+    def snippets(self, terms, post_ids):
+        if not post_ids:
+            return {}
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        sql = (
+            f"SELECT rowid, snippet({self.table}, -1, %s, %s, '…', {SNIPPET_TOKENS}) "
+            f'FROM {self.table} WHERE {self.table} MATCH %s AND rowid IN ({placeholders})'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [HIGHLIGHT_START, HIGHLIGHT_END, self.match_expression(terms), *post_ids])
+            return {post_id: render_snippet(raw) for post_id, raw in cursor.fetchall()}
+
+
+class PostgresSearchBackend(SearchBackend):
+    table = 'blog_post_search'
+    config = 'simple'
+    document = (
+        "setweight(to_tsvector(%(config)s, coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector(%(config)s, coalesce(excerpt, '')), 'B') || "
+        "setweight(to_tsvector(%(config)s, coalesce(content, '')), 'D')"
+    )
+
+    def tsquery(self, terms):
+        parts = []
+        for term in terms:
+            words = [f"'{word}'" for word in term.words]
+            if term.prefix:
+                words[-1] += ':*'
+            parts.append('(' + ' <-> '.join(words) + ')' if term.is_phrase else words[0])
+        return ' & '.join(parts)
+
+    def update_post(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {self.table} (post_id, document) '
+                f'SELECT id, {self.document} FROM blog_post WHERE id = %(id)s '
+                f'ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document',
+                {'config': self.config, 'id': post.pk},
+            )
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE post_id = %s', [post_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (post_id, document) '
+                f'SELECT id, {self.document} FROM blog_post WHERE published_at IS NOT NULL',
+                {'config': self.config},
+            )
+            return cursor.rowcount
+
+    def search(self, terms, limit, after=None):
+        # Ранг інвертуємо, щоб порядок і курсор були однакові з SQLite (менше — краще)
+        sql = (
+            f'SELECT id, score FROM ('
+            f'SELECT s.post_id AS id, -ts_rank_cd(s.document, q) AS score '
+            f'FROM {self.table} s, to_tsquery(%(config)s, %(query)s) q WHERE s.document @@ q'
+            f') ranked'
+        )
+        params = {'config': self.config, 'query': self.tsquery(terms), 'limit': limit}
+        if after is not None:
+            sql += ' WHERE score > %(score)s::real OR (score = %(score)s::real AND id > %(id)s)'
+            params.update(score=after[0], id=after[1])
+        sql += ' ORDER BY score, id LIMIT %(limit)s'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [SearchHit(*row) for row in cursor.fetchall()]
+
+    def snippets(self, terms, post_ids):
+        if not post_ids:
+            return {}
+        options = f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=35, MinWords=15'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT id, ts_headline(%(config)s, content, to_tsquery(%(config)s, %(query)s), %(options)s) '
+                'FROM blog_post WHERE id = ANY(%(ids)s)',
+                {'config': self.config, 'query': self.tsquery(terms), 'options': options, 'ids': list(post_ids)},
+            )
+            return {post_id: render_snippet(raw) for post_id, raw in cursor.fetchall()}
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend():
+    path = getattr(settings, 'BLOG_SEARCH', {}).get('BACKEND')
+    if path:
+        return import_string(path)()
+    backend_class = BACKENDS.get(connection.vendor)
+    return backend_class() if backend_class is not None else None
@@ -1,23 +1,13 @@
 from rest_framework import serializers
+from django.db.models.functions import Lower
 from .models import User, Post, Category, Comment
-from django.db.models import Count, Sum
-
-def _get_related_count(obj, attr_name, fallback_qs_func=None):
-    rel = getattr(obj, attr_name, None)
-    if rel is not None:
-        try:
-            return rel.count() if hasattr(rel, 'count') else len(rel)
-        except Exception:
-            pass
-    if fallback_qs_func:
-        try:
-            return int(fallback_qs_func(obj)) or 0
-        except Exception:
-            return 0
-    return 0
+from .comments import COMMENT_DEPTH, comment_page_link, load_comment_pages
+from .sparse import SparseFieldsMixin, trim_queryset
 
+# Без них не зібрати дерево й курсор коментарів, навіть якщо клієнт їх не запитував
+COMMENT_TREE_FIELDS = ('post', 'parent', 'created_at')
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     bio = serializers.SerializerMethodField(read_only=True)
     avatar = serializers.SerializerMethodField(read_only=True)
     posts_count = serializers.SerializerMethodField(read_only=True)
@@ -28,6 +18,13 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['username', 'email', 'bio', 'avatar', 'posts_count', 'full_name']
 
+    model_dependencies = {
+        'bio': (),
+        'avatar': (),
+        'posts_count': ('post_count',),
+        'full_name': ('first_name', 'last_name', 'username'),
+    }
+
     def get_bio(self, obj):
         if getattr(obj, 'bio', None):
             return obj.bio
@@ -54,7 +51,7 @@ class UserSerializer(serializers.ModelSerializer):
         return None
 
     def get_posts_count(self, obj):
-        return _get_related_count(obj, 'posts', lambda o: Post.objects.filter(author=o).count())
+        return obj.post_count
 
     def get_full_name(self, obj):
         first = (getattr(obj, 'first_name', '') or '').strip()
@@ -67,7 +64,7 @@ class UserSerializer(serializers.ModelSerializer):
     def validate_email(self, value):
         if not value:
             return value
-        qs = User.objects.filter(email__iexact=value)
+        qs = User.objects.alias(email_lower=Lower('email')).filter(email_lower=value.lower())
         instance = getattr(self, 'instance', None)
         if instance is not None:
             qs = qs.exclude(pk=instance.pk)
@@ -76,22 +73,20 @@ class UserSerializer(serializers.ModelSerializer):
         return value
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     posts_count = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Category
         fields = ['name', 'description', 'posts_count']
 
+    model_dependencies = {'posts_count': ('post_count',)}
+
     def get_posts_count(self, obj):
-        return _get_related_count(
-            obj,
-            'posts',
-            lambda o: Post.objects.filter(category=o).count() if hasattr(Post, 'objects') else 0
-        )
+        return obj.post_count
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     replies = serializers.SerializerMethodField(read_only=True)
 
@@ -100,16 +95,31 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ['id', 'post', 'author', 'content', 'parent', 'is_approved', 'created_at', 'replies']
         read_only_fields = ['author', 'created_at']
 
+    expandable_fields = {'author': 'author_id', 'replies': None}
+    model_dependencies = {'replies': ()}
+
+    def get_thread_queryset(self):
+        return trim_queryset(Comment.objects.for_thread().approved(), self, extra=COMMENT_TREE_FIELDS)
+
+    def get_reply_depth(self):
+        if 'replies' not in self.fields:
+            return 0
+        return int(self.context.get('comment_depth', COMMENT_DEPTH))
+
     def get_replies(self, obj):
+        depth = int(self.context.get('comment_depth', COMMENT_DEPTH))
+        if depth <= 0:
+            return []
+        thread_replies = getattr(obj, 'thread_replies', None)
+        if thread_replies is not None:
+            new_context = dict(self.context, comment_depth=depth - 1)
+            return self.nested(CommentSerializer, context=new_context, many=True).to_representation(thread_replies)
         qs = getattr(obj, 'replies', None)
         if not qs:
             return []
-        depth = int(self.context.get('comment_depth', 3))
-        if depth <= 0:
-            return []
         try:
             new_context = dict(self.context, comment_depth=depth - 1)
-            return CommentSerializer(qs.all(), many=True, context=new_context).data
+            return self.nested(CommentSerializer, context=new_context, many=True).to_representation(qs.all())
         except Exception:
             try:
                 return [
@@ -137,7 +147,7 @@ class PostValidationMixin:
         return value
 
 
-class PostListSerializer(PostValidationMixin, serializers.ModelSerializer):
+class PostListSerializer(SparseFieldsMixin, PostValidationMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
     reading_time = serializers.SerializerMethodField(read_only=True)
@@ -148,13 +158,11 @@ class PostListSerializer(PostValidationMixin, serializers.ModelSerializer):
         fields = ['id', 'title', 'excerpt', 'author', 'category', 'featured_image', 'status', 'views', 'published_at', 'reading_time', 'comments_count']
         read_only_fields = ['author', 'views', 'created_at', 'updated_at', 'published_at']
 
+    expandable_fields = {'author': 'author_id', 'category': 'category_id'}
+    model_dependencies = {'reading_time': ('word_count',), 'comments_count': ('comment_count',)}
+
     def get_reading_time(self, obj):
-        try:
-            return obj.get_reading_time()
-        except Exception:
-            content = getattr(obj, 'content', '') or ''
-            words = len(content.split())
-            return words // 200 + (1 if words % 200 > 0 else 0)
+        return obj.get_reading_time()
 
     def get_comments_count(self, obj):
         try:
@@ -166,19 +174,65 @@ class PostListSerializer(PostValidationMixin, serializers.ModelSerializer):
             return 0
 
 
-class PostDetailSerializer(PostValidationMixin, serializers.ModelSerializer):
+class PostSearchResultSerializer(PostListSerializer):
+    score = serializers.SerializerMethodField(read_only=True)
+    snippet = serializers.CharField(source='search_snippet', read_only=True, default='')
+
+    class Meta(PostListSerializer.Meta):
+        fields = PostListSerializer.Meta.fields + ['score', 'snippet']
+
+    model_dependencies = dict(PostListSerializer.model_dependencies, score=())
+
+    def get_score(self, obj):
+        # Бекенди повертають ранг "менше — краще", назовні віддаємо релевантність
+        return round(-obj.search_score, 6)
+
+
+class PostDetailSerializer(SparseFieldsMixin, PostValidationMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
-    comments = CommentSerializer(many=True, read_only=True)
+    comments = serializers.SerializerMethodField(read_only=True)
+    comments_next = serializers.SerializerMethodField(read_only=True)
     reading_time = serializers.SerializerMethodField(read_only=True)
     comments_count = serializers.SerializerMethodField(read_only=True)
     tags = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Post
-        fields = ['id', 'title', 'content', 'excerpt', 'author', 'category', 'tags', 'featured_image', 'status', 'views', 'published_at', 'reading_time', 'comments_count', 'comments', 'created_at', 'updated_at']
+        fields = ['id', 'title', 'content', 'excerpt', 'author', 'category', 'tags', 'featured_image', 'status', 'views', 'published_at', 'reading_time', 'comments_count', 'comments', 'comments_next', 'created_at', 'updated_at']
         read_only_fields = ['author', 'views', 'created_at', 'updated_at', 'published_at']
 
+    expandable_fields = {'author': 'author_id', 'category': 'category_id', 'comments': None}
+    model_dependencies = {
+        'comments': (),
+        'comments_next': (),
+        'tags': (),
+        'reading_time': ('word_count',),
+        'comments_count': ('comment_count',),
+    }
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if 'comments' not in fields:
+            fields.pop('comments_next', None)
+        return fields
+
+    def get_comment_serializer(self):
+        return self.nested(CommentSerializer, 'comments', many=True)
+
+    def get_comment_page(self, obj):
+        # Вбудовується лише перша сторінка коментарів, решта — через comments_next
+        if getattr(obj, 'comment_page', None) is None:
+            comments = self.get_comment_serializer().child
+            load_comment_pages([obj], comments.get_thread_queryset(), comments.get_reply_depth())
+        return obj.comment_page
+
+    def get_comments(self, obj):
+        return self.get_comment_serializer().to_representation(self.get_comment_page(obj).comments)
+
+    def get_comments_next(self, obj):
+        return comment_page_link(self.context.get('request'), obj.pk, self.get_comment_page(obj).next_position)
+
     def get_tags(self, obj):
         tags_attr = getattr(obj, 'tags', None)
         if tags_attr is None:
@@ -192,12 +246,7 @@ class PostDetailSerializer(PostValidationMixin, serializers.ModelSerializer):
                 return []
 
     def get_reading_time(self, obj):
-        try:
-            return obj.get_reading_time()
-        except Exception:
-            content = getattr(obj, 'content', '') or ''
-            words = len(content.split())
-            return words // 200 + (1 if words % 200 > 0 else 0)
+        return obj.get_reading_time()
 
     def get_comments_count(self, obj):
         try:
@@ -209,78 +258,53 @@ class PostDetailSerializer(PostValidationMixin, serializers.ModelSerializer):
             return 0
 
 
+def top_posts_queryset():
+    return Post.objects.for_list().order_by('-views', '-id')[:5]
+
+
+def top_authors_queryset():
+    return User.objects.filter(post_count__gt=0).order_by('-post_count', 'id')[:3]
+
+
 class BlogStatisticsSerializer(serializers.Serializer):
-    total_posts = serializers.SerializerMethodField()
-    published_posts = serializers.SerializerMethodField()
+    total_posts = serializers.IntegerField(source='posts_count')
+    published_posts = serializers.IntegerField(source='published_count')
     drafts_count = serializers.SerializerMethodField()
-    total_comments = serializers.SerializerMethodField()
-    total_views = serializers.SerializerMethodField()
+    total_comments = serializers.IntegerField(source='comments_count')
+    total_views = serializers.IntegerField(source='views_total')
     top_posts = serializers.SerializerMethodField()
     top_authors = serializers.SerializerMethodField()
 
-    def get_total_posts(self, obj):
-        return Post.objects.count()
-
-    def get_published_posts(self, obj):
-        try:
-            return Post.objects.filter(published_at__isnull=False).count()
-        except Exception:
-            try:
-                return Post.objects.filter(status__iexact='published').count()
-            except Exception:
-                return 0
-
     def get_drafts_count(self, obj):
-        return max(self.get_total_posts(obj) - self.get_published_posts(obj), 0)
-
-    def get_total_comments(self, obj):
-        return Comment.objects.count()
-
-    def get_total_views(self, obj):
-        return Post.objects.aggregate(total=Sum('views'))['total'] or 0
+        return max(obj.posts_count - obj.published_count, 0)
 
     def get_top_posts(self, obj):
-        qs = Post.objects.order_by('-views')[:5]
+        # Асинхронний шлях завантажує списки заздалегідь, щоб серіалізація не ходила в БД
+        qs = getattr(obj, 'top_posts', None)
+        if qs is None:
+            qs = top_posts_queryset()
         return PostListSerializer(qs, many=True, context=self.context).data
 
     def get_top_authors(self, obj):
-        authors_agg = (
-            Post.objects.values('author')
-            .annotate(posts_count=Count('id'))
-            .order_by('-posts_count')[:3]
-        )
-        author_ids = [a['author'] for a in authors_agg if a.get('author') is not None]
-        users = {u.id: u for u in User.objects.filter(id__in=author_ids)}
-        result = []
-        for a in authors_agg:
-            au_id = a.get('author')
-            user = users.get(au_id)
-            result.append({
-                'author': UserSerializer(user, context=self.context).data if user else None,
-                'posts_count': int(a.get('posts_count', 0))
-            })
-        return result
+        users = getattr(obj, 'top_authors', None)
+        if users is None:
+            users = top_authors_queryset()
+        return [
+            {
+                'author': UserSerializer(user, context=self.context).data,
+                'posts_count': user.post_count,
+            }
+            for user in users
+        ]
 
 
 class CategoryStatisticsSerializer(serializers.Serializer):
     category = CategorySerializer(read_only=True)
     posts_count = serializers.IntegerField()
-    total_views = serializers.IntegerField()
-    avg_comments_per_post = serializers.FloatField()
-
-    def to_representation(self, obj):
-        category = obj
-        category_data = CategorySerializer(category, context=self.context).data
-
-        posts_qs = Post.objects.filter(category=category)
-        posts_count = posts_qs.count()
-        total_views = posts_qs.aggregate(total=Sum('views'))['total'] or 0
-        total_comments = Comment.objects.filter(post__category=category).count()
-        avg_comments = round(total_comments / posts_count, 2) if posts_count > 0 else 0.0
-
-        return {
-            'category': category_data,
-            'posts_count': int(posts_count),
-            'total_views': int(total_views),
-            'avg_comments_per_post': float(avg_comments),
-        }
\ No newline at end of file
+    total_views = serializers.IntegerField(source='views_total')
+    avg_comments_per_post = serializers.SerializerMethodField()
+
+    def get_avg_comments_per_post(self, obj):
+        if obj.posts_count <= 0:
+            return 0.0
+        return float(round(obj.comments_count / obj.posts_count, 2))
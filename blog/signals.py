@@ -0,0 +1,203 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .authentication import user_cache
+from .caching import bump_generation
+from .changes import RESOURCES as CHANGE_RESOURCES, record_change, record_changes
+from .counters import shift_counter
+from .models import User, Category, Post, Comment, StatisticsRollup
+from .search import SearchBackend, get_backend
+from .statistics import shift_rollups
+from .trending import record_activity
+
+
+def _post_category_id(comment):
+    if 'post' in comment._state.fields_cache and comment.post is not None:
+        return comment.post.category_id
+    return Post.objects.filter(pk=comment.post_id).values_list('category_id', flat=True).first()
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_state(sender, instance, raw=False, **kwargs):
+    instance._previous_state = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._previous_state = (
+        Post.objects.filter(pk=instance.pk).values('author_id', 'category_id', 'published_at', 'views').first()
+    )
+
+
+@receiver(post_save, sender=Post)
+def update_post_counters(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_state', None)
+    published = int(instance.published_at is not None)
+    if created or previous is None:
+        shift_counter(User, instance.author_id, 'post_count', 1)
+        shift_counter(Category, instance.category_id, 'post_count', 1)
+        shift_rollups(instance.category_id, posts_count=1, published_count=published, views_total=instance.views)
+        return
+    if previous['author_id'] != instance.author_id:
+        shift_counter(User, previous['author_id'], 'post_count', -1)
+        shift_counter(User, instance.author_id, 'post_count', 1)
+    was_published = int(previous['published_at'] is not None)
+    if previous['category_id'] == instance.category_id:
+        # save() не пише перегляди (їх змінює лише буфер переглядів), тож у зведеннях вони не зсуваються
+        shift_rollups(instance.category_id, published_count=published - was_published)
+        return
+    shift_counter(Category, previous['category_id'], 'post_count', -1)
+    shift_counter(Category, instance.category_id, 'post_count', 1)
+    shift_rollups(None, published_count=published - was_published)
+    comments = Comment.objects.filter(post=instance).count()
+    shift_rollups(
+        previous['category_id'], include_global=False,
+        posts_count=-1, published_count=-was_published, views_total=-previous['views'], comments_count=-comments,
+    )
+    shift_rollups(
+        instance.category_id, include_global=False,
+        posts_count=1, published_count=published, views_total=previous['views'], comments_count=comments,
+    )
+
+
+@receiver(pre_delete, sender=Post)
+def remember_post_views(sender, instance, **kwargs):
+    # Перегляди екземпляра могли застаріти після флашу буфера, у зведеннях віднімаємо записані в базі
+    instance._stored_views = Post.objects.filter(pk=instance.pk).values_list('views', flat=True).first()
+
+
+@receiver(post_delete, sender=Post)
+def release_post_counters(sender, instance, **kwargs):
+    shift_counter(User, instance.author_id, 'post_count', -1)
+    shift_counter(Category, instance.category_id, 'post_count', -1)
+    views = getattr(instance, '_stored_views', None)
+    shift_rollups(
+        instance.category_id,
+        posts_count=-1, published_count=-int(instance.published_at is not None),
+        views_total=-(instance.views if views is None else views),
+    )
+
+
+@receiver(post_save, sender=Post)
+def index_post_for_search(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(SearchBackend.indexed_fields):
+        return
+    backend = get_backend()
+    if backend is not None:
+        backend.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_from_search(sender, instance, **kwargs):
+    backend = get_backend()
+    if backend is not None:
+        backend.remove_post(instance.pk)
+
+
+@receiver(pre_save, sender=Comment)
+def remember_comment_state(sender, instance, raw=False, **kwargs):
+    instance._previous_state = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._previous_state = (
+        Comment.objects.filter(pk=instance.pk).values('post_id', 'is_approved').first()
+    )
+
+
+@receiver(post_save, sender=Comment)
+def update_comment_counters(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_state', None)
+    if created or previous is None:
+        if instance.is_approved:
+            shift_counter(Post, instance.post_id, 'comment_count', 1)
+        shift_rollups(_post_category_id(instance), comments_count=1)
+        return
+    if previous['post_id'] != instance.post_id:
+        previous_category_id = Post.objects.filter(pk=previous['post_id']).values_list('category_id', flat=True).first()
+        shift_rollups(previous_category_id, include_global=False, comments_count=-1)
+        shift_rollups(_post_category_id(instance), include_global=False, comments_count=1)
+    if previous['is_approved']:
+        shift_counter(Post, previous['post_id'], 'comment_count', -1)
+    if instance.is_approved:
+        shift_counter(Post, instance.post_id, 'comment_count', 1)
+
+
+@receiver(post_save, sender=Comment)
+def track_comment_activity(sender, instance, created, raw=False, **kwargs):
+    if raw or not instance.is_approved:
+        return
+    previous = getattr(instance, '_previous_state', None)
+    # Для рейтингу важить момент, коли коментар став видимим
+    if created or previous is None or not previous['is_approved']:
+        record_activity({instance.post_id: 1}, 'comments')
+
+
+@receiver(post_delete, sender=Comment)
+def release_comment_counters(sender, instance, **kwargs):
+    if instance.is_approved:
+        shift_counter(Post, instance.post_id, 'comment_count', -1)
+    shift_rollups(_post_category_id(instance), comments_count=-1)
+
+
+@receiver(post_save, sender=Category)
+def create_category_rollup(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        StatisticsRollup.objects.get_or_create(category=instance)
+
+
+CACHE_RESOURCES = {
+    Post: 'post',
+    Comment: 'comment',
+    Category: 'category',
+    User: 'user',
+}
+
+
+def invalidate_cached_responses(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if sender is User and update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    resource = CACHE_RESOURCES[sender]
+    transaction.on_commit(lambda: bump_generation(resource))
+
+
+for model in CACHE_RESOURCES:
+    post_save.connect(invalidate_cached_responses, sender=model, dispatch_uid=f'blog_cache_save_{model.__name__}')
+    post_delete.connect(invalidate_cached_responses, sender=model, dispatch_uid=f'blog_cache_delete_{model.__name__}')
+
+
+def log_saved_change(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        record_change(instance, 'created' if created else 'updated')
+
+
+def log_deleted_change(sender, instance, **kwargs):
+    record_change(instance, 'deleted')
+
+
+for model in CHANGE_RESOURCES:
+    post_save.connect(log_saved_change, sender=model, dispatch_uid=f'blog_changes_save_{model.__name__}')
+    post_delete.connect(log_deleted_change, sender=model, dispatch_uid=f'blog_changes_delete_{model.__name__}')
+
+
+@receiver(pre_delete, sender=Category)
+def log_category_posts_change(sender, instance, **kwargs):
+    # SET_NULL знімає категорію зі статей одним UPDATE без сигналів, тож їхні зміни журналюємо тут
+    post_ids = Post.objects.filter(category=instance).values_list('pk', flat=True)
+    record_changes('post', list(post_ids), 'updated')
+
+
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Скидаємо і одразу, і після коміту, щоб паралельний запит не закешував старий стан
+    user_cache.invalidate(instance.pk)
+    transaction.on_commit(lambda: user_cache.invalidate(instance.pk))
+
+
+post_save.connect(invalidate_cached_user, sender=User, dispatch_uid='blog_auth_cache_save')
+post_delete.connect(invalidate_cached_user, sender=User, dispatch_uid='blog_auth_cache_delete')
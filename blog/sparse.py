@@ -0,0 +1,140 @@
+from collections import namedtuple
+
+from rest_framework import serializers
+
+
+def parse_paths(value):
+    # "id,author.username" -> {'id': {}, 'author': {'username': {}}}
+    if value is None:
+        return None
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for part in path.split('.'):
+            part = part.strip()
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+class Sparse(namedtuple('Sparse', ['fields', 'expand'])):
+    # fields=None — усі поля; expand=None — усі зв'язки розгорнуті
+    def expands(self, name):
+        if self.expand is None or name in self.expand:
+            return True
+        # Запит вкладених полів неявно розгортає зв'язок
+        return bool(self.fields and self.fields.get(name))
+
+    def child(self, name):
+        return Sparse(
+            (self.fields.get(name) or None) if self.fields is not None else None,
+            (self.expand.get(name) or None) if self.expand is not None else None,
+        )
+
+
+FULL = Sparse(None, None)
+
+
+def sparse_from_request(request):
+    fields = parse_paths(request.query_params.get('fields'))
+    # Порожній ?fields= означає всі поля, а порожній ?expand= згортає всі зв'язки
+    return Sparse(fields or None, parse_paths(request.query_params.get('expand')))
+
+
+class SparseFieldsMixin:
+    # Зв'язки, які без ?expand= згортаються до ідентифікатора (None — поле прибирається)
+    expandable_fields = {}
+    # Поля моделі, з яких рахуються SerializerMethodField
+    model_dependencies = {}
+
+    def get_sparse(self):
+        sparse = getattr(self, '_sparse', None)
+        if sparse is None:
+            sparse = self.context.get('sparse') or FULL
+        return sparse
+
+    def get_fields(self):
+        fields = super().get_fields()
+        sparse = self.get_sparse()
+        if sparse.fields is not None:
+            fields = {name: field for name, field in fields.items() if name in sparse.fields}
+        for name, source in self.expandable_fields.items():
+            if name not in fields or sparse.expands(name):
+                continue
+            if source is None:
+                del fields[name]
+            else:
+                fields[name] = serializers.IntegerField(source=source, read_only=True)
+        for name, field in fields.items():
+            child = getattr(field, 'child', field)
+            if isinstance(child, SparseFieldsMixin):
+                child._sparse = sparse.child(name)
+        return fields
+
+    def nested(self, serializer_class, name=None, context=None, **kwargs):
+        # name=None — вкладений серіалізатор отримує той самий набір полів (рекурсивні відповіді)
+        serializer = serializer_class(context=self.context if context is None else context, **kwargs)
+        sparse = self.get_sparse()
+        getattr(serializer, 'child', serializer)._sparse = sparse if name is None else sparse.child(name)
+        return serializer
+
+
+def _model_field(model, source):
+    try:
+        return model._meta.get_field(source)
+    except Exception:
+        return None
+
+
+def _collect(serializer, model, prefix, only, related):
+    if not isinstance(serializer, SparseFieldsMixin):
+        return False
+    only.add(prefix + model._meta.pk.name)
+    for name, field in serializer.fields.items():
+        if isinstance(field, serializers.BaseSerializer):
+            relation = _model_field(model, field.source)
+            if relation is None or not (relation.many_to_one or relation.one_to_one):
+                return False
+            only.add(prefix + relation.name)
+            related.append(prefix + relation.name)
+            if not _collect(field, relation.related_model, f'{prefix}{relation.name}__', only, related):
+                return False
+        elif name in serializer.model_dependencies:
+            only.update(prefix + dependency for dependency in serializer.model_dependencies[name])
+        elif field.source == '*' or '.' in field.source:
+            # Невідомо, які атрибути читає поле, — краще не обрізати вибірку взагалі
+            return False
+        else:
+            model_field = _model_field(model, field.source)
+            if model_field is not None and model_field.concrete:
+                only.add(prefix + model_field.name)
+    return True
+
+
+def trim_queryset(queryset, serializer, extra=()):
+    only, related = set(), []
+    if not _collect(serializer, queryset.model, '', only, related):
+        return queryset
+    for name in extra:
+        model_field = _model_field(queryset.model, name)
+        if model_field is not None and model_field.concrete:
+            only.add(model_field.name)
+    queryset = queryset.select_related(None)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*only)
+
+
+def ordering_fields(paginator):
+    return [name.lstrip('-') for name in getattr(paginator, 'ordering', ())]
+
+
+class SparseQuerysetMixin:
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['sparse'] = sparse_from_request(self.request)
+        return context
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return trim_queryset(queryset, self.get_serializer(), extra=ordering_fields(self.paginator))
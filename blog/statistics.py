@@ -0,0 +1,138 @@
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Category, Post, Comment, StatisticsRollup
+
+ROLLUP_FIELDS = ('posts_count', 'published_count', 'comments_count', 'views_total')
+
+
+def shift_rollups(category_id, include_global=True, **deltas):
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    scope = Q(category_id=category_id) if category_id is not None else Q(pk__in=[])
+    if include_global:
+        scope |= Q(category__isnull=True)
+    StatisticsRollup.objects.filter(scope).update(
+        **{field: Greatest(F(field) + delta, 0) for field, delta in deltas.items()}
+    )
+
+
+def record_views(views_by_post):
+    if not views_by_post:
+        return
+    views_by_category = defaultdict(int)
+    rows = Post.objects.filter(pk__in=list(views_by_post)).values_list('pk', 'category_id')
+    for post_id, category_id in rows:
+        if category_id is not None:
+            views_by_category[category_id] += views_by_post[post_id]
+    shift_rollups(None, views_total=sum(views_by_post.values()))
+    for category_id, views in views_by_category.items():
+        shift_rollups(category_id, include_global=False, views_total=views)
+
+
+def compute_rollup_values(category_id=None):
+    posts = Post.objects.order_by()
+    comments = Comment.objects.order_by()
+    if category_id is not None:
+        posts = posts.filter(category_id=category_id)
+        comments = comments.filter(post__category_id=category_id)
+    totals = posts.aggregate(
+        posts_count=Count('pk'),
+        published_count=Count('pk', filter=Q(published_at__isnull=False)),
+        views_total=Sum('views'),
+    )
+    return {
+        'posts_count': totals['posts_count'],
+        'published_count': totals['published_count'],
+        'views_total': totals['views_total'] or 0,
+        'comments_count': comments.count(),
+    }
+
+
+def _scope(category_id):
+    if category_id is None:
+        return Q(category__isnull=True)
+    return Q(category_id=category_id)
+
+
+def refresh_rollup(category_id=None):
+    values = dict(compute_rollup_values(category_id), refreshed_at=timezone.now())
+    updated = StatisticsRollup.objects.filter(_scope(category_id)).update(**values)
+    if not updated:
+        try:
+            with transaction.atomic():
+                StatisticsRollup.objects.create(category_id=category_id, **values)
+        except IntegrityError:
+            pass
+    return StatisticsRollup.objects.select_related('category').filter(_scope(category_id)).first()
+
+
+def refresh_all_rollups():
+    now = timezone.now()
+    per_category = {
+        category_id: {'posts_count': 0, 'published_count': 0, 'comments_count': 0, 'views_total': 0}
+        for category_id in Category.objects.values_list('pk', flat=True)
+    }
+    post_totals = (
+        Post.objects.order_by().filter(category__isnull=False).values('category_id').annotate(
+            posts_count=Count('pk'),
+            published_count=Count('pk', filter=Q(published_at__isnull=False)),
+            views_total=Sum('views'),
+        )
+    )
+    for row in post_totals:
+        values = per_category.get(row['category_id'])
+        if values is not None:
+            values.update(
+                posts_count=row['posts_count'],
+                published_count=row['published_count'],
+                views_total=row['views_total'] or 0,
+            )
+    comment_totals = (
+        Comment.objects.order_by().filter(post__category__isnull=False)
+        .values('post__category_id').annotate(total=Count('pk'))
+    )
+    for row in comment_totals:
+        values = per_category.get(row['post__category_id'])
+        if values is not None:
+            values['comments_count'] = row['total']
+
+    with transaction.atomic():
+        existing = {
+            rollup.category_id: rollup
+            for rollup in StatisticsRollup.objects.select_for_update().filter(category__isnull=False)
+        }
+        to_update, to_create = [], []
+        for category_id, values in per_category.items():
+            rollup = existing.get(category_id)
+            if rollup is None:
+                to_create.append(StatisticsRollup(category_id=category_id, refreshed_at=now, **values))
+                continue
+            for field, value in values.items():
+                setattr(rollup, field, value)
+            rollup.refreshed_at = now
+            to_update.append(rollup)
+        StatisticsRollup.objects.bulk_update(to_update, [*ROLLUP_FIELDS, 'refreshed_at'], batch_size=500)
+        StatisticsRollup.objects.bulk_create(to_create, batch_size=500)
+        refresh_rollup(None)
+    return len(per_category) + 1
+
+
+def get_rollup(category_id=None, refresh_missing=True):
+    rollup = StatisticsRollup.objects.select_related('category').filter(_scope(category_id)).first()
+    if rollup is None and refresh_missing:
+        return refresh_rollup(category_id)
+    return rollup
+
+
+async def aget_rollup(category_id=None, refresh_missing=True):
+    rollup = await StatisticsRollup.objects.select_related('category').filter(_scope(category_id)).afirst()
+    if rollup is None and refresh_missing:
+        return await sync_to_async(refresh_rollup)(category_id)
+    return rollup
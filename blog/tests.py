@@ -1,3 +1,1176 @@
-from django.test import TestCase
+import base64
+import copy
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import CachedJWTAuthentication, UserCache, api_settings, user_cache
+from . import urls as blog_urls
+from .benchmarks import QUERY_BUDGETS, SQLITE_BASELINE_SETTINGS, compare_results, run_endpoint_benchmarks
+from .changes import ChangesExpired
+from .checks import check_generation_cache
+from .metrics import MetricsRegistry
+from .models import (
+    WORDS_PER_MINUTE, User, Category, Post, Comment, ChangeLogEntry, PostActivity, StatisticsRollup, count_words,
+)
+from .profiling import RuntimeConfig, clear_overrides, set_overrides
+from .routing import DatabaseRoutingMiddleware, replica_lag, replica_pool
+from .statistics import ROLLUP_FIELDS, compute_rollup_values, refresh_all_rollups
+from .trending import hour_of, refresh_trending, refresh_trending_if_due
+from .view_counter import ViewCounterBuffer, view_counter
+
+# Дзеркало primary для тестів маршрутизації: тестовий раннер налаштовує дзеркала ще до створення баз,
+# тож псевдонім додається під час імпорту модуля
+REPLICA_ALIAS = 'replica_test'
+connections.settings.setdefault(REPLICA_ALIAS, dict(
+    copy.deepcopy(connections.settings['default']),
+    TEST=dict(connections.settings['default']['TEST'], MIRROR='default'),
+))
+
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'blog-tests'},
+    'generations': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'blog-tests-generations'},
+}
+
+
+def create_post(author, category=None, published_at=None):
+    return Post.objects.create(
+        title='Стаття', author=author, category=category, content='один два три', excerpt='опис',
+        status='published' if published_at else 'draft', published_at=published_at,
+    )
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+# Перегляди записуються одразу, без фонового потоку, який торкався б тестової бази пізніше
+@override_settings(CACHES=TEST_CACHES, BLOG_VIEW_COUNTER={'FLUSH_INTERVAL': 0})
+class BlogTestCase(TestCase):
+    def setUp(self):
+        # Покоління кешу бампаються після коміту, а TestCase не комітить, тож кеш чистимо вручну
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+
+    def collect(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            ids += [item['id'] for item in response.json()['results']]
+            url = response.json()['next']
+        return ids
+
+
+class KeysetPaginationTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='pass1234')
+        cls.other = User.objects.create_user('other', password='pass1234')
+        cls.category = Category.objects.create(name='Новини', description='опис')
+        moment = timezone.now() - timedelta(days=1)
+        published = []
+        # Кілька статей з однаковою датою публікації перевіряють розбиття нічиїх за id
+        for _ in range(4):
+            published.append(create_post(cls.author, cls.category, moment))
+        for hours in (1, 5, 30):
+            published.append(create_post(cls.other, cls.category, moment - timedelta(hours=hours)))
+        drafts = [create_post(cls.author if index % 2 else cls.other, cls.category, None) for index in range(4)]
+        published.sort(key=lambda post: (post.published_at, post.pk), reverse=True)
+        drafts.sort(key=lambda post: post.pk, reverse=True)
+        cls.expected = [post.pk for post in published + drafts]
+
+    def test_full_archive_without_duplicates_or_gaps(self):
+        for page_size in (1, 2, 3, 4, 6, 7, 8, 11, 20):
+            with self.subTest(page_size=page_size):
+                ids = self.collect(f"{reverse('blog:post_list')}?page_size={page_size}")
+                self.assertEqual(ids, self.expected)
+
+    def test_filtered_lists_cross_null_boundary(self):
+        url = reverse('blog:author_posts', kwargs={'author_id': self.author.pk})
+        expected = [pk for pk in self.expected if Post.objects.get(pk=pk).author_id == self.author.pk]
+        self.assertEqual(self.collect(f'{url}?page_size=2'), expected)
+        url = reverse('blog:category_posts', kwargs={'category_id': self.category.pk})
+        self.assertEqual(self.collect(f'{url}?page_size=3'), self.expected)
+
+    def test_comments_with_equal_timestamps(self):
+        post = Post.objects.get(pk=self.expected[0])
+        comments = [
+            Comment.objects.create(post=post, author=self.other, content='коментар', is_approved=True)
+            for _ in range(5)
+        ]
+        Comment.objects.filter(post=post).update(created_at=timezone.now() - timedelta(hours=1))
+        url = reverse('blog:post_comments', kwargs={'post_id': post.pk})
+        self.assertEqual(self.collect(f'{url}?page_size=2'), [comment.pk for comment in comments])
+
+    def test_invalid_cursor_returns_404(self):
+        moment = timezone.now().isoformat()
+        cursors = [
+            '%%%',
+            base64.urlsafe_b64encode(b'not json').decode('ascii'),
+            encode_cursor({'published_at': moment}),
+            encode_cursor([moment]),
+            encode_cursor(['not-a-date', 1]),
+            encode_cursor([None, None]),
+            encode_cursor([moment, None]),
+            encode_cursor([moment, 10 ** 30]),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse('blog:post_list'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json()['detail'], 'Невірний курсор.')
+
+    def test_draft_cursor_continues_in_null_tail(self):
+        first_draft = len(self.expected) - 4
+        cursor = encode_cursor([None, self.expected[first_draft]])
+        response = self.client.get(reverse('blog:post_list'), {'cursor': cursor})
+        self.assertEqual([item['id'] for item in response.json()['results']], self.expected[first_draft + 1:])
+
+
+class GenerationCacheCheckTests(BlogTestCase):
+    def test_process_local_generations_fail_with_several_workers(self):
+        with override_settings(BLOG_RESPONSE_CACHE={'GENERATIONS_CACHE': 'generations', 'WORKERS': 4}):
+            self.assertEqual([message.id for message in check_generation_cache(None)], ['blog.E002'])
+        with override_settings(BLOG_RESPONSE_CACHE={'GENERATIONS_CACHE': 'generations', 'WORKERS': 1}):
+            self.assertEqual([message.id for message in check_generation_cache(None)], ['blog.W001'])
+
+    def test_shared_generations_pass(self):
+        shared = dict(TEST_CACHES, generations={
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': 'blog-tests-generations',
+        })
+        with override_settings(CACHES=shared, BLOG_RESPONSE_CACHE={'GENERATIONS_CACHE': 'generations', 'WORKERS': 4}):
+            self.assertEqual(check_generation_cache(None), [])
+
+
+class ProfilingOverridesTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(BLOG_PROFILING={'ENABLED': False, 'DIRECTORY': directory.name})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_overrides_are_read_by_a_fresh_runtime_config(self):
+        # Новий RuntimeConfig відповідає іншому процесу: спільного стану в пам'яті в них немає
+        set_overrides(enabled=True, sample_rate=1.0)
+        self.assertEqual(RuntimeConfig().get()['ENABLED'], True)
+        self.assertEqual(RuntimeConfig().get()['SAMPLE_RATE'], 1.0)
+        clear_overrides()
+        self.assertEqual(RuntimeConfig().get()['ENABLED'], False)
+
+
+class MetricsCollectTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings_override = override_settings(BLOG_METRICS={'DIRECTORY': self.directory, 'FLUSH_INTERVAL': 3600})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def registry(self):
+        registry = MetricsRegistry()
+        self.addCleanup(registry._stopped.set)
+        return registry
+
+    def total(self, registry):
+        return sum(series['count'] for series in registry.collect().values())
+
+    def test_every_worker_is_read_from_its_file(self):
+        first, second = self.registry(), self.registry()
+        second._started += 1
+        first.observe('blog:post_list', 'GET', 200, 0.01)
+        self.assertEqual(self.total(second), 0)
+        self.assertEqual(self.total(first), 1)
+        # Другий воркер бачить ті самі дані першого, що й попередній скрейп
+        self.assertEqual(self.total(second), 1)
+        # Нові спостереження воркера інші бачать лише після запису його файлу, тож сума не стрибає назад
+        second.observe('blog:post_list', 'GET', 200, 0.01)
+        self.assertEqual(self.total(first), 1)
+        second.export()
+        self.assertEqual(self.total(first), 2)
+
+    def test_dead_worker_files_are_absorbed_without_losing_counts(self):
+        finished = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'], capture_output=True)
+        dead_pid = int(finished.stdout)
+        dead = self.registry()
+        dead.observe('blog:post_list', 'GET', 200, 0.01)
+        dead.observe('blog:post_list', 'GET', 404, 0.01)
+        path = os.path.join(self.directory, f'metrics-{dead_pid}-1.json')
+        with open(path, 'w', encoding='utf-8') as stream:
+            json.dump(dead.snapshot(), stream)
+        stale = time.time() - 3600
+        os.utime(path, (stale, stale))
+
+        live = self.registry()
+        live.observe('blog:post_list', 'GET', 200, 0.01)
+        self.assertEqual(self.total(live), 3)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(os.listdir(self.directory), [os.path.basename(live.get_path())])
+        self.assertEqual(self.total(live), 3)
+
+
+class ExportStreamingTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', password='pass1234')
+        cls.posts = [create_post(cls.admin, published_at=timezone.now()) for _ in range(3)]
+
+    async def test_asgi_export_streams_asynchronously(self):
+        await self.async_client.aforce_login(self.admin)
+        with warnings.catch_warnings():
+            # Django попереджає, коли під ASGI мусить буферизувати синхронний ітератор
+            warnings.simplefilter('error')
+            response = await self.async_client.get(reverse('blog:post_export'))
+            self.assertTrue(response.is_async)
+            body = b''.join([chunk async for chunk in response.streaming_content])
+        records = [json.loads(line) for line in body.decode('utf-8').splitlines()]
+        self.assertEqual([record['id'] for record in records], [post.pk for post in self.posts])
+
+
+class PopularPostsTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='pass1234')
+        cls.category = Category.objects.create(name='Новини', description='опис')
+        moment = timezone.now() - timedelta(days=1)
+        cls.posts = [create_post(cls.author, cls.category if index % 2 else None, moment) for index in range(5)]
+        create_post(cls.author, cls.category)
+        for post, views in zip(cls.posts, (7, 3, 7, 0, 12)):
+            Post.objects.filter(pk=post.pk).update(views=views)
+        cls.by_views = sorted(cls.posts, key=lambda post: (Post.objects.get(pk=post.pk).views, post.pk), reverse=True)
+
+    def assert_popular(self, urlconf):
+        with override_settings(ROOT_URLCONF=urlconf):
+            url = reverse('blog:popular_posts')
+            # Порожній рейтинг на наявній базі: список за переглядами за весь час, без чернеток
+            self.assertEqual(self.collect(f'{url}?page_size=2'), [post.pk for post in self.by_views])
+            expected = [post.pk for post in self.by_views if post.category_id == self.category.pk]
+            self.assertEqual(self.collect(f'{url}?category={self.category.pk}&page_size=1'), expected)
+
+            PostActivity.objects.create(post=self.posts[3], hour=hour_of(timezone.now()), views=5)
+            PostActivity.objects.create(post=self.posts[1], hour=hour_of(timezone.now()), views=2)
+            refresh_trending()
+            caches['default'].clear()
+            self.assertEqual(self.collect(f'{url}?page_size=1'), [self.posts[3].pk, self.posts[1].pk])
+
+    def test_empty_ranking_falls_back_to_all_time_views(self):
+        self.assert_popular('config.urls')
+
+    def test_async_view_falls_back_to_all_time_views(self):
+        self.assert_popular('config.async_urls')
+
+    def test_invalid_params_return_400(self):
+        for urlconf in ('config.urls', 'config.async_urls'):
+            with override_settings(ROOT_URLCONF=urlconf):
+                url = reverse('blog:popular_posts')
+                for params in (
+                    {'category': '99999999999999999999999'}, {'category': '0'}, {'category': '-3'},
+                    {'category': 'новини'}, {'window': 'year'},
+                ):
+                    with self.subTest(urlconf=urlconf, params=params):
+                        response = self.client.get(url, params)
+                        self.assertEqual(response.status_code, 400)
+                        self.assertEqual(list(response.json()), list(params))
+                response = self.client.get(url, {'category': str(2 ** 63 - 1)})
+                self.assertEqual(response.json()['results'], [])
+
+    def test_scheduled_refresh_runs_once_per_interval(self):
+        PostActivity.objects.create(post=self.posts[0], hour=hour_of(timezone.now()), views=1)
+        with override_settings(BLOG_TRENDING={'REFRESH_INTERVAL': 300}):
+            self.assertEqual(refresh_trending_if_due()['week'], 1)
+            self.assertIsNone(refresh_trending_if_due())
+        with override_settings(BLOG_TRENDING={'REFRESH_INTERVAL': 0}):
+            caches['generations'].clear()
+            self.assertIsNone(refresh_trending_if_due())
+
+
+class PostBatchTests(BlogTestCase):
+    def test_out_of_range_ids_are_rejected(self):
+        for ids in ('99999999999999999999999', '0', '-5', f'1,{2 ** 63}'):
+            with self.subTest(ids=ids):
+                response = self.client.get(reverse('blog:post_batch'), {'ids': ids})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('ids', response.json())
+        response = self.client.get(reverse('blog:post_batch'), {'ids': str(2 ** 63 - 1)})
+        self.assertEqual(response.json()['missing'], [2 ** 63 - 1])
+
+
+class CounterSignalTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='pass1234')
+        cls.other = User.objects.create_user('other', password='pass1234')
+        cls.news = Category.objects.create(name='Новини', description='опис')
+        cls.guides = Category.objects.create(name='Поради', description='опис')
+
+    def setUp(self):
+        super().setUp()
+        refresh_all_rollups()
+
+    def assert_consistent(self):
+        # Денормалізовані лічильники і зведення порівнюються з агрегатами, перерахованими з нуля
+        for user in User.objects.all():
+            self.assertEqual(user.post_count, Post.objects.filter(author=user).count(), user.username)
+        for category in Category.objects.all():
+            self.assertEqual(category.post_count, Post.objects.filter(category=category).count(), category.name)
+        for post in Post.objects.all():
+            approved = Comment.objects.filter(post=post, is_approved=True).count()
+            self.assertEqual(post.comment_count, approved, f'post {post.pk}')
+        scopes = [None, *Category.objects.values_list('pk', flat=True)]
+        self.assertCountEqual(StatisticsRollup.objects.values_list('category_id', flat=True), scopes)
+        for rollup in StatisticsRollup.objects.all():
+            stored = {field: getattr(rollup, field) for field in ROLLUP_FIELDS}
+            self.assertEqual(stored, compute_rollup_values(rollup.category_id), f'rollup {rollup.category_id}')
+
+    def edit(self, instance, **changes):
+        # Екземпляри навмисно не перечитуються: їхні лічильники застарілі, і save() не має їх повертати
+        for name, value in changes.items():
+            setattr(instance, name, value)
+        instance.save()
+
+    def comment(self, post, approved=True, parent=None):
+        return Comment.objects.create(post=post, author=self.other, content='коментар', is_approved=approved, parent=parent)
+
+    def test_post_and_comment_lifecycle(self):
+        published = create_post(self.author, self.news, timezone.now())
+        draft = create_post(self.author, self.guides)
+        loose = create_post(self.other, published_at=timezone.now())
+        self.assert_consistent()
+
+        first = self.comment(published)
+        pending = self.comment(published, approved=False)
+        self.comment(published, parent=first)
+        self.comment(loose)
+        self.assert_consistent()
+
+        self.edit(pending, is_approved=True)
+        self.edit(first, is_approved=False)
+        self.assert_consistent()
+
+        self.edit(draft, published_at=timezone.now(), status='published')
+        view_counter.record(draft.pk, 9)
+        view_counter.record(published.pk, 4)
+        self.assert_consistent()
+
+        self.edit(published, category=self.guides)
+        self.assert_consistent()
+        self.edit(loose, category=self.news, author=self.author)
+        self.assert_consistent()
+        self.edit(draft, category=None)
+        self.assert_consistent()
+
+        self.edit(pending, post=loose)
+        self.assert_consistent()
+
+        first.delete()
+        self.assert_consistent()
+        published.delete()
+        self.assert_consistent()
+
+    def test_saving_stale_instances_keeps_counters(self):
+        post = create_post(self.author, self.news, timezone.now())
+        stale_post = Post.objects.get(pk=post.pk)
+        stale_author = User.objects.get(pk=self.author.pk)
+        stale_category = Category.objects.get(pk=self.news.pk)
+        self.comment(post)
+        create_post(self.author, self.news)
+
+        stale_post.title = 'Нова назва'
+        stale_post.save()
+        stale_author.first_name = 'Автор'
+        stale_author.save()
+        stale_category.description = 'новий опис'
+        stale_category.save()
+        self.assert_consistent()
+        self.assertEqual(Post.objects.get(pk=post.pk).title, 'Нова назва')
+        self.assertEqual(User.objects.get(pk=self.author.pk).post_count, 2)
+        self.assertEqual(Category.objects.get(pk=self.news.pk).description, 'новий опис')
+
+        # Збереження окремих полів теж не чіпає лічильник, навіть якщо його передали явно
+        stale_post.save(update_fields=['title', 'comment_count'])
+        self.assert_consistent()
+
+    def test_saving_stale_post_keeps_flushed_views(self):
+        post = create_post(self.author, self.news, timezone.now())
+        view_counter.record(post.pk, 7)
+        post.title = 'Нова назва'
+        post.views = 0
+        post.save()
+        self.assertEqual(Post.objects.get(pk=post.pk).views, 7)
+        self.assert_consistent()
+        self.edit(post, category=self.guides)
+        self.assert_consistent()
+        post.delete()
+        self.assert_consistent()
+
+    def test_category_create_and_delete(self):
+        extra = Category.objects.create(name='Огляди', description='опис')
+        post = create_post(self.author, extra, timezone.now())
+        self.comment(post)
+        create_post(self.other, self.news)
+        self.assert_consistent()
+
+        extra.delete()
+        self.assert_consistent()
+        self.assertIsNone(Post.objects.get(pk=post.pk).category_id)
+
+        self.news.delete()
+        self.assert_consistent()
+
+
+class ChangesFeedTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='pass1234')
+        cls.category = Category.objects.create(name='Новини', description='опис')
+        cls.post = create_post(cls.author, cls.category, timezone.now())
+        cls.comment = Comment.objects.create(post=cls.post, author=cls.author, content='коментар', is_approved=True)
+
+    def changes(self, since):
+        response = self.client.get(reverse('blog:changes'), {'since': since})
+        self.assertEqual(response.status_code, 200, response.content)
+        return {(change['resource'], change['id']): change for change in response.json()['changes']}
+
+    def test_category_delete_logs_post_updates(self):
+        draft = create_post(self.author, self.category)
+        since = ChangeLogEntry.objects.latest('id').id
+        category_id = self.category.pk
+        Category.objects.get(pk=category_id).delete()
+        changes = self.changes(since)
+        self.assertEqual(changes[('category', category_id)]['action'], 'deleted')
+        self.assertEqual(changes[('post', self.post.pk)]['action'], 'updated')
+        self.assertIsNone(changes[('post', self.post.pk)]['data']['category'])
+        self.assertEqual(changes[('post', draft.pk)]['action'], 'deleted')
+
+    def test_hidden_objects_are_reported_as_deleted(self):
+        since = ChangeLogEntry.objects.latest('id').id
+        Comment.objects.filter(pk=self.comment.pk).update(is_approved=False)
+        self.comment.refresh_from_db()
+        self.comment.save()
+        post = Post.objects.get(pk=self.post.pk)
+        post.published_at = None
+        post.status = 'draft'
+        post.save()
+        changes = self.changes(since)
+        for key in (('post', self.post.pk), ('comment', self.comment.pk)):
+            with self.subTest(key=key):
+                self.assertEqual(changes[key]['action'], 'deleted')
+                self.assertIsNone(changes[key]['data'])
+
+    def test_pruned_token_returns_410(self):
+        for _ in range(3):
+            Post.objects.get(pk=self.post.pk).save()
+        oldest = ChangeLogEntry.objects.order_by('id')[2].id
+        ChangeLogEntry.objects.filter(id__lt=oldest).delete()
+        response = self.client.get(reverse('blog:changes'), {'since': oldest - 2})
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(response.json()['detail'], ChangesExpired.default_detail)
+        self.changes(oldest - 1)
+
+
+class SparseFieldsTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='pass1234')
+        cls.category = Category.objects.create(name='Новини', description='опис')
+        cls.post = create_post(cls.author, cls.category, timezone.now())
+        Comment.objects.create(post=cls.post, author=cls.author, content='коментар', is_approved=True)
+
+    def assert_detail_fieldsets(self, urlconf):
+        with override_settings(ROOT_URLCONF=urlconf):
+            url = reverse('blog:post_detail', kwargs={'id': self.post.pk})
+            # Перегляди буферизуються, тож покоління не змінюється і друга відповідь береться з кешу,
+            # а в її тілі немає id
+            with override_settings(BLOG_VIEW_COUNTER={'FLUSH_INTERVAL': 3600}):
+                for _ in range(2):
+                    response = self.client.get(url, {'fields': 'title'})
+                    self.assertEqual(response.status_code, 200, response.content)
+                    self.assertEqual(response.json(), {'title': self.post.title})
+                view_counter.flush()
+            self.assertEqual(Post.objects.get(pk=self.post.pk).views, 2)
+
+            data = self.client.get(url, {'fields': 'id,author.username,comments.content'}).json()
+            self.assertEqual(data, {'id': self.post.pk, 'author': {'username': 'author'}, 'comments': [{'content': 'коментар'}]})
+
+            data = self.client.get(url, {'expand': '', 'fields': 'author,category,comments'}).json()
+            self.assertEqual(data, {'author': self.author.pk, 'category': self.category.pk})
+
+    def test_detail_fieldsets(self):
+        self.assert_detail_fieldsets('config.urls')
+
+    def test_async_detail_fieldsets(self):
+        self.assert_detail_fieldsets('config.async_urls')
+
+    def test_list_fieldset_trims_the_query(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('blog:post_list'), {'fields': 'id,title', 'expand': ''})
+        self.assertEqual(response.json()['results'], [{'id': self.post.pk, 'title': self.post.title}])
+        sql = ' '.join(query['sql'] for query in captured.captured_queries if 'blog_post' in query['sql'])
+        self.assertIn('"blog_post"."title"', sql)
+        for column in ('excerpt', 'word_count', 'blog_user'):
+            self.assertNotIn(column, sql)
+
+        data = self.client.get(reverse('blog:category_list'), {'fields': 'name'}).json()
+        self.assertEqual(data if isinstance(data, list) else data['results'], [{'name': 'Новини'}])
+        data = self.client.get(reverse('blog:author_list'), {'fields': 'username'}).json()
+        self.assertEqual(data if isinstance(data, list) else data['results'], [{'username': 'author'}])
+
+
+class ViewCounterTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='pass1234')
+        cls.post = create_post(cls.author, published_at=timezone.now())
+
+    def buffer(self):
+        buffer = ViewCounterBuffer()
+        self.addCleanup(buffer._stopped.set)
+        return buffer
+
+    def views(self):
+        return Post.objects.get(pk=self.post.pk).views
+
+    def test_threshold_flush(self):
+        buffer = self.buffer()
+        with override_settings(BLOG_VIEW_COUNTER={'FLUSH_INTERVAL': 3600, 'MAX_PENDING': 3}):
+            buffer.record(self.post.pk)
+            buffer.record(self.post.pk)
+            self.assertEqual(self.views(), 0)
+            buffer.record(self.post.pk)
+            self.assertEqual(self.views(), 3)
+            self.assertEqual(buffer.flush(), 0)
+
+    def test_interval_flush(self):
+        buffer = self.buffer()
+        waits = []
+
+        def wait(timeout):
+            # Перший інтервал минає, на другому потік зупиняють
+            waits.append(timeout)
+            return len(waits) > 1
+
+        with override_settings(BLOG_VIEW_COUNTER={'FLUSH_INTERVAL': 3600}), override_settings(
+            BLOG_TRENDING={'REFRESH_INTERVAL': 0}
+        ):
+            buffer.record(self.post.pk, 5)
+            self.assertEqual(self.views(), 0)
+            buffer._stopped.set()
+            buffer._thread.join()
+            # Цикл потоку виконуємо в тестовому потоці, бо лише тут видно незакомічені дані тесту
+            with mock.patch.object(buffer._stopped, 'wait', wait), mock.patch('blog.view_counter.connections'):
+                buffer._run()
+        self.assertEqual(waits, [3600, 3600])
+        self.assertEqual(self.views(), 5)
+
+    def test_flush_on_shutdown(self):
+        buffer = self.buffer()
+        with override_settings(BLOG_VIEW_COUNTER={'FLUSH_INTERVAL': 3600}):
+            buffer.record(self.post.pk, 2)
+            buffer.shutdown()
+        self.assertEqual(self.views(), 2)
+        self.assertTrue(buffer._stopped.is_set())
+
+    def test_admin_form_does_not_post_views(self):
+        admin = User.objects.create_superuser('admin', password='pass1234')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:blog_post_change', args=[self.post.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'name="views"')
+
+
+class CachedJWTAuthenticationTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', password='pass1234')
+
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+        self.authentication = CachedJWTAuthentication()
+
+    def authenticate(self, token=None):
+        return self.authentication.get_user(token or AccessToken.for_user(self.user))
+
+    def test_cache_hit_runs_no_query(self):
+        with self.assertNumQueries(1):
+            first = self.authenticate()
+        with self.assertNumQueries(0):
+            second = self.authenticate()
+        self.assertEqual(second.pk, self.user.pk)
+        # Кожен запит отримує власну копію користувача
+        second.first_name = 'змінено'
+        self.assertEqual(self.authenticate().first_name, first.first_name)
+
+    def test_save_and_delete_invalidate(self):
+        self.authenticate()
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Нове'
+        user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate().first_name, 'Нове')
+        token = AccessToken.for_user(self.user)
+        user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_inactive_user_is_rejected(self):
+        self.authenticate()
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+        # І тоді, коли неактивний користувач уже лежить у кеші
+        user_cache.set(user.pk, user)
+        with self.assertNumQueries(0), self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_password_change_revokes_tokens(self):
+        with mock.patch.object(api_settings, 'CHECK_REVOKE_TOKEN', True):
+            token = AccessToken.for_user(self.user)
+            self.authenticate(token)
+            user = User.objects.get(pk=self.user.pk)
+            user.set_password('new-pass5678')
+            user.save()
+            with self.assertRaises(AuthenticationFailed):
+                self.authenticate(token)
+            # Застарілий запис кешу зі зміненим паролем теж не приймає старий токен
+            user_cache.set(user.pk, user)
+            with self.assertNumQueries(0), self.assertRaises(AuthenticationFailed):
+                self.authenticate(token)
+            self.assertEqual(self.authenticate(AccessToken.for_user(user)).pk, user.pk)
+
+    def test_lru_eviction_and_expiry(self):
+        cache = UserCache()
+        users = [User(pk=pk, username=f'user{pk}') for pk in (1, 2, 3)]
+        with override_settings(BLOG_AUTH_CACHE={'MAX_SIZE': 2, 'TIMEOUT': 60}):
+            cache.set(1, users[0])
+            cache.set(2, users[1])
+            cache.get('1')
+            cache.set(3, users[2])
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(1).username, 'user1')
+        self.assertEqual(cache.get(3).username, 'user3')
+        with mock.patch('blog.authentication.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertIsNone(cache.get(1))
+
+
+class PostSearchTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='pass1234')
+
+        def post(title, content, published=True):
+            return Post.objects.create(
+                title=title, author=cls.author, content=content, excerpt='опис',
+                status='published' if published else 'draft', published_at=timezone.now() if published else None,
+            )
+
+        cls.in_title = post('Python tips', 'short notes about tooling')
+        cls.in_content = post('Weekly notes', 'we talked about python and fast search')
+        cls.pythonic = post('Idioms', 'writing pythonic code, search is fast')
+        cls.escaped = post('Markup', '<script>alert(1)</script> python inside markup')
+        cls.draft = post('Python draft', 'python python python', published=False)
+
+    def search(self, q, **params):
+        response = self.client.get(reverse('blog:post_search'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_ranking_prefers_title_and_skips_drafts(self):
+        ids = [item['id'] for item in self.search('python')['results']]
+        self.assertEqual(ids[0], self.in_title.pk)
+        self.assertCountEqual(ids, [self.in_title.pk, self.in_content.pk, self.escaped.pk])
+        scores = [item['score'] for item in self.search('python')['results']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_prefix_and_phrase_queries(self):
+        self.assertEqual({item['id'] for item in self.search('pyth')['results']}, set())
+        prefixed = {item['id'] for item in self.search('pyth*')['results']}
+        self.assertEqual(prefixed, {self.in_title.pk, self.in_content.pk, self.pythonic.pk, self.escaped.pk})
+        self.assertEqual([item['id'] for item in self.search('"fast search"')['results']], [self.in_content.pk])
+        self.assertCountEqual(
+            [item['id'] for item in self.search('fast search')['results']], [self.in_content.pk, self.pythonic.pk]
+        )
+
+    def test_snippets_are_escaped(self):
+        [result] = self.search('inside')['results']
+        self.assertIn('&lt;script&gt;', result['snippet'])
+        self.assertIn('<mark>inside</mark>', result['snippet'])
+        self.assertNotIn('<script>', result['snippet'])
+
+    def test_cursor_pagination(self):
+        expected = [item['id'] for item in self.search('pyth*', page_size=10)['results']]
+        url = reverse('blog:post_search') + '?q=pyth*&page_size=1'
+        self.assertEqual(self.collect(url), expected)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(reverse('blog:post_search'), {'q': ' '}).status_code, 400)
+        for values in ([1.0, 10 ** 30], [1.0, 0], [1.0, -1], ['1', 1], [True, 1], [10 ** 400, 1], [float('inf'), 1]):
+            with self.subTest(values=values):
+                response = self.client.get(reverse('blog:post_search'), {'q': 'python', 'cursor': encode_cursor(values)})
+                self.assertEqual(response.status_code, 404)
+
+
+@override_settings(
+    CACHES=TEST_CACHES,
+    BLOG_VIEW_COUNTER={'FLUSH_INTERVAL': 0},
+    BLOG_DB_ROUTING={'REPLICAS': [REPLICA_ALIAS], 'PIN_SECONDS': 5, 'CHECK_INTERVAL': 60, 'RETRY_AFTER': 60},
+)
+class ReplicaRoutingTests(TransactionTestCase):
+    # Дзеркало — окреме з'єднання до тієї самої бази: воно бачить лише закомічені дані, тому тут TransactionTestCase
+    databases = {'default', REPLICA_ALIAS}
+
+    def setUp(self):
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+        replica_pool.reset()
+        self.addCleanup(replica_pool.reset)
+        self.author = User.objects.create_user('author', password='pass1234')
+        create_post(self.author, published_at=timezone.now())
+
+    def handle(self, request, write=False):
+        def view(request):
+            if write:
+                Category.objects.create(name='Нова', description='опис')
+            list(Post.objects.all())
+            return HttpResponse()
+
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[REPLICA_ALIAS]) as replica:
+            response = DatabaseRoutingMiddleware(view)(request)
+
+        # Рахуємо лише читання статей: перевірка здоров'я репліки робить власні запити до обох баз
+        def reads(captured):
+            return sum('FROM "blog_post"' in query['sql'] for query in captured.captured_queries)
+
+        return response, reads(primary), reads(replica)
+
+    def test_reads_go_to_replica_and_writes_to_primary(self):
+        factory = RequestFactory()
+        response, primary, replica = self.handle(factory.get('/blog/posts/'))
+        self.assertEqual((primary, replica), (0, 1))
+        self.assertNotIn('blog_db_pin', response.cookies)
+
+        # Поза PATH_PREFIXES і для небезпечних методів читання лишаються на primary
+        self.assertEqual(self.handle(factory.get('/admin/'))[1:], (1, 0))
+        self.assertEqual(self.handle(factory.post('/blog/posts/'))[1:], (1, 0))
+
+    def test_write_pins_the_client_to_primary(self):
+        factory = RequestFactory()
+        response, primary, replica = self.handle(factory.get('/blog/posts/'), write=True)
+        # Після запису той самий запит читає з primary, щоб бачити власні зміни
+        self.assertEqual(replica, 0)
+        self.assertEqual(response.cookies['blog_db_pin']['max-age'], 5)
+
+        request = factory.get('/blog/posts/')
+        request.COOKIES['blog_db_pin'] = '1'
+        self.assertEqual(self.handle(request)[1:], (1, 0))
+
+    def test_lagging_or_unavailable_replica_falls_back_to_primary(self):
+        # Дзеркало бачить той самий журнал змін, що й primary
+        self.assertEqual(replica_lag(REPLICA_ALIAS), 0.0)
+        request = RequestFactory().get('/blog/posts/')
+        with mock.patch('blog.routing.replica_lag', return_value=60.0), self.assertLogs('blog.routing', 'WARNING'):
+            self.assertEqual(self.handle(request)[1:], (1, 0))
+        # Нездорова репліка не перевіряється повторно до RETRY_AFTER
+        with mock.patch('blog.routing.replica_lag', return_value=0.0) as lag:
+            self.assertEqual(self.handle(request)[1:], (1, 0))
+        lag.assert_not_called()
+
+        replica_pool.reset()
+        with mock.patch('blog.routing.replica_lag', side_effect=DatabaseError('replica is down')), \
+                self.assertLogs('blog.routing', 'WARNING'):
+            self.assertEqual(self.handle(request)[1:], (1, 0))
+
+    def test_public_endpoint_reads_from_replica(self):
+        with CaptureQueriesContext(connections[REPLICA_ALIAS]) as replica:
+            response = self.client.get(reverse('blog:post_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 1)
+        self.assertTrue(any('blog_post' in query['sql'] for query in replica.captured_queries))
+
+
+class ConditionalGetTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='pass1234')
+        cls.post = create_post(cls.author, published_at=timezone.now())
+
+    def assert_conditional(self, urlconf):
+        # Як у продакшені, перегляди статті буферизуються і не змінюють покоління між сусідніми запитами
+        self.addCleanup(view_counter.flush)
+        with override_settings(ROOT_URLCONF=urlconf, BLOG_VIEW_COUNTER={'FLUSH_INTERVAL': 3600}):
+            for url in (reverse('blog:post_list'), reverse('blog:post_detail', kwargs={'id': self.post.pk})):
+                with self.subTest(urlconf=urlconf, url=url):
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    etag, last_modified = response['ETag'], response['Last-Modified']
+
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 304)
+                    self.assertEqual(response['ETag'], etag)
+                    self.assertEqual(response.content, b'')
+                    self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+                    earlier = http_date(parse_http_date(last_modified) - 60)
+                    self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=earlier).status_code, 200)
+                    # Інший формат відповіді — інший ETag
+                    self.assertNotEqual(self.client.get(url, {'fields': 'title'})['ETag'], etag)
+
+                    # Покоління бампається після коміту, тож виконуємо відкладені колбеки
+                    with self.captureOnCommitCallbacks(execute=True):
+                        Post.objects.get(pk=self.post.pk).save()
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertNotEqual(response['ETag'], etag)
+
+    def test_sync_views(self):
+        self.assert_conditional('config.urls')
+
+    def test_async_views(self):
+        self.assert_conditional('config.async_urls')
+
+
+class CommentPagingTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='pass1234')
+        cls.post = create_post(cls.author, published_at=timezone.now())
+        cls.roots = [cls.comment() for _ in range(25)]
+        cls.comment(approved=False)
+        # Ланцюжок відповідей глибший за COMMENT_DEPTH і неприйнята відповідь на першому рівні
+        parent = cls.roots[0]
+        cls.chain = []
+        for _ in range(4):
+            parent = cls.comment(parent=parent)
+            cls.chain.append(parent)
+        cls.comment(parent=cls.roots[0], approved=False)
+
+    @classmethod
+    def comment(cls, parent=None, approved=True):
+        return Comment.objects.create(post=cls.post, author=cls.author, content='коментар', is_approved=approved, parent=parent)
+
+    def test_pages_only_approved_top_level_comments(self):
+        url = reverse('blog:post_comments', kwargs={'post_id': self.post.pk})
+        self.assertEqual(self.collect(url), [comment.pk for comment in self.roots])
+
+    def test_replies_are_loaded_one_query_per_level(self):
+        url = reverse('blog:post_comments', kwargs={'post_id': self.post.pk})
+        # Корені сторінки і три рівні відповідей, незалежно від кількості коментарів
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        thread = response.json()['results'][0]
+        levels = []
+        while thread['replies']:
+            self.assertEqual(len(thread['replies']), 1)
+            thread = thread['replies'][0]
+            levels.append(thread['id'])
+        self.assertEqual(levels, [comment.pk for comment in self.chain[:3]])
+        self.assertTrue(all(not item['replies'] for item in response.json()['results'][1:]))
+
+    def assert_embedded_page(self, urlconf):
+        with override_settings(ROOT_URLCONF=urlconf):
+            response = self.client.get(reverse('blog:post_detail', kwargs={'id': self.post.pk}), {'expand': 'comments'})
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            first_page = [item['id'] for item in data['comments']]
+            self.assertEqual(first_page, [comment.pk for comment in self.roots[:20]])
+            self.assertEqual([item['id'] for item in data['comments'][0]['replies']], [self.chain[0].pk])
+            # Продовження віддає решту коренів без повторів
+            self.assertEqual(first_page + self.collect(data['comments_next']), [comment.pk for comment in self.roots])
+
+    def test_post_detail_embeds_first_page(self):
+        self.assert_embedded_page('config.urls')
+
+    def test_async_post_detail_embeds_first_page(self):
+        self.assert_embedded_page('config.async_urls')
+
+
+class ListQueryCountTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Новини')
+        cls.authors = [User.objects.create_user(f'author{index}', password='pass1234') for index in range(2)]
+        cls.add_posts(cls.authors, 2)
+
+    @classmethod
+    def add_posts(cls, authors, count):
+        for author in authors:
+            for _ in range(count):
+                post = create_post(author, cls.category, timezone.now())
+                Comment.objects.create(post=post, author=author, content='коментар', is_approved=True)
+
+    def assert_fixed_queries(self):
+        # Сторінка заповнюється з першого сегмента, тож кількість запитів не залежить від кількості рядків
+        routes = {
+            'post_list': reverse('blog:post_list'),
+            'category_list': reverse('blog:category_list'),
+            'category_posts': reverse('blog:category_posts', kwargs={'category_id': self.category.pk}),
+            'author_list': reverse('blog:author_list'),
+            'author_posts': reverse('blog:author_posts', kwargs={'author_id': self.authors[0].pk}),
+        }
+        for name, url in routes.items():
+            with self.subTest(route=name), self.assertNumQueries(QUERY_BUDGETS[name]):
+                self.assertEqual(self.client.get(url, {'page_size': 1}).status_code, 200)
+
+    def test_list_endpoints_use_fixed_query_count(self):
+        self.assert_fixed_queries()
+        self.add_posts([*self.authors, User.objects.create_user('author2', password='pass1234')], 5)
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+        self.assert_fixed_queries()
+
+    def test_list_counts_match_rows(self):
+        item = self.client.get(reverse('blog:post_list')).json()['results'][0]
+        self.assertEqual(item['author']['posts_count'], 2)
+        self.assertEqual(item['category']['posts_count'], 4)
+        self.assertEqual(item['comments_count'], 1)
+        categories = self.client.get(reverse('blog:category_list')).json()
+        self.assertEqual([category['posts_count'] for category in categories], [4])
+
+
+@override_settings(BLOG_VIEW_COUNTER={'FLUSH_INTERVAL': 3600})
+class CommentTreeQueryTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='pass1234')
+        cls.posts = [create_post(cls.author, published_at=timezone.now()) for _ in range(3)]
+
+    def setUp(self):
+        super().setUp()
+        # Буферизовані перегляди не додають запитів до відповіді
+        self.addCleanup(view_counter.flush)
+
+    def add_threads(self, post, count):
+        for _ in range(count):
+            parent = None
+            for _ in range(4):
+                parent = Comment.objects.create(post=post, author=self.author, content='коментар', is_approved=True, parent=parent)
+            Comment.objects.create(post=post, author=self.author, content='коментар', is_approved=False, parent=parent.parent)
+
+    def thread_depths(self, comments, depth=0):
+        for comment in comments:
+            yield depth
+            yield from self.thread_depths(comment['replies'], depth + 1)
+
+    def test_post_detail_tree_uses_fixed_query_count(self):
+        url = reverse('blog:post_detail', kwargs={'id': self.posts[0].pk})
+        for threads in (1, 5):
+            self.add_threads(self.posts[0], threads)
+            for alias in TEST_CACHES:
+                caches[alias].clear()
+            with self.subTest(threads=threads), self.assertNumQueries(QUERY_BUDGETS['post_detail']):
+                comments = self.client.get(url).json()['comments']
+        # Лише схвалені коментарі, корінь і COMMENT_DEPTH рівнів відповідей
+        self.assertEqual(list(self.thread_depths(comments)), [0, 1, 2, 3] * 6)
+
+    def test_batch_loads_trees_of_all_posts_together(self):
+        for post in self.posts:
+            self.add_threads(post, 2)
+        ids = ','.join(str(post.pk) for post in self.posts)
+        with self.assertNumQueries(QUERY_BUDGETS['post_batch']):
+            results = self.client.get(reverse('blog:post_batch'), {'ids': ids, 'view': 'detail'}).json()['results']
+        for post, item in zip(self.posts, results):
+            self.assertEqual(item['id'], post.pk)
+            self.assertEqual({comment['post'] for comment in item['comments']}, {post.pk})
+            self.assertEqual(list(self.thread_depths(item['comments'])), [0, 1, 2, 3] * 2)
+
+
+class WordCountTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='pass1234')
+
+    def test_save_recomputes_word_count(self):
+        post = create_post(self.author)
+        self.assertEqual(post.word_count, 3)
+
+        post.content = 'слово ' * (WORDS_PER_MINUTE + 1)
+        post.save(update_fields=['content'])
+        post.refresh_from_db()
+        self.assertEqual(post.word_count, WORDS_PER_MINUTE + 1)
+        self.assertEqual(post.get_reading_time(), 2)
+
+        post.content = ''
+        post.save()
+        self.assertEqual(Post.objects.get(pk=post.pk).word_count, 0)
+
+    def test_save_without_content_keeps_word_count(self):
+        post = create_post(self.author)
+        deferred = Post.objects.defer('content').get(pk=post.pk)
+        deferred.title = 'Нова назва'
+        deferred.save()
+        post.refresh_from_db()
+        self.assertEqual((post.title, post.word_count), ('Нова назва', 3))
+
+    def test_recount_command_backfills_existing_rows(self):
+        posts = [create_post(self.author) for _ in range(3)]
+        # Рядки, що існували до появи поля, мають нульову кількість слів
+        Post.objects.filter(pk__in=[posts[0].pk, posts[1].pk]).update(word_count=0)
+        out = io.StringIO()
+        call_command('recount_word_counts', chunk_size=1, stdout=out)
+        self.assertIn('Оновлено статей: 2', out.getvalue())
+        self.assertEqual(set(Post.objects.values_list('word_count', flat=True)), {3})
+
+        out = io.StringIO()
+        call_command('recount_word_counts', stdout=out)
+        self.assertIn('Оновлено статей: 0', out.getvalue())
+
+
+class QueryPlanTests(BlogTestCase):
+    def test_endpoint_queries_use_indexes(self):
+        out = io.StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertIn('Усі запити використовують індекси.', out.getvalue())
+        self.assertNotIn('FAIL', out.getvalue())
+
+    def test_missing_index_fails(self):
+        plans = [('post_list', lambda: Post.objects.order_by().filter(title='Стаття'), 'blog_post_published_idx')]
+        with mock.patch('blog.management.commands.check_query_plans.query_plans', return_value=plans), \
+                mock.patch('blog.management.commands.check_query_plans.cursor_query_plans', return_value=[]), \
+                self.assertRaisesMessage(CommandError, 'post_list'):
+            call_command('check_query_plans', stdout=io.StringIO())
+
+
+class PopulateBlogTests(BlogTestCase):
+    def test_generated_data_is_consistent(self):
+        out = io.StringIO()
+        call_command(
+            'populate_blog', authors=3, categories=2, posts=30, comments=120, chunk_size=7,
+            min_words=5, max_words=20, max_depth=2, stdout=out,
+        )
+        # Статті вставляються пакетами по chunk_size
+        self.assertIn('posts=7 ', out.getvalue())
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertTrue(Comment.objects.filter(parent__parent__isnull=False).exists())
+
+        for user in User.objects.all():
+            self.assertEqual(user.post_count, Post.objects.filter(author=user).count(), user.username)
+        for category in Category.objects.all():
+            self.assertEqual(category.post_count, Post.objects.filter(category=category).count(), category.name)
+        for post in Post.objects.all():
+            self.assertEqual(post.comment_count, post.comments.filter(is_approved=True).count(), post.pk)
+            self.assertEqual(post.word_count, count_words(post.content), post.pk)
+            self.assertEqual(post.status == 'published', post.published_at is not None, post.pk)
+        for comment in Comment.objects.filter(parent__isnull=False).select_related('parent__parent'):
+            self.assertEqual(comment.post_id, comment.parent.post_id)
+            self.assertIsNone(getattr(comment.parent.parent, 'parent_id', None))
+
+
+@override_settings(BLOG_VIEW_COUNTER={'FLUSH_INTERVAL': 3600})
+class EndpointBenchmarkTests(BlogTestCase):
+    def test_all_routes_within_query_budgets(self):
+        self.addCleanup(view_counter.flush)
+        # Досить статей, щоб сторінки авторів і категорій заповнювалися, як на наборі small
+        call_command(
+            'populate_blog', authors=3, categories=2, posts=150, comments=300,
+            min_words=5, max_words=20, stdout=io.StringIO(),
+        )
+        results = run_endpoint_benchmarks(iterations=1, warmup=0)
+        self.assertEqual(set(results), {pattern.name for pattern in blog_urls.urlpatterns})
+        self.assertEqual(compare_results(results), [])
+
+    def test_compare_results_reports_regressions(self):
+        result = {'status': 200, 'queries': 2, 'p95_ms': 10.0}
+        self.assertEqual(compare_results({'post_list': result}, budgets={'post_list': 2}), [])
+        failures = compare_results({'post_list': dict(result, status=500)}, budgets={'post_list': 1})
+        self.assertEqual(len(failures), 2)
+        self.assertIn('статус 500', failures[0])
+        self.assertIn('бюджеті 1', failures[1])
+
+        baseline = {'post_list': {'queries': 1, 'p95_ms': 5.0}}
+        failures = compare_results({'post_list': result}, baseline, budgets={})
+        self.assertEqual(len(failures), 2)
+        # Малі абсолютні зміни не вважаються регресією навіть при великому відносному зростанні
+        baseline = {'post_list': {'queries': 2, 'p95_ms': 9.5}}
+        self.assertEqual(compare_results({'post_list': result}, baseline, budgets={}), [])
+
+
+class SqliteProductionModeTests(BlogTestCase):
+    def open_database(self, mode_settings):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_dict = copy.deepcopy(connection.settings_dict)
+        settings_dict['NAME'] = os.path.join(directory.name, 'mode.sqlite3')
+        settings_dict.update(copy.deepcopy(mode_settings))
+        wrapper = connections['default'].__class__(settings_dict)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_production_connection_settings(self):
+        production = self.open_database(settings.SQLITE_PRODUCTION_SETTINGS)
+        self.assertEqual(self.pragma(production, 'journal_mode'), 'wal')
+        # synchronous=NORMAL
+        self.assertEqual(self.pragma(production, 'synchronous'), 1)
+        self.assertEqual(self.pragma(production, 'temp_store'), 2)
+        # Транзакції починаються з BEGIN IMMEDIATE
+        self.assertEqual(production.transaction_mode, 'IMMEDIATE')
+
+        baseline = self.open_database(SQLITE_BASELINE_SETTINGS)
+        self.assertEqual(self.pragma(baseline, 'journal_mode'), 'delete')
+
+    def test_environment_flag_enables_production_mode(self):
+        script = (
+            'import json; from config import settings; '
+            'print(json.dumps(settings.DATABASES["default"], default=str))'
+        )
+        for async_views, max_age in (('0', 600), ('1', 0)):
+            env = dict(os.environ, BLOG_SQLITE_PRODUCTION='1', BLOG_ASYNC_VIEWS=async_views)
+            finished = subprocess.run(
+                [sys.executable, '-c', script], capture_output=True, check=True, cwd=settings.BASE_DIR, env=env,
+            )
+            database = json.loads(finished.stdout)
+            with self.subTest(async_views=async_views):
+                self.assertIn('PRAGMA journal_mode=WAL', database['OPTIONS']['init_command'])
+                self.assertEqual(database['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+                self.assertEqual(database['CONN_MAX_AGE'], max_age)
+
+    def test_benchmark_runs_readers_and_writers_in_both_modes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            subprocess.run(
+                [
+                    sys.executable, 'manage.py', 'benchmark_sqlite',
+                    '--readers', '1', '--writers', '1', '--duration', '0.2', '--output', output,
+                ],
+                capture_output=True, check=True, cwd=settings.BASE_DIR,
+            )
+            with open(output, encoding='utf-8') as stream:
+                results = json.load(stream)
+        self.assertEqual(set(results), {'baseline', 'production'})
+        for mode, result in results.items():
+            for kind in ('read', 'write'):
+                with self.subTest(mode=mode, kind=kind):
+                    self.assertGreater(result[kind]['ops'], 0)
+                    self.assertEqual(result[kind]['errors'], 0)
@@ -0,0 +1,162 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import ExpressionWrapper, F, FloatField, Sum, Value
+from django.db.models.functions import Power
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .caching import bump_generation, generation_cache
+from .models import MAX_ID, Post, PostActivity, TrendingScore
+
+DEFAULTS = {
+    # Вікно: (тривалість у годинах, період напіврозпаду в годинах)
+    'WINDOWS': {
+        'day': (24, 6),
+        'week': (7 * 24, 24),
+        'month': (30 * 24, 72),
+    },
+    'DEFAULT_WINDOW': 'week',
+    'COMMENT_WEIGHT': 5,
+    'BATCH_SIZE': 500,
+    # Як часто воркери самі перераховують рейтинг, у секундах (0 — лише командою refresh_trending)
+    'REFRESH_INTERVAL': 5 * 60,
+}
+
+REFRESH_KEY = 'blog:trending:refresh'
+
+
+def get_setting(name):
+    return getattr(settings, 'BLOG_TRENDING', {}).get(name, DEFAULTS[name])
+
+
+def hour_of(moment):
+    return int(moment.timestamp()) // 3600
+
+
+def record_activity(counts_by_post, field):
+    counts_by_post = {post_id: count for post_id, count in counts_by_post.items() if count}
+    if not counts_by_post:
+        return
+    hour = hour_of(timezone.now())
+    existing = set(
+        PostActivity.objects.filter(hour=hour, post_id__in=list(counts_by_post)).values_list('post_id', flat=True)
+    )
+    missing = [post_id for post_id in counts_by_post if post_id not in existing]
+    if missing:
+        # Видалені за цей час статті пропускаємо, інакше зовнішній ключ зірве весь пакет
+        post_ids = Post.objects.filter(pk__in=missing).values_list('pk', flat=True)
+        PostActivity.objects.bulk_create(
+            [PostActivity(post_id=post_id, hour=hour) for post_id in post_ids],
+            batch_size=get_setting('BATCH_SIZE'),
+            ignore_conflicts=True,
+        )
+    by_increment = defaultdict(list)
+    for post_id, count in counts_by_post.items():
+        by_increment[count].append(post_id)
+    for count, post_ids in by_increment.items():
+        PostActivity.objects.filter(hour=hour, post_id__in=post_ids).update(**{field: F(field) + count})
+
+
+def window_scores(now_hour, hours, half_life):
+    # Кожна година активності важить 0.5 ** (вік / період напіврозпаду)
+    age = ExpressionWrapper((Value(now_hour) - F('hour')) * Value(1.0 / half_life), output_field=FloatField())
+    weight = ExpressionWrapper(
+        F('views') + F('comments') * Value(float(get_setting('COMMENT_WEIGHT'))), output_field=FloatField()
+    )
+    return (
+        PostActivity.objects.order_by()
+        .filter(hour__gt=now_hour - hours, post__published_at__isnull=False)
+        .values('post_id', 'post__category_id')
+        .annotate(
+            score=Sum(weight * Power(Value(0.5), age), output_field=FloatField()),
+            window_views=Sum('views'),
+            window_comments=Sum('comments'),
+        )
+    )
+
+
+def refresh_trending(now=None):
+    now = now or timezone.now()
+    now_hour = hour_of(now)
+    windows = get_setting('WINDOWS')
+    totals = {}
+    with transaction.atomic():
+        for window, (hours, half_life) in windows.items():
+            rows = sorted(
+                (row for row in window_scores(now_hour, hours, half_life) if row['score'] > 0),
+                key=lambda row: (-row['score'], row['post_id']),
+            )
+            TrendingScore.objects.filter(window=window).delete()
+            # Вставляємо в порядку рейтингу, тож при рівних балах id зберігає цей порядок
+            TrendingScore.objects.bulk_create(
+                [
+                    TrendingScore(
+                        window=window,
+                        post_id=row['post_id'],
+                        category_id=row['post__category_id'],
+                        score=row['score'],
+                        views=row['window_views'],
+                        comments=row['window_comments'],
+                        computed_at=now,
+                    )
+                    for row in rows
+                ],
+                batch_size=get_setting('BATCH_SIZE'),
+            )
+            totals[window] = len(rows)
+        TrendingScore.objects.exclude(window__in=list(windows)).delete()
+        # Старіша за найдовше вікно активність уже не впливає на рейтинг
+        longest = max((hours for hours, _ in windows.values()), default=0)
+        PostActivity.objects.filter(hour__lte=now_hour - longest).delete()
+        transaction.on_commit(lambda: bump_generation('trending'))
+    return totals
+
+
+def refresh_trending_if_due():
+    interval = get_setting('REFRESH_INTERVAL')
+    if not interval:
+        return None
+    # Маркер живе у спільному кеші поколінь, тож за інтервал перерахунок запускає лише один воркер
+    if not generation_cache().add(REFRESH_KEY, True, interval):
+        return None
+    return refresh_trending()
+
+
+def parse_trending_params(query_params):
+    windows = get_setting('WINDOWS')
+    window = query_params.get('window') or get_setting('DEFAULT_WINDOW')
+    if window not in windows:
+        raise ValidationError({'window': f"Підтримувані значення: {', '.join(windows)}."})
+    category_id = query_params.get('category')
+    if not category_id:
+        return window, None
+    try:
+        category_id = int(category_id)
+    except ValueError:
+        raise ValidationError({'category': 'Ідентифікатор категорії має бути цілим числом.'})
+    # Нуль і від'ємні значення не мовчки скидають фільтр, а завеликі не доходять до бази (OverflowError → 500)
+    if not 1 <= category_id <= MAX_ID:
+        raise ValidationError({'category': 'Ідентифікатор категорії має бути цілим числом.'})
+    return window, category_id
+
+
+def trending_queryset(window, category_id=None):
+    queryset = TrendingScore.objects.filter(window=window, post__published_at__isnull=False)
+    if category_id is not None:
+        queryset = queryset.filter(category_id=category_id)
+    return queryset.only('id', 'post', 'score')
+
+
+def fallback_queryset(queryset, category_id=None):
+    # Поки рейтинг порожній (нова база або перерахунок ще не запускався), віддаємо найпопулярніші
+    # за весь час статті замість порожнього списку
+    queryset = queryset.filter(published_at__isnull=False)
+    if category_id is not None:
+        queryset = queryset.filter(category_id=category_id)
+    return queryset
+
+
+def ranked_posts(page, posts_by_id):
+    return [posts_by_id[entry.post_id] for entry in page if entry.post_id in posts_by_id]
@@ -5,6 +5,7 @@ app_name = 'blog'
 
 urlpatterns = [
 	path('posts/', views.PostListAPIView.as_view(), name='post_list'),
+	path('posts/batch/', views.PostBatchAPIView.as_view(), name='post_batch'),
 	path('posts/<int:id>/', views.PostDetailAPIView.as_view(), name='post_detail'),
 	path('posts/<int:post_id>/comments/', views.PostCommentListAPIView.as_view(), name='post_comments'),
 	path('categories/', views.CategoryListAPIView.as_view(), name='category_list'),
@@ -15,4 +16,7 @@ urlpatterns = [
 	path('my-posts/', views.MyPostsAPIView.as_view(), name='my_posts'),
 	path('statistics/', views.BlogStatisticsAPIView.as_view(), name='blog_statistics'),
 	path('popular/', views.PopularPostsAPIView.as_view(), name='popular_posts'),
+	path('search/', views.PostSearchAPIView.as_view(), name='post_search'),
+	path('export/', views.PostExportAPIView.as_view(), name='post_export'),
+	path('changes/', views.ChangesAPIView.as_view(), name='changes'),
 ]
\ No newline at end of file
@@ -0,0 +1,119 @@
+import atexit
+import logging
+import os
+import threading
+from collections import Counter, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+
+from .caching import bump_generation
+from .models import Post
+from .statistics import record_views
+from .trending import record_activity, refresh_trending_if_due
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'FLUSH_INTERVAL': 10,
+    'MAX_PENDING': 1000,
+    'BATCH_SIZE': 500,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'BLOG_VIEW_COUNTER', {}).get(name, DEFAULTS[name])
+
+
+class ViewCounterBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = Counter()
+        self._pending_total = 0
+        self._thread = None
+        self._pid = None
+        self._stopped = threading.Event()
+
+    def record(self, post_id, count=1):
+        if self._add(post_id, count):
+            self.flush()
+        else:
+            self._ensure_worker()
+
+    async def arecord(self, post_id, count=1):
+        # Запис у пам'ять не блокує цикл подій; лише рідкісний синхронний flush іде в потік
+        if self._add(post_id, count):
+            await sync_to_async(self.flush)()
+        else:
+            self._ensure_worker()
+
+    def _add(self, post_id, count):
+        with self._lock:
+            self._pending[post_id] += count
+            self._pending_total += count
+            pending_total = self._pending_total
+        return get_setting('FLUSH_INTERVAL') <= 0 or pending_total >= get_setting('MAX_PENDING')
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, Counter()
+                self._pending_total = 0
+            if not pending:
+                return 0
+            try:
+                self._write(pending)
+            except Exception:
+                logger.exception('Не вдалося записати перегляди статей, спробуємо пізніше.')
+                with self._lock:
+                    self._pending.update(pending)
+                    self._pending_total += sum(pending.values())
+                return 0
+            return sum(pending.values())
+
+    def _write(self, pending):
+        by_increment = defaultdict(list)
+        for post_id, count in pending.items():
+            by_increment[count].append(post_id)
+        batch_size = get_setting('BATCH_SIZE')
+        with transaction.atomic():
+            for count, post_ids in by_increment.items():
+                for start in range(0, len(post_ids), batch_size):
+                    Post.objects.filter(pk__in=post_ids[start:start + batch_size]).update(views=F('views') + count)
+            record_views(pending)
+            record_activity(pending, 'views')
+        bump_generation('views')
+
+    def _ensure_worker(self):
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='blog-view-counter', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(get_setting('FLUSH_INTERVAL')):
+            try:
+                self.flush()
+                # Рейтинг залежить від щойно записаних переглядів, тож його розклад живе в цьому ж потоці
+                refresh_trending_if_due()
+            except Exception:
+                logger.exception('Не вдалося перерахувати рейтинг популярних статей.')
+            finally:
+                connections.close_all()
+
+    def shutdown(self):
+        self._stopped.set()
+        self.flush()
+
+
+view_counter = ViewCounterBuffer()
+atexit.register(view_counter.shutdown)
@@ -1,96 +1,278 @@
 from rest_framework.response import Response
-from .models import User, Post, Category, Comment
+from .models import MAX_ID, User, Post, Category, Comment
+from .view_counter import view_counter
+from .caching import CachedResponseMixin
+from .sparse import SparseQuerysetMixin, ordering_fields, sparse_from_request, trim_queryset
+from .comments import attach_replies, load_comment_pages
+from .statistics import get_rollup
+from .trending import fallback_queryset, parse_trending_params, ranked_posts, trending_queryset
+from .search import get_backend, parse_query
+from .export import EXPORTERS, aiter_chunks, buffered, stream_export
+from .changes import DEFAULT_LIMIT, MAX_LIMIT, build_changes, check_token, latest_token, parse_token
+from .pagination import (
+	CommentCursorPagination, PostCursorPagination, PopularPostCursorPagination, PopularPostFallbackPagination,
+	SearchCursorPagination,
+)
 from .serializers import (
-    UserSerializer, PostListSerializer, PostDetailSerializer,
+    UserSerializer, PostListSerializer, PostDetailSerializer, PostSearchResultSerializer,
     CategorySerializer, CommentSerializer, BlogStatisticsSerializer, CategoryStatisticsSerializer
 )
 from rest_framework import generics
+from rest_framework.exceptions import NotFound, ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.views import APIView
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 
-class PostListAPIView(generics.ListAPIView):
-	queryset = Post.objects.select_related('author', 'category').order_by('-published_at')
+class PostListAPIView(CachedResponseMixin, SparseQuerysetMixin, generics.ListAPIView):
+	queryset = Post.objects.for_list().order_by('-published_at')
 	serializer_class = PostListSerializer
+	pagination_class = PostCursorPagination
 	permission_classes = [AllowAny]
+	cache_resources = ('post', 'comment', 'category', 'user')
+	conditional_get = True
 
-class PostDetailAPIView(generics.RetrieveAPIView):
-	queryset = Post.objects.all()
+class PostDetailAPIView(CachedResponseMixin, SparseQuerysetMixin, generics.RetrieveAPIView):
+	queryset = Post.objects.select_related('author', 'category')
 	serializer_class = PostDetailSerializer
 	lookup_field = 'id'
 	permission_classes = [AllowAny]
+	cache_resources = ('post', 'comment', 'category', 'user', 'views')
+	conditional_get = True
+
+	def get_object(self):
+		post = super().get_object()
+		view_counter.record(post.pk)
+		return post
+
+	def get_cached_response(self, request, data, *args, **kwargs):
+		# У тілі з ?fields= може не бути id, тож статтю визначаємо за URL
+		view_counter.record(self.kwargs['id'])
+		return super().get_cached_response(request, data, *args, **kwargs)
+
+class PostBatchAPIView(CachedResponseMixin, APIView):
+	permission_classes = [AllowAny]
+	cache_resources = ('post', 'comment', 'category', 'user', 'views')
+	conditional_get = True
+	max_ids = 100
+	serializer_classes = {
+		'list': PostListSerializer,
+		'detail': PostDetailSerializer,
+	}
+
+	def get(self, request, *args, **kwargs):
+		ids = self.get_ids(request)
+		representation = request.query_params.get('view', 'list')
+		if representation not in self.serializer_classes:
+			raise ValidationError({'view': f"Підтримувані значення: {', '.join(self.serializer_classes)}."})
+		context = {'request': request, 'sparse': sparse_from_request(request)}
+		serializer = self.serializer_classes[representation](many=True, context=context)
+		queryset = Post.objects.select_related('author', 'category')
+		if representation == 'list':
+			queryset = queryset.defer('content')
+		posts = trim_queryset(queryset, serializer.child).in_bulk(ids)
+		if 'comments' in serializer.child.fields and posts:
+			# Перші сторінки коментарів усіх статей одним запитом, відповіді — по запиту на рівень
+			comments = serializer.child.get_comment_serializer().child
+			load_comment_pages(list(posts.values()), comments.get_thread_queryset(), comments.get_reply_depth())
+		found = [posts[post_id] for post_id in ids if post_id in posts]
+		return Response({
+			'results': serializer.to_representation(found),
+			'missing': [post_id for post_id in ids if post_id not in posts],
+		})
 
-class PostCommentListAPIView(generics.ListAPIView):
+	def get_ids(self, request):
+		raw = ','.join(request.query_params.getlist('ids'))
+		try:
+			ids = [int(value) for value in raw.split(',') if value.strip()]
+		except ValueError:
+			raise ValidationError({'ids': 'Ідентифікатори мають бути цілими числами через кому.'})
+		# Значення поза межами BigAutoField база не прийме як параметр (OverflowError → 500)
+		if any(not 1 <= post_id <= MAX_ID for post_id in ids):
+			raise ValidationError({'ids': 'Ідентифікатори мають бути цілими числами через кому.'})
+		if not ids:
+			raise ValidationError({'ids': 'Вкажіть хоча б один ідентифікатор.'})
+		ids = list(dict.fromkeys(ids))
+		if len(ids) > self.max_ids:
+			raise ValidationError({'ids': f'Не більше {self.max_ids} ідентифікаторів за запит.'})
+		return ids
+
+class PostCommentListAPIView(CachedResponseMixin, SparseQuerysetMixin, generics.ListAPIView):
 	serializer_class = CommentSerializer
+	pagination_class = CommentCursorPagination
 	permission_classes = [AllowAny]
+	cache_resources = ('post', 'comment', 'user')
+	conditional_get = True
 
 	def get_queryset(self):
 		post_id = self.kwargs['post_id']
-		return Comment.objects.filter(post__id=post_id)
-	
-class CategoryListAPIView(generics.ListAPIView):
+		return Comment.objects.for_thread().approved().filter(post_id=post_id, parent__isnull=True)
+
+	def paginate_queryset(self, queryset):
+		page = super().paginate_queryset(queryset)
+		serializer = self.get_serializer()
+		return attach_replies(page, serializer.get_thread_queryset(), serializer.get_reply_depth())
+
+class CategoryListAPIView(CachedResponseMixin, SparseQuerysetMixin, generics.ListAPIView):
 	queryset = Category.objects.all()
 	serializer_class = CategorySerializer
 	permission_classes = [AllowAny]
+	cache_resources = ('category', 'post')
+	conditional_get = True
 
-class CategoryPostListAPIView(generics.ListAPIView):
+class CategoryPostListAPIView(CachedResponseMixin, SparseQuerysetMixin, generics.ListAPIView):
 	serializer_class = PostListSerializer
+	pagination_class = PostCursorPagination
 	permission_classes = [AllowAny]
+	cache_resources = ('post', 'comment', 'category', 'user')
+	conditional_get = True
 
 	def get_queryset(self):
 		category_id = self.kwargs['category_id']
-		return Post.objects.filter(category__id=category_id)
+		return Post.objects.for_list().filter(category__id=category_id)
 
-class AuthorListAPIView(generics.ListAPIView):
+class AuthorListAPIView(CachedResponseMixin, SparseQuerysetMixin, generics.ListAPIView):
 	serializer_class = UserSerializer
 	permission_classes = [AllowAny]
+	cache_resources = ('user', 'post')
 
 	def get_queryset(self):
-		return User.objects.filter(posts__isnull=False).distinct().order_by('username')
+		return User.objects.filter(post_count__gt=0).order_by('username')
 
-class AuthorPostsAPIView(generics.ListAPIView):
+class AuthorPostsAPIView(CachedResponseMixin, SparseQuerysetMixin, generics.ListAPIView):
 	serializer_class = PostListSerializer
+	pagination_class = PostCursorPagination
 	permission_classes = [AllowAny]
+	cache_resources = ('post', 'comment', 'category', 'user')
+	conditional_get = True
 
 	def get_queryset(self):
 		author_id = self.kwargs.get('pk') or self.kwargs.get('author_id')
 		get_object_or_404(User, pk=author_id)
-		return Post.objects.filter(author_id=author_id).select_related('author', 'category').order_by('-published_at')
+		return Post.objects.for_list().filter(author_id=author_id).order_by('-published_at')
 
-class MyPostsAPIView(generics.ListAPIView):
+class MyPostsAPIView(SparseQuerysetMixin, generics.ListAPIView):
 	serializer_class = PostListSerializer
+	pagination_class = PostCursorPagination
 	permission_classes = [IsAuthenticated]
 
 	def get_queryset(self):
 		user = self.request.user
-		return Post.objects.filter(author=user).select_related('author', 'category').order_by('-published_at')
+		return Post.objects.for_list().filter(author=user).order_by('-published_at')
 
-class BlogStatisticsAPIView(APIView):
+class BlogStatisticsAPIView(CachedResponseMixin, APIView):
 	permission_classes = [AllowAny]
+	cache_resources = ('post', 'comment', 'category', 'user', 'views')
 
 	def get(self, request, *args, **kwargs):
-		serializer = BlogStatisticsSerializer(instance=object(), context={'request': request})
+		serializer = BlogStatisticsSerializer(instance=get_rollup(), context={'request': request})
 		return Response(serializer.data)
 
-class CategoryStatisticsAPIView(APIView):
+class CategoryStatisticsAPIView(CachedResponseMixin, APIView):
 	permission_classes = [AllowAny]
+	cache_resources = ('post', 'comment', 'category', 'views')
 
 	def get(self, request, category_id, *args, **kwargs):
-		category = get_object_or_404(Category, pk=category_id)
-		serializer = CategoryStatisticsSerializer(instance=category, context={'request': request})
+		rollup = get_rollup(category_id, refresh_missing=False)
+		if rollup is None:
+			category = get_object_or_404(Category, pk=category_id)
+			rollup = get_rollup(category.pk)
+		serializer = CategoryStatisticsSerializer(instance=rollup, context={'request': request})
 		return Response(serializer.data)
 
-@method_decorator(cache_page(60 * 5), name='dispatch')
-class PopularPostsAPIView(generics.ListAPIView):
+class PopularPostsAPIView(CachedResponseMixin, SparseQuerysetMixin, generics.ListAPIView):
 	serializer_class = PostListSerializer
+	pagination_class = PopularPostCursorPagination
 	permission_classes = [AllowAny]
+	cache_resources = ('post', 'comment', 'category', 'user', 'trending')
+	conditional_get = True
 
 	def get_queryset(self):
-		qs = Post.objects.select_related('author', 'category')
+		window, self.category_id = parse_trending_params(self.request.query_params)
+		return trending_queryset(window, self.category_id)
+
+	def filter_queryset(self, queryset):
+		# Сторінка береться з таблиці рейтингу, а поля статей обрізаються вже при їх завантаженні
+		return queryset
+
+	def paginate_queryset(self, queryset):
+		serializer = self.get_serializer()
+		fallback = PopularPostFallbackPagination()
+		query_params = self.request.query_params
+		if fallback.cursor_query_param not in query_params:
+			page = super().paginate_queryset(queryset)
+			if page or self.paginator.cursor_query_param in query_params:
+				posts = trim_queryset(Post.objects.for_list(), serializer).in_bulk([entry.post_id for entry in page])
+				return ranked_posts(page, posts)
+		self._paginator = fallback
+		posts = trim_queryset(Post.objects.for_list(), serializer, extra=ordering_fields(fallback))
+		return fallback.paginate_queryset(fallback_queryset(posts, self.category_id), self.request, view=self)
+
+class PostSearchAPIView(CachedResponseMixin, SparseQuerysetMixin, generics.ListAPIView):
+	serializer_class = PostSearchResultSerializer
+	pagination_class = SearchCursorPagination
+	permission_classes = [AllowAny]
+	cache_resources = ('post', 'comment', 'category', 'user')
+	conditional_get = True
+
+	def get_queryset(self):
+		return Post.objects.for_list().filter(published_at__isnull=False)
+
+	def list(self, request, *args, **kwargs):
+		terms = parse_query(request.query_params.get('q', ''))
+		if not terms:
+			raise ValidationError({'q': 'Вкажіть пошуковий запит.'})
+		backend = get_backend()
+		if backend is None:
+			raise NotFound('Пошук недоступний.')
+		hits = self.paginator.paginate_search(backend, terms, request)
+		posts = self.filter_queryset(self.get_queryset()).in_bulk([hit.id for hit in hits])
+		snippets = backend.snippets(terms, list(posts))
+		results = []
+		for hit in hits:
+			post = posts.get(hit.id)
+			if post is None:
+				continue
+			post.search_score = hit.score
+			post.search_snippet = snippets.get(hit.id, '')
+			results.append(post)
+		serializer = self.get_serializer(results, many=True)
+		return self.get_paginated_response(serializer.data)
+
+class PostExportAPIView(APIView):
+	permission_classes = [IsAdminUser]
+
+	def get(self, request, *args, **kwargs):
+		# ?format= зайнятий DRF під вибір рендерера, тому формат вивантаження задається через ?output=
+		output = request.query_params.get('output', 'ndjson')
+		if output not in EXPORTERS:
+			raise ValidationError({'output': f"Підтримувані формати: {', '.join(EXPORTERS)}."})
+		exporter_class = EXPORTERS[output]
+		lines = stream_export(
+			output,
+			published_only=request.query_params.get('published') == '1',
+			include_comments=request.query_params.get('comments') == '1',
+		)
+		chunks = buffered(lines)
+		if isinstance(request._request, ASGIRequest):
+			chunks = aiter_chunks(chunks)
+		response = StreamingHttpResponse(chunks, content_type=f'{exporter_class.content_type}; charset=utf-8')
+		response['Content-Disposition'] = f'attachment; filename="blog-export.{exporter_class.extension}"'
+		return response
+
+class ChangesAPIView(APIView):
+	permission_classes = [AllowAny]
+
+	def get(self, request, *args, **kwargs):
+		since = request.query_params.get('since')
+		if since is None:
+			# Без токена повертаємо лише поточний: клієнт робить повну вибірку і далі синхронізується від нього
+			return Response({'since': None, 'next_since': latest_token(), 'has_more': False, 'changes': []})
+		since = parse_token(since)
+		check_token(since)
 		try:
-			qs = qs.filter(published_at__isnull=False)
-		except Exception:
-			qs = qs.filter(status__iexact='published')
-		return qs.order_by('-views')[:5]
\ No newline at end of file
+			limit = min(max(int(request.query_params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+		except ValueError:
+			limit = DEFAULT_LIMIT
+		return Response(build_changes(since, limit, {'request': request}))
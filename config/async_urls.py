@@ -0,0 +1,10 @@
+from django.urls import include, path
+
+from .urls import urlpatterns as sync_urlpatterns
+
+# Кореневий URLconf для ASGI: публічні читання /blog/ обробляються асинхронними views,
+# усе інше (запис, адмінка, токени) — тими самими маршрутами, що й у config.urls
+urlpatterns = [
+	path('blog/', include('blog.async_urls')),
+	*sync_urlpatterns,
+]
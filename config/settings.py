@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from datetime import timedelta
 from pathlib import Path
 
@@ -49,6 +50,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
 	'corsheaders.middleware.CorsMiddleware',
+    'blog.metrics.MetricsMiddleware',
+    'blog.profiling.ProfilingMiddleware',
+    'blog.routing.DatabaseRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,10 +60,21 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'silk.middleware.SilkyMiddleware',
 ]
 
-ROOT_URLCONF = 'config.urls'
+# Silk пише кожен запит і SQL у робочу базу, тому вмикаємо його лише явно
+SILK_ENABLED = os.environ.get('BLOG_SILK_ENABLED') == '1'
+
+if SILK_ENABLED:
+    from blog.profiling import silk_intercept
+
+    MIDDLEWARE.append('silk.middleware.SilkyMiddleware')
+    SILKY_INTERCEPT_FUNC = silk_intercept
+
+# Під ASGI (uvicorn) вмикаємо асинхронні views для публічних читань: BLOG_ASYNC_VIEWS=1
+ASYNC_VIEWS_ENABLED = os.environ.get('BLOG_ASYNC_VIEWS') == '1'
+
+ROOT_URLCONF = 'config.async_urls' if ASYNC_VIEWS_ENABLED else 'config.urls'
 
 TEMPLATES = [
     {
@@ -89,6 +104,38 @@ DATABASES = {
     }
 }
 
+# Режим "production SQLite": WAL, щоб читачі не чекали на писача, і постійні з'єднання замість
+# відкриття файлу на кожен запит. Під ASGI з'єднання живуть у різних потоках, тож там вони не зберігаються
+SQLITE_PRODUCTION = os.environ.get('BLOG_SQLITE_PRODUCTION') == '1'
+
+SQLITE_PRODUCTION_SETTINGS = {
+    'OPTIONS': {
+        'init_command': ';'.join([
+            'PRAGMA journal_mode=WAL',
+            'PRAGMA synchronous=NORMAL',
+            'PRAGMA mmap_size=268435456',
+            'PRAGMA cache_size=-65536',
+            'PRAGMA temp_store=MEMORY',
+        ]),
+        # Запис одразу бере блокування, тож транзакція не падає з "database is locked" посередині
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 20,
+    },
+    'CONN_MAX_AGE': 0 if ASYNC_VIEWS_ENABLED else 600,
+    'CONN_HEALTH_CHECKS': True,
+}
+
+if SQLITE_PRODUCTION:
+    DATABASES['default'].update(SQLITE_PRODUCTION_SETTINGS)
+
+# Репліки лише для читання, через кому: BLOG_DB_REPLICAS="/srv/blog/replica1.sqlite3,/srv/blog/replica2.sqlite3".
+# Для Postgres-реплік замість NAME зазвичай відрізняється HOST, тож їх варто описати в DATABASES явно
+DB_REPLICAS = [name.strip() for name in os.environ.get('BLOG_DB_REPLICAS', '').split(',') if name.strip()]
+for index, name in enumerate(DB_REPLICAS, start=1):
+    DATABASES[f'replica{index}'] = dict(DATABASES['default'], NAME=name, TEST={'MIRROR': 'default'})
+
+DATABASE_ROUTERS = ['blog.routing.PrimaryReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -145,12 +192,103 @@ else:
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'blog.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
 }
 
+# Тіла відповідей можуть жити в пам'яті воркера, а лічильники поколінь мають бути спільними для всіх воркерів
+# і команд керування: файловий кеш на одному хості або Redis (BLOG_REDIS_URL), якщо хостів кілька
+REDIS_URL = os.environ.get('BLOG_REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+        'generations': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'blog',
+        },
+        'generations': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('BLOG_CACHE_DIR', BASE_DIR / 'cache' / 'generations'),
+        },
+    }
+
+BLOG_RESPONSE_CACHE = {
+    # Відповіді інвалідуються одразу через лічильники поколінь; TIMEOUT лише обмежує пам'ять
+    'TIMEOUT': 60 * 60,
+    'GENERATIONS_CACHE': 'generations',
+    # Кількість воркерів (WEB_CONCURRENCY читає і gunicorn); для кількох потрібен спільний кеш поколінь
+    'WORKERS': int(os.environ.get('WEB_CONCURRENCY', 1)),
+}
+
+BLOG_VIEW_COUNTER = {
+    # Перегляди накопичуються в пам'яті процесу і записуються пакетно раз на FLUSH_INTERVAL секунд
+    'FLUSH_INTERVAL': 10,
+    'MAX_PENDING': 1000,
+}
+
+BLOG_PROFILING = {
+    # Профілюється частка SAMPLE_RATE запитів, усі повільніші за SLOW_THRESHOLD_MS
+    # і ті, що мають заголовок HEADER; записи пишуться у DIRECTORY фоновим потоком
+    'ENABLED': True,
+    'SAMPLE_RATE': 0.01,
+    'SLOW_THRESHOLD_MS': 500,
+    'HEADER': 'X-Blog-Profile',
+    'HEADER_SECRET': os.environ.get('BLOG_PROFILING_SECRET'),
+    'DIRECTORY': BASE_DIR / 'profiles',
+    'FLUSH_INTERVAL': 5,
+    'MAX_PENDING': 500,
+}
+
+BLOG_METRICS = {
+    # Кожен воркер періодично скидає свої лічильники у DIRECTORY, /metrics/ їх підсумовує
+    'ENABLED': True,
+    'DIRECTORY': BASE_DIR / 'metrics',
+    'FLUSH_INTERVAL': 15,
+    'TOKEN': os.environ.get('BLOG_METRICS_TOKEN'),
+}
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=10),
     "REFRESH_TOKEN_LIFETIME": timedelta(minutes=30),
-}
\ No newline at end of file
+}
+
+BLOG_AUTH_CACHE = {
+    # Користувачі з JWT кешуються в пам'яті процесу; зміни з інших воркерів видно не пізніше ніж через TIMEOUT
+    'TIMEOUT': 60,
+    'MAX_SIZE': 1024,
+}
+
+BLOG_DB_ROUTING = {
+    # GET-запити до PATH_PREFIXES читають з реплік; після запису клієнт PIN_SECONDS читає з primary,
+    # а репліка, що відстає більше ніж на MAX_LAG_SECONDS або недоступна, пропускається до наступної перевірки
+    'REPLICAS': [f'replica{index}' for index in range(1, len(DB_REPLICAS) + 1)],
+    'PATH_PREFIXES': ('/blog/',),
+    'PIN_SECONDS': 5,
+    'MAX_LAG_SECONDS': 5,
+    'CHECK_INTERVAL': 5,
+    'RETRY_AFTER': 30,
+}
+
+BLOG_TRENDING = {
+    # Рейтинг перераховує один із воркерів раз на REFRESH_INTERVAL секунд (або `python manage.py refresh_trending`
+    # з cron, якщо інтервал 0); для кожного вікна задано його тривалість і період напіврозпаду, обидва в годинах
+    'WINDOWS': {
+        'day': (24, 6),
+        'week': (7 * 24, 24),
+        'month': (30 * 24, 72),
+    },
+    'DEFAULT_WINDOW': 'week',
+    'COMMENT_WEIGHT': 5,
+    'REFRESH_INTERVAL': int(os.environ.get('BLOG_TRENDING_REFRESH_INTERVAL', 5 * 60)),
+}
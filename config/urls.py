@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 
+from blog.metrics import metrics_view
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -11,5 +13,8 @@ urlpatterns = [
     path('admin/', admin.site.urls),
 	path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('silk/', include('silk.urls', namespace='silk')),
-]
\ No newline at end of file
+	path('metrics/', metrics_view, name='metrics'),
+]
+
+if settings.SILK_ENABLED:
+	urlpatterns.append(path('silk/', include('silk.urls', namespace='silk')))
\ No newline at end of file